@@ -0,0 +1,27 @@
+"""tasks keyset index
+
+Revision ID: 3f9c2a71d4e8
+Revises: 120fb4564d76
+Create Date: 2026-10-18 10:12:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f9c2a71d4e8'
+down_revision: Union[str, Sequence[str], None] = '120fb4564d76'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # WHERE owner_id = :user AND id > :after ORDER BY id LIMIT :n — index range scan без сортировки
+    op.create_index("ix_tasks_owner_id_id", "tasks", ["owner_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tasks_owner_id_id", table_name="tasks")
@@ -0,0 +1,39 @@
+"""tasks filter indexes
+
+Revision ID: b71e5d0c9a42
+Revises: 3f9c2a71d4e8
+Create Date: 2026-10-18 11:04:09.552817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b71e5d0c9a42'
+down_revision: Union[str, Sequence[str], None] = '3f9c2a71d4e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # фильтр check/isdone + keyset по id: index scan без сортировки
+    op.create_index("ix_tasks_owner_id_is_done", "tasks", ["owner_id", "is_done", "id"])
+    # фильтр по deadline в GET /tasks/users/{user_id}
+    op.create_index("ix_tasks_owner_id_deadline", "tasks", ["owner_id", "deadline"])
+    # открытые задачи — самый частый список, частичный индекс заметно меньше полного
+    op.create_index(
+        "ix_tasks_owner_id_open",
+        "tasks",
+        ["owner_id", "id"],
+        postgresql_where=sa.text("is_done = false"),
+        sqlite_where=sa.text("is_done = false"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tasks_owner_id_open", table_name="tasks")
+    op.drop_index("ix_tasks_owner_id_deadline", table_name="tasks")
+    op.drop_index("ix_tasks_owner_id_is_done", table_name="tasks")
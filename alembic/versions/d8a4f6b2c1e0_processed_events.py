@@ -0,0 +1,34 @@
+"""processed events
+
+Revision ID: d8a4f6b2c1e0
+Revises: c5e1d2a9f3b7
+Create Date: 2026-10-18 19:41:12.604385
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8a4f6b2c1e0'
+down_revision: Union[str, Sequence[str], None] = 'c5e1d2a9f3b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # dedup email-consumer: id событий, письма по которым уже отправлены
+    op.create_table(
+        "processed_events",
+        sa.Column("event_id", sa.String(length=64), primary_key=True),
+        sa.Column("processed_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    # TTL-очистка удаляет по processed_at
+    op.create_index("ix_processed_events_processed_at", "processed_events", ["processed_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_processed_events_processed_at", table_name="processed_events")
+    op.drop_table("processed_events")
@@ -0,0 +1,32 @@
+"""users tasks version
+
+Revision ID: e3b9c7d5a2f1
+Revises: d8a4f6b2c1e0
+Create Date: 2026-10-18 20:52:37.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b9c7d5a2f1'
+down_revision: Union[str, Sequence[str], None] = 'd8a4f6b2c1e0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # версия задач пользователя для ETag/Last-Modified; server_default заполняет существующие строки
+    op.add_column("users", sa.Column("tasks_version", sa.BigInteger(), server_default="0", nullable=False))
+    op.add_column(
+        "users",
+        sa.Column("tasks_updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("users", "tasks_updated_at")
+    op.drop_column("users", "tasks_version")
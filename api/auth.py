@@ -1,19 +1,86 @@
+from collections import OrderedDict
+from hashlib import sha256
+import threading
+import time
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
 from typing import Annotated
 
 from api.jwt_utils import decode_token
-from settings import get_settings, Settings
+from metrics import metrics
+from settings import get_settings, on_reload, Settings
 
 security = HTTPBearer()
 
 
-def get_current_user(
-    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
-    settings: Annotated[Settings, Depends(get_settings)],
-) -> int:
-    token = credentials.credentials
+class TokenCache:
+    """Bounded LRU of verified access tokens: sha256(token) -> (user_id, exp).
+
+    Entries are served until the token's own ``exp``, so a hit never outlives
+    what ``jwt.decode`` would have accepted.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[bytes, tuple[int, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        # сам токен в памяти не держим
+        return sha256(token.encode("utf-8")).digest()
+
+    def get(self, token: str) -> int | None:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            user_id, exp = entry
+            if exp <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return user_id
+
+    def put(self, token: str, user_id: int, exp: float) -> None:
+        if self.maxsize <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (user_id, exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+token_cache = TokenCache(get_settings().JWT_CACHE_SIZE)
+metrics.callback("jwt_cache_hits", "Access tokens served from the cache.", lambda: token_cache.hits, type="counter")
+metrics.callback("jwt_cache_misses", "Access tokens decoded with jwt.decode.", lambda: token_cache.misses, type="counter")
+metrics.callback("jwt_cache_size", "Access tokens in the cache.", lambda: len(token_cache))
+
+
+@on_reload
+def _reset_token_cache(settings: Settings) -> None:
+    # секрет или алгоритм могли смениться — ранее проверенные токены больше не валидны
+    token_cache.maxsize = settings.JWT_CACHE_SIZE
+    token_cache.clear()
+
+
+def _user_id_from_token(token: str, settings: Settings) -> tuple[int, float | None]:
     try:
         payload = decode_token(token=token, settings=settings)
     except jwt.ExpiredSignatureError:
@@ -33,4 +100,20 @@ def get_current_user(
     except (ValueError, TypeError):
         raise HTTPException(status_code=401, detail="Invalid user id in token")
 
+    return user_id, payload.get("exp")
+
+
+async def get_current_user(
+    credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
+    settings: Annotated[Settings, Depends(get_settings)],
+) -> int:
+    # async: проверка из кэша не стоит перехода в threadpool
+    token = credentials.credentials
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+
+    user_id, exp = _user_id_from_token(token, settings)
+    if exp is not None:
+        token_cache.put(token, user_id, exp)
     return user_id
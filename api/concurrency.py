@@ -0,0 +1,13 @@
+import inspect
+from fastapi.concurrency import run_in_threadpool
+
+
+async def call_service(method, *args, **kwargs):
+    """Call a service method from an async endpoint.
+
+    Async services (DB_ASYNC=1) are awaited directly; sync ones are moved to
+    the threadpool so that blocking DB IO never runs on the event loop.
+    """
+    if inspect.iscoroutinefunction(method):
+        return await method(*args, **kwargs)
+    return await run_in_threadpool(method, *args, **kwargs)
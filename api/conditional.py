@@ -0,0 +1,45 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request
+
+
+def task_validators(user_id: int, version) -> dict[str, str]:
+    """ETag/Last-Modified for task responses of ``user_id`` from get_tasks_version().
+
+    One version covers all tasks of the user: any create/update/delete bumps it,
+    so an unchanged version means every task URL of the user is unchanged.
+    """
+    updated_at = version.tasks_updated_at
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)  # SQLite отдаёт UTC без зоны
+    return {
+        "ETag": f'"{user_id}.{version.tasks_version}"',
+        "Last-Modified": format_datetime(updated_at.astimezone(timezone.utc), usegmt=True),
+        # ответ зависит от токена: общим кешам хранить нельзя, браузер — только с ревалидацией
+        "Cache-Control": "private, no-cache",
+    }
+
+
+def not_modified(request: Request, validators: dict[str, str]) -> bool:
+    """True when the client's copy is current: If-None-Match, or If-Modified-Since without it.
+
+    The validators are per user, not per resource: an endpoint for a single
+    resource has to load it and check access before asking.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # для If-None-Match сравнение слабое: W/"x" совпадает с "x"
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return validators["ETag"] in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    return parsedate_to_datetime(validators["Last-Modified"]) <= since
@@ -1,20 +1,29 @@
 from fastapi import Depends
-from db.session import get_db
+from db.session import get_db, get_async_db, settings
 from sqlalchemy.orm import Session
-from repository.task_Repository import SQLTasksRepository
-from repository.user_Repository import SQLUsersRepository
-from services.task_service import TasksService
-from services.user_service import UsersService
-from services.auth_service import AuthService
-from repository.auth_repository import SQLAuthRepository
+from repository.task_Repository import SQLTasksRepository, AsyncSQLTasksRepository
+from repository.user_Repository import SQLUsersRepository, AsyncSQLUsersRepository
+from services.task_service import TasksService, AsyncTasksService
+from services.user_service import UsersService, AsyncUsersService
+from services.auth_service import AuthService, AsyncAuthService
+from repository.auth_repository import SQLAuthRepository, AsyncSQLAuthRepository
 
-def tasks_service(db: Session = Depends(get_db)):
+# DB_ASYNC=1 -> AsyncSession + async репозитории/сервисы, иначе прежний sync-стек
+db_session = get_async_db if settings.DB_ASYNC else get_db
+
+def tasks_service(db: Session = Depends(db_session)):
+    if settings.DB_ASYNC:
+        return AsyncTasksService(AsyncSQLTasksRepository, db)
     return TasksService(SQLTasksRepository, db)
 
-def users_service(db: Session = Depends(get_db)):
+def users_service(db: Session = Depends(db_session)):
+    if settings.DB_ASYNC:
+        return AsyncUsersService(AsyncSQLUsersRepository, db)
     return UsersService(SQLUsersRepository, db)
 
-def auth_service(db: Session = Depends(get_db), users: UsersService = Depends(users_service),):
+def auth_service(db: Session = Depends(db_session), users: UsersService = Depends(users_service),):
     # build auth repo instance outside AuthService and inject
+    if settings.DB_ASYNC:
+        return AsyncAuthService(users, AsyncSQLAuthRepository(db))
     auth_repo = SQLAuthRepository(db)
-    return AuthService(users, auth_repo)
\ No newline at end of file
+    return AuthService(users, auth_repo)
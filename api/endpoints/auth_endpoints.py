@@ -6,6 +6,7 @@ from services.auth_service import AuthService
 from settings import get_settings, Settings
 from schemas.schemas import LoginRequest, TokenResponse
 from api.dto import LoginData as dtoLogin
+from api.concurrency import call_service
 from logger.logger import get_logger
 
 logger = get_logger(__name__)
@@ -13,7 +14,7 @@ logger = get_logger(__name__)
 router = APIRouter()
 
 @router.post("/login", response_model=TokenResponse)
-def login(
+async def login(
     data: LoginRequest,
     auth_service: Annotated[AuthService, Depends(auth_service)],
     settings: Annotated[Settings, Depends(get_settings)]
@@ -23,13 +24,13 @@ def login(
     data = dtoLogin(**loginData)  
     logger.info(f"Попытка входа пользователя: {data.email}")
 
-    return auth_service.authenticate(data, settings)
+    return await call_service(auth_service.authenticate, data, settings)
 
 @router.post("/refresh", response_model=TokenResponse)
-def refresh(
+async def refresh(
     refresh_token: str,
     auth_service: Annotated[AuthService, Depends(auth_service)],
     settings: Annotated[Settings, Depends(get_settings)]
 ):
     """Refresh access and refresh tokens using a valid refresh token."""
-    return auth_service.refresh_jti(refresh_token, settings)
\ No newline at end of file
+    return await call_service(auth_service.refresh_jti, refresh_token, settings)
\ No newline at end of file
@@ -0,0 +1,26 @@
+from fastapi import APIRouter
+from db import session
+from db.pool_stats import pool_status
+from logger.logger import logging_stats
+from services.password_hasher import password_hasher
+
+router = APIRouter()
+
+@router.get("/db-pool")
+async def db_pool_endpoint():
+    """Pool usage of the DB engines: checked out, overflow and checkout wait time."""
+    pools = {"sync": pool_status(session.engine)}
+    if session.async_engine is not None:
+        pools["async"] = pool_status(session.async_engine)
+    return pools
+
+@router.get("/hashing")
+async def hashing_endpoint():
+    """Argon2 executor: in-flight and queued operations, rejections and latency."""
+    hasher = password_hasher()
+    return hasher.stats.snapshot(hasher.workers)
+
+@router.get("/logging")
+async def logging_endpoint():
+    """Log queue depth and records dropped under overload."""
+    return logging_stats()
@@ -1,59 +1,125 @@
 from dataclasses import asdict
 from datetime import datetime
-from typing import Annotated
-from fastapi import APIRouter, Depends, Query, Response, status, HTTPException
+from typing import Annotated, Literal
+from fastapi import APIRouter, Body, Depends, Query, Request, Response, status, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from api.dependencies import tasks_service
-from schemas.schemas import TaskCreate, TaskOut, TaskUpdate, TasksToOwner
+from schemas.schemas import BULK_MAX_ITEMS, DEADLINE_FORMAT, TaskBulkUpdate, TaskCreate, TaskImportResult, TaskOut, TaskUpdate, TasksToOwner
 from api.dto import TaskCreate as dtoTCreate, TaskUpdate as dtoTUpdate
 from services.task_service import TasksService
 from api.auth import get_current_user
-from api.errors import NotFound
+from api.concurrency import call_service
+from api.conditional import not_modified, task_validators
+from api.errors import NotFound, ValidationError
+from api.importer import IMPORT_MAX_ERRORS, read_record_chunks, validate_records
+from api.responses import export_response, rows_response
+from api.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, set_next_cursor
 
 router = APIRouter()
 
 @router.post("/", response_model=TaskOut, status_code=status.HTTP_201_CREATED)
-def create_task_endpoind(task: TaskCreate, tasks_service: Annotated[TasksService, Depends(tasks_service)], current_user_id: Annotated[int, Depends(get_current_user)]):  
+async def create_task_endpoind(task: TaskCreate, tasks_service: Annotated[TasksService, Depends(tasks_service)], current_user_id: Annotated[int, Depends(get_current_user)]):  
     create_data = task.model_dump()
     # enforce owner from token
     create_data["owner_id"] = current_user_id
     task_dto = dtoTCreate(**create_data)
-    return tasks_service.create_task(task_dto)
+    return await call_service(tasks_service.create_task, task_dto)
+
+# /bulk объявлены до /{task_id}: иначе DELETE /bulk попадёт в del_task_endpoind
+@router.post("/bulk", response_model=list[TaskOut], status_code=status.HTTP_201_CREATED)
+async def create_tasks_bulk_endpoint(tasks: Annotated[list[TaskCreate], Body(min_length=1, max_length=BULK_MAX_ITEMS)], tasks_service: Annotated[TasksService, Depends(tasks_service)], current_user_id: Annotated[int, Depends(get_current_user)]):
+    task_dtos = [dtoTCreate(**{**task.model_dump(), "owner_id": current_user_id}) for task in tasks]
+    rows = await call_service(tasks_service.create_tasks, current_user_id, task_dtos)
+    return rows_response(rows, TaskOut, status_code=status.HTTP_201_CREATED)
+
+@router.patch("/bulk", response_model=list[TaskOut])
+async def up_tasks_bulk_endpoint(tasks: Annotated[list[TaskBulkUpdate], Body(min_length=1, max_length=BULK_MAX_ITEMS)], tasks_service: Annotated[TasksService, Depends(tasks_service)], current_user_id: Annotated[int, Depends(get_current_user)]):
+    updates = {}
+    for task in tasks:
+        if task.id in updates:
+            raise ValidationError("Задача указана несколько раз", details={"id": task.id})
+        data = dtoTUpdate(**task.model_dump(exclude_unset=True, exclude={"id"}))
+        updates[task.id] = {k: v for k, v in asdict(data).items() if v is not None}
+    rows = await call_service(tasks_service.up_tasks, current_user_id, updates)
+    return rows_response(rows, TaskOut)
+
+@router.delete("/bulk", status_code=status.HTTP_204_NO_CONTENT)
+async def del_tasks_bulk_endpoint(task_ids: Annotated[list[int], Body(min_length=1, max_length=BULK_MAX_ITEMS)], tasks_service: Annotated[TasksService, Depends(tasks_service)], current_user_id: Annotated[int, Depends(get_current_user)]):
+    await call_service(tasks_service.del_tasks, current_user_id, list(dict.fromkeys(task_ids)))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.post("/import", response_model=TaskImportResult, openapi_extra={"requestBody": {"content": {"application/x-ndjson": {}, "text/csv": {}}}})
+async def import_tasks_endpoint(request: Request, tasks_service: Annotated[TasksService, Depends(tasks_service)], current_user_id: Annotated[int, Depends(get_current_user)], format: Literal["ndjson", "csv"] = Query("ndjson")):
+    # тело читается потоком; каждая пачка валидных строк записывается и коммитится сразу,
+    # строки с ошибками пропускаются и перечисляются в ответе
+    imported, failed, errors = 0, 0, []
+    async for records in read_record_chunks(request.stream(), format):
+        # pydantic-валидация пачки — CPU, не на цикле событий
+        tasks, chunk_errors = await run_in_threadpool(validate_records, records, current_user_id)
+        if tasks:
+            imported += await call_service(tasks_service.import_tasks, current_user_id, tasks)
+        failed += len(chunk_errors)
+        errors.extend(chunk_errors[:IMPORT_MAX_ERRORS - len(errors)])
+    return {"imported": imported, "failed": failed, "errors": errors}
+
+# до /{task_id}: иначе "export" разбирается как task_id и даёт 422
+@router.get("/export", response_class=StreamingResponse, responses={200: {"content": {"application/x-ndjson": {}, "text/csv": {}}}})
+async def export_tasks_endpoint(tasks_service: Annotated[TasksService, Depends(tasks_service)], current_user_id: Annotated[int, Depends(get_current_user)], format: Literal["ndjson", "csv"] = Query("ndjson"), isdone: bool | None = Query(None)):
+    # строки читаются по мере отправки ответа; сессия из db_session закрывается после последнего чанка
+    batches = tasks_service.stream_user_tasks(current_user_id, isdone)
+    return export_response(batches, TaskOut, format, filename="tasks")
 
 @router.get("/{task_id}", response_model=TaskOut)
-def get_task_endpoind(task_id: int, tasks_service: Annotated[TasksService, Depends(tasks_service)], current_user_id: Annotated[int, Depends(get_current_user)]):    
-    task = tasks_service.get_task(task_id)
+async def get_task_endpoind(task_id: int, request: Request, response: Response, tasks_service: Annotated[TasksService, Depends(tasks_service)], current_user_id: Annotated[int, Depends(get_current_user)]):    
+    # версия читается до данных: запись между ними даст старый ETag и лишний, но не ложный, 200
+    validators = task_validators(current_user_id, await call_service(tasks_service.get_tasks_version, current_user_id))
+    # ETag общий для всех задач пользователя и совпал бы для любого task_id:
+    # условия проверяются только после загрузки задачи и проверки владельца
+    task = await call_service(tasks_service.get_task, task_id)
     # ownership check
     if task.owner_id != current_user_id:
         raise NotFound(resource="task")
+    if not_modified(request, validators):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators)
+    response.headers.update(validators)
     return task
 
 @router.get("/all/", response_model=list[TaskOut])
-def get_tasks_endpoind(tasks_service: Annotated[TasksService, Depends(tasks_service)], isdone: bool | None = Query(None), current_user_id: Annotated[int, Depends(get_current_user)] = None):
-    # return only tasks for current user
-    return tasks_service.get_user_tasks(current_user_id, isdone, None)
+async def get_tasks_endpoind(request: Request, tasks_service: Annotated[TasksService, Depends(tasks_service)], isdone: bool | None = Query(None), current_user_id: Annotated[int, Depends(get_current_user)] = None, after: str | None = Query(None), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+    after_id = decode_cursor(after)
+    version = await call_service(tasks_service.get_tasks_version, current_user_id)
+    validators = task_validators(current_user_id, version)
+    if not_modified(request, validators):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators)
+    # return only tasks for current user; кеш списка привязан к той же версии, что и ETag
+    tasks = await call_service(tasks_service.get_user_tasks, current_user_id, isdone, None, after=after_id, limit=limit, version=version.tasks_version)
+    response = rows_response(tasks, TaskOut, headers=validators)
+    set_next_cursor(response, tasks, limit)
+    return response
 
 @router.patch("/{task_id}/up", response_model=TaskOut)
-def up_task_endpoind(task_id: int, data: TaskUpdate, tasks_service: Annotated[TasksService, Depends(tasks_service)], current_user_id: Annotated[int, Depends(get_current_user)] = None):
+async def up_task_endpoind(task_id: int, data: TaskUpdate, tasks_service: Annotated[TasksService, Depends(tasks_service)], current_user_id: Annotated[int, Depends(get_current_user)] = None):
     # check ownership
-    task = tasks_service.get_task(task_id)
+    task = await call_service(tasks_service.get_task, task_id)
     if getattr(task, "owner_id", None) != current_user_id:
         raise NotFound(resource="task")
     update_data = data.model_dump(exclude_unset=True)
     data = dtoTUpdate(**update_data)
     update_data = {k: v for k, v in asdict(data).items() if v is not None}
-    return tasks_service.up_task(task_id, update_data)
+    return await call_service(tasks_service.up_task, task_id, update_data)
 
 @router.delete("/{task_id}")
-def del_task_endpoind(task_id: int, tasks_service: Annotated[TasksService, Depends(tasks_service)], current_user_id: Annotated[int, Depends(get_current_user)] = None):
-    task = tasks_service.get_task(task_id)
+async def del_task_endpoind(task_id: int, tasks_service: Annotated[TasksService, Depends(tasks_service)], current_user_id: Annotated[int, Depends(get_current_user)] = None):
+    task = await call_service(tasks_service.get_task, task_id)
     if getattr(task, "owner_id", None) != current_user_id:        
         raise NotFound(resource="task")
-    tasks_service.del_task(task_id)
+    await call_service(tasks_service.del_task, task_id)
     return Response(status_code=204)
 
 
 @router.get("/users/{user_id}", response_model=list[TasksToOwner])
-def get_user_tasks_endpoint(user_id: int, tasks_service: Annotated[TasksService, Depends(tasks_service)], current_user_id: Annotated[int, Depends(get_current_user)], check: str | None = Query(None), deadline: str | None = Query(None)):
+async def get_user_tasks_endpoint(user_id: int, request: Request, tasks_service: Annotated[TasksService, Depends(tasks_service)], current_user_id: Annotated[int, Depends(get_current_user)], check: str | None = Query(None), deadline: str | None = Query(None), after: str | None = Query(None), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
     # forbid access to other users' tasks
     if user_id != current_user_id:
         raise NotFound(resource="task")
@@ -65,10 +131,18 @@ def get_user_tasks_endpoint(user_id: int, tasks_service: Annotated[TasksService,
     deadline_dt = None
     if deadline:
         try:
-            deadline_dt = datetime.strptime(deadline, "%Y-%m-%d %H:%M")
+            deadline_dt = datetime.strptime(deadline, DEADLINE_FORMAT)
         except Exception:
             deadline_dt = None
 
-    return tasks_service.get_user_tasks(user_id, isdone, deadline_dt)
+    after_id = decode_cursor(after)
+    version = await call_service(tasks_service.get_tasks_version, user_id)
+    validators = task_validators(user_id, version)
+    if not_modified(request, validators):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators)
+    tasks = await call_service(tasks_service.get_user_tasks, user_id, isdone, deadline_dt, after=after_id, limit=limit, version=version.tasks_version)
+    response = rows_response(tasks, TasksToOwner, headers=validators)
+    set_next_cursor(response, tasks, limit)
+    return response
     
 
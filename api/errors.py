@@ -53,3 +53,8 @@ class ValidationError(AppError):
 class Unauthorized(AppError):
     def __init__(self, message: str = "Неавторизованный доступ", details: dict | str = None):
         super().__init__(401, "unauthorized", message, details)
+
+
+class TooManyRequests(AppError):
+    def __init__(self, message: str = "Слишком много запросов, повторите позже", details: dict | str = None):
+        super().__init__(429, "too_many_requests", message, details)
@@ -4,7 +4,8 @@ from fastapi.exceptions import RequestValidationError
 from fastapi import HTTPException
 
 from api.errors import AppError
-from logger.logger import get_logger
+from api.middleware import REQUEST_ID_HEADER
+from logger.logger import get_logger, request_id_var
 
 logger = get_logger(__name__)
 
@@ -54,6 +55,14 @@ def register_exception_handlers(app):
     @app.exception_handler(Exception)
     def unhandled_exception_handler(request: Request, exc: Exception):
         # Don't leak internals; return safe message
-        logger.error("Unhandled exception on %s", request.url.path, exc_info=exc)
+        # вызывается из ServerErrorMiddleware, вне RequestContextMiddleware: id запроса — из scope
+        request_id = getattr(request.state, "request_id", None)
+        token = request_id_var.set(request_id) if request_id else None
+        try:
+            logger.error("Unhandled exception on %s", request.url.path, exc_info=exc)
+        finally:
+            if token is not None:
+                request_id_var.reset(token)
         payload = {"detail": "Internal server error", "code": "internal_error"}
-        return JSONResponse(status_code=500, content=payload)
\ No newline at end of file
+        headers = {REQUEST_ID_HEADER: request_id} if request_id else None
+        return JSONResponse(status_code=500, content=payload, headers=headers)
\ No newline at end of file
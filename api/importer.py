@@ -0,0 +1,125 @@
+"""Incremental parsing of task uploads for POST /tasks/import.
+
+The request body is read chunk by chunk and split into records (NDJSON
+lines or CSV records, which may span lines inside quotes) on the event loop;
+records are grouped in chunks of IMPORT_CHUNK_SIZE, so memory depends on the
+chunk size, not on the size of the upload. Validation against
+schemas.TaskCreate is CPU-bound and is done per chunk by validate_records,
+which the endpoint runs in the threadpool.
+"""
+import csv
+from collections.abc import AsyncIterable, AsyncIterator
+import orjson
+import pydantic
+from api.dto import TaskCreate as dtoTCreate
+from api.errors import ValidationError
+from schemas.schemas import BULK_MAX_ITEMS, TaskCreate
+
+# строк на одну запись в БД (COPY/INSERT) и один commit
+IMPORT_CHUNK_SIZE = BULK_MAX_ITEMS
+# в ответ попадают первые ошибки, остальные только считаются
+IMPORT_MAX_ERRORS = 100
+# одна строка/запись CSV; защищает от тела без переводов строк
+IMPORT_MAX_RECORD_BYTES = 1 << 20
+
+
+async def _lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[tuple[int, bytes]]:
+    """(line number, line without the line break) from a byte stream."""
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            number += 1
+            yield number, line.rstrip(b"\r")
+        if len(buffer) > IMPORT_MAX_RECORD_BYTES:
+            raise ValidationError("Слишком длинная строка", details={"line": number + 1})
+    if buffer:
+        yield number + 1, buffer.rstrip(b"\r")
+
+
+async def _ndjson_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[tuple[int, dict | str]]:
+    async for number, line in _lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            yield number, "Некорректный JSON"
+            continue
+        yield number, record if isinstance(record, dict) else "Ожидался JSON-объект"
+
+
+async def _csv_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[tuple[int, dict | str]]:
+    header = None
+    parts: list[bytes] = []
+    start = 0
+    quotes = 0
+    async for number, line in _lines(chunks):
+        if not parts:
+            start = number
+        parts.append(line)
+        # нечётное число кавычек — поле в кавычках продолжается на следующей строке
+        quotes += line.count(b'"')
+        if quotes % 2:
+            if sum(map(len, parts)) > IMPORT_MAX_RECORD_BYTES:
+                raise ValidationError("Слишком длинная запись CSV", details={"line": start})
+            continue
+        raw = b"\n".join(parts)
+        parts, quotes = [], 0
+        if not raw.strip():
+            continue
+        try:
+            values = next(csv.reader([raw.decode("utf-8-sig" if header is None else "utf-8")]))
+        except (UnicodeDecodeError, csv.Error):
+            if header is None:
+                raise ValidationError("Некорректный заголовок CSV", details={"line": start})
+            yield start, "Некорректная строка CSV"
+            continue
+        if header is None:
+            header = values
+            continue
+        if len(values) != len(header):
+            yield start, f"Ожидалось {len(header)} колонок, получено {len(values)}"
+            continue
+        # пустая ячейка — поле не задано, как отсутствующий ключ в NDJSON
+        yield start, {name: value for name, value in zip(header, values) if value != ""}
+    if parts:
+        yield start, "Незакрытые кавычки в конце файла"
+
+
+def _validate(number: int, record: dict | str, owner_id: int) -> tuple[dtoTCreate | None, dict | None]:
+    if isinstance(record, str):
+        return None, {"line": number, "errors": [{"loc": [], "msg": record, "type": "parse_error"}]}
+    try:
+        task = TaskCreate.model_validate(record)
+    except pydantic.ValidationError as e:
+        errors = [{"loc": list(err["loc"]), "msg": err["msg"], "type": err["type"]} for err in e.errors()]
+        return None, {"line": number, "errors": errors}
+    return dtoTCreate(**{**task.model_dump(), "owner_id": owner_id}), None
+
+
+def validate_records(records: list[tuple[int, dict | str]], owner_id: int) -> tuple[list[dtoTCreate], list[dict]]:
+    """(valid tasks, row errors) of one chunk of records."""
+    tasks, errors = [], []
+    for number, record in records:
+        task, error = _validate(number, record, owner_id)
+        if task is not None:
+            tasks.append(task)
+        else:
+            errors.append(error)
+    return tasks, errors
+
+
+async def read_record_chunks(chunks: AsyncIterable[bytes], format: str) -> AsyncIterator[list[tuple[int, dict | str]]]:
+    """Yield (line number, record or parse error) for every IMPORT_CHUNK_SIZE records of the upload."""
+    records = _csv_records(chunks) if format == "csv" else _ndjson_records(chunks)
+    chunk = []
+    async for number, record in records:
+        chunk.append((number, record))
+        if len(chunk) == IMPORT_CHUNK_SIZE:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
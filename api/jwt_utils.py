@@ -4,8 +4,11 @@ import jwt
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict
 from uuid import uuid4
+from metrics import metrics
 from settings import Settings
 
+JWT_SECONDS = metrics.histogram("jwt_seconds", "JWT encode/decode time.", ("op",))
+
 
 def _utcnow() -> datetime:
     return datetime.now(timezone.utc)
@@ -19,7 +22,8 @@ def create_access_token(*, user_id: int, settings: Settings) -> str:
         "iat": int(now.timestamp()),
         "exp": int((now + timedelta(minutes=settings.ACCESS_TTL_MINUTES)).timestamp()),
     }
-    return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+    with JWT_SECONDS.time("encode"):
+        return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
 
 
 def create_refresh_token(*, user_id: int, settings: Settings) -> tuple[str, str]:
@@ -36,7 +40,8 @@ def create_refresh_token(*, user_id: int, settings: Settings) -> tuple[str, str]
         "iat": int(now.timestamp()),
         "exp": int((now + timedelta(days=settings.REFRESH_TTL_DAYS)).timestamp()),
     }
-    token = jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
+    with JWT_SECONDS.time("encode"):
+        token = jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
     return token, jti, payload
 
 
@@ -45,4 +50,5 @@ def decode_token(*, token: str, settings: Settings) -> Dict[str, Any]:
     Важно: jwt.decode сам проверяет exp по умолчанию.
     Если токен просрочен — будет исключение ExpiredSignatureError.
     """
-    return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
+    with JWT_SECONDS.time("decode"):
+        return jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
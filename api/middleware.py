@@ -0,0 +1,112 @@
+import re
+import time
+import uuid
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from db.query_stats import QueryUsage, track_usage
+from logger.logger import get_logger, request_id_var
+from metrics import metrics
+from settings import get_settings
+
+access_logger = get_logger("api.access")
+profile_logger = get_logger("api.sql_profile")
+
+HTTP_REQUESTS = metrics.counter("http_requests", "HTTP requests by route and status.", ("method", "route", "status"))
+HTTP_SECONDS = metrics.histogram("http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"))
+HTTP_DB_QUERIES = metrics.histogram(
+    "http_request_db_queries", "SQL statements per request.", ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+HTTP_DB_SECONDS = metrics.histogram("http_request_db_seconds", "Time spent in SQL per request.", ("method", "route"))
+
+REQUEST_ID_HEADER = "x-request-id"
+# чужой id принимаем, только если он не сломает строку лога
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+
+class RequestContextMiddleware:
+    """Assign every request an id, echo it in ``X-Request-ID``, log an access line and record
+    per-route latency and DB usage metrics on completion.
+
+    An incoming ``X-Request-ID`` is reused so that ids can be correlated across services.
+    The id is kept in ``request_id_var``, so every log record written while handling the
+    request — including from threadpool workers — carries it.
+    Plain ASGI middleware: BaseHTTPMiddleware would add a task and a stream per request.
+
+    With ``SQL_PROFILE`` every statement is recorded: the response gets a ``Server-Timing``
+    header (DB time and query count, total time) and the statements are logged, with a
+    warning when one of them repeats often enough to look like an N+1 loop.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _VALID_REQUEST_ID.fullmatch(candidate):
+                    request_id = candidate
+                break
+        request_id = request_id or uuid.uuid4().hex
+        # ServerErrorMiddleware снаружи этого middleware: обработчик 500 берёт id из scope,
+        # request_id_var к тому моменту уже сброшен
+        scope.setdefault("state", {})["request_id"] = request_id
+        header = (REQUEST_ID_HEADER.encode(), request_id.encode())
+        status = 500
+        settings = get_settings()
+        profile = settings.SQL_PROFILE
+
+        async def send_with_request_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = [*message.get("headers", []), header]
+                if profile:
+                    headers.append((b"server-timing", _server_timing(db_usage, time.perf_counter() - started)))
+                message["headers"] = headers
+            await send(message)
+
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        try:
+            with track_usage(record=profile) as db_usage:
+                await self.app(scope, receive, send_with_request_id)
+        finally:
+            elapsed = time.perf_counter() - started
+            duration_ms = round(elapsed * 1000, 2)
+            # шаблон пути, а не сам путь: иначе по серии на каждый task_id
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method, route_path, str(status))
+            HTTP_SECONDS.observe(elapsed, method, route_path)
+            HTTP_DB_QUERIES.observe(db_usage.count, method, route_path)
+            HTTP_DB_SECONDS.observe(db_usage.seconds, method, route_path)
+            access_logger.info(
+                "%s %s %s %.2fms", method, scope["path"], status, duration_ms,
+                extra={"method": method, "path": scope["path"], "status": status, "duration_ms": duration_ms,
+                       "db_queries": db_usage.count},
+            )
+            if profile:
+                _log_profile(scope["path"], db_usage, settings.SQL_PROFILE_REPEAT_THRESHOLD)
+            request_id_var.reset(token)
+
+
+def _server_timing(usage: QueryUsage, elapsed: float) -> bytes:
+    return (
+        f'db;dur={usage.seconds * 1000:.2f};desc="{usage.count} queries", app;dur={elapsed * 1000:.2f}'
+    ).encode()
+
+
+def _log_profile(path: str, usage: QueryUsage, repeat_threshold: int) -> None:
+    for statement, n in usage.repeated(repeat_threshold).items():
+        profile_logger.warning("Возможный N+1 в %s: запрос выполнен %s раз: %s", path, n, statement)
+    profile_logger.info(
+        "SQL %s: %s запросов, %.2fms", path, usage.count, usage.seconds * 1000,
+        extra={"sql": [{"statement": statement, "ms": round(seconds * 1000, 3)} for statement, seconds in usage.statements]},
+    )
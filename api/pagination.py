@@ -0,0 +1,33 @@
+import base64
+import binascii
+from fastapi import Response
+from api.errors import ValidationError
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(task_id: int) -> str:
+    """Opaque keyset cursor: the id of the last task on the page."""
+    return base64.urlsafe_b64encode(f"id:{task_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> int | None:
+    if cursor is None:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, value = raw.split(":", 1)
+        if prefix != "id":
+            raise ValueError(prefix)
+        return int(value)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise ValidationError("Некорректный курсор пагинации", details={"after": cursor})
+
+
+def set_next_cursor(response: Response, page: list, limit: int) -> None:
+    # полная страница — возможно, есть следующая; курсор отдаём в заголовке, тело остаётся списком
+    if page and len(page) >= limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(page[-1].id)
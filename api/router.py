@@ -1,9 +1,11 @@
 from fastapi import APIRouter
 
-from api.endpoints import task_endpoints, user_endpoints, auth_endpoints
+from api.endpoints import task_endpoints, user_endpoints, auth_endpoints, health_endpoints, metrics_endpoints
 
 
 api_router = APIRouter()
 api_router.include_router(user_endpoints.router, prefix="/users", tags=["Auth"])
 api_router.include_router(task_endpoints.router, prefix="/tasks", tags=["Tasks"])
-api_router.include_router(auth_endpoints.router, prefix="/auth", tags=["Auth"]) 
\ No newline at end of file
+api_router.include_router(auth_endpoints.router, prefix="/auth", tags=["Auth"])
+api_router.include_router(health_endpoints.router, prefix="/health", tags=["Health"])
+api_router.include_router(metrics_endpoints.router, tags=["Health"])
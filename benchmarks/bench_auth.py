@@ -0,0 +1,66 @@
+"""Накладные расходы аутентификации на запрос: get_current_user до и после кэшей.
+
+    python -m benchmarks.bench_auth
+    python -m benchmarks.bench_auth --calls 200000
+
+Режимы:
+  before  — Settings() на каждый запрос (чтение .env) + полный jwt.decode;
+  decode  — закэшированные Settings, но токен проверяется каждый раз (промах кэша);
+  cached  — закэшированные Settings и попадание в кэш проверенных токенов.
+Нужны переменные окружения Settings (JWT_SECRET, DB_* и т.д.), как для приложения.
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi.security import HTTPAuthorizationCredentials
+
+from api import auth
+from api.jwt_utils import create_access_token
+from settings import Settings, get_settings
+
+
+def before(token: str) -> int:
+    return auth._user_id_from_token(token, Settings())[0]
+
+
+def decode(token: str) -> int:
+    return auth._user_id_from_token(token, get_settings())[0]
+
+
+def cached(credentials: HTTPAuthorizationCredentials) -> int:
+    # корутина без await внутри при попадании — прогоняем её вручную, без event loop
+    coro = auth.get_current_user(credentials, get_settings())
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("get_current_user suspended")
+
+
+def per_call_us(func, arg, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        func(arg)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main(calls: int):
+    token = create_access_token(user_id=1, settings=get_settings())
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    asyncio.run(auth.get_current_user(credentials, get_settings()))  # прогреть кэш
+
+    results = {
+        "before": per_call_us(before, token, max(calls // 20, 1)),
+        "decode": per_call_us(decode, token, calls),
+        "cached": per_call_us(cached, credentials, calls),
+    }
+    for label, us in results.items():
+        print(f"{label:<7} {us:8.2f} us/request  x{results['before'] / us:6.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=100000)
+    args = parser.parse_args()
+    main(args.calls)
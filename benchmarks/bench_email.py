@@ -0,0 +1,99 @@
+"""Пропускная способность отправки писем: соединение на письмо против пула EmailSender.
+
+    python -m benchmarks.bench_email
+    python -m benchmarks.bench_email --messages 500 --workers 8 --server-latency-ms 20
+
+Поднимает локальный SMTP (aiosmtpd) с искусственной задержкой ответа на DATA и
+на приветствие (имитация TLS-handshake и login). Старый путь — новое соединение
+на каждое письмо в одном потоке, как делал services/consumer.py.
+Нужен aiosmtpd: pip install aiosmtpd.
+"""
+import argparse
+import asyncio
+import smtplib
+import socket
+import time
+
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import SMTP
+
+from services.email_sender import EmailSender, SMTPConnectionPool, build_message
+
+SENDER = "bench@example.com"
+
+
+class SlowHandler:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.latency)
+        return "250 OK"
+
+
+class SlowConnectController(Controller):
+    """Задержка перед приветствием сервера — стоимость установки соединения."""
+
+    def __init__(self, handler, connect_latency: float, **kwargs):
+        super().__init__(handler, **kwargs)
+        self.connect_latency = connect_latency
+
+    def factory(self):
+        latency = self.connect_latency
+
+        class SlowSMTP(SMTP):
+            async def _handle_client(self):
+                await asyncio.sleep(latency)
+                await super()._handle_client()
+
+        return SlowSMTP(self.handler, **self.SMTP_kwargs)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def connection_per_message(host: str, port: int, emails: list[dict]) -> float:
+    started = time.perf_counter()
+    for data in emails:
+        msg = build_message(SENDER, data["email"], data["subject"], data["body"])
+        with smtplib.SMTP(host, port) as smtp:
+            smtp.sendmail(SENDER, [data["email"]], msg.as_string())
+    return time.perf_counter() - started
+
+
+def pooled(host: str, port: int, emails: list[dict], workers: int) -> float:
+    sender = EmailSender(SMTPConnectionPool(host, port, use_ssl=False, size=workers), SENDER, workers)
+    started = time.perf_counter()
+    errors = sender.send_many(emails)
+    elapsed = time.perf_counter() - started
+    sender.close()
+    assert not any(errors), errors
+    return elapsed
+
+
+def main(messages: int, workers: int, server_latency_ms: float, connect_latency_ms: float):
+    controller = SlowConnectController(
+        SlowHandler(server_latency_ms / 1000), connect_latency_ms / 1000, hostname="127.0.0.1", port=free_port()
+    )
+    controller.start()
+    try:
+        emails = [{"email": f"user{i}@example.com", "subject": "Bench", "body": "<p>bench</p>"} for i in range(messages)]
+        old = connection_per_message(controller.hostname, controller.port, emails)
+        new = pooled(controller.hostname, controller.port, emails, workers)
+    finally:
+        controller.stop()
+    print(f"connection per message  {messages / old:8.1f} msg/s")
+    print(f"pool, {workers} workers        {messages / new:8.1f} msg/s  x{old / new:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--server-latency-ms", type=float, default=10.0)
+    parser.add_argument("--connect-latency-ms", type=float, default=30.0)
+    args = parser.parse_args()
+    main(args.messages, args.workers, args.server_latency_ms, args.connect_latency_ms)
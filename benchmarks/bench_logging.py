@@ -0,0 +1,108 @@
+"""Латентность запроса при логировании: выключено / синхронные хендлеры / очередь.
+
+    python -m benchmarks.bench_logging
+    python -m benchmarks.bench_logging --requests 3000 --lines 5
+
+Запросы GET /tasks/{id} идут в приложение in-process (ASGI-транспорт httpx);
+заглушка сервиса пишет --lines строк INFO на запрос, как настоящие сервисы.
+Логи пишутся в консоль (перенаправляется в /dev/null) и RotatingFileHandler во
+временном каталоге с маленьким maxBytes, чтобы в замер попадала ротация.
+"""
+import argparse
+import asyncio
+import logging
+import logging.handlers
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import httpx
+
+from api.dependencies import tasks_service
+from api.jwt_utils import create_access_token
+from logger.logger import _build_handlers, _install
+from main import app
+from settings import get_settings
+
+service_logger = logging.getLogger("services.task_service")
+
+
+class LoggingTasksService:
+    lines = 3
+
+    async def get_task(self, task_id: int):
+        for i in range(self.lines):
+            service_logger.info("Task read: id=%s step=%s", task_id, i)
+        return SimpleNamespace(id=task_id, title="bench", description="bench", is_done=False, owner_id=1, deadline=None)
+
+
+async def run(requests: int) -> list[float]:
+    token = create_access_token(user_id=1, settings=get_settings())
+    latencies = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                 headers={"Authorization": f"Bearer {token}"}) as client:
+        for i in range(requests):
+            started = time.perf_counter()
+            r = await client.get(f"/tasks/{i + 1}")
+            latencies.append(time.perf_counter() - started)
+            r.raise_for_status()
+    return latencies
+
+
+def measure(label: str, root: logging.Logger, log_dir: Path, mode: str, requests: int) -> None:
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    queue_handler = listener = None
+    handlers = _build_handlers(log_dir / f"{mode}.log")
+    for handler in handlers:
+        if isinstance(handler, logging.handlers.RotatingFileHandler):
+            handler.maxBytes = 256 * 1024
+    if mode == "disabled":
+        root.setLevel(logging.WARNING)
+    else:
+        root.setLevel(logging.INFO)
+        queue_handler, listener = _install(root, handlers, use_queue=mode == "queue")
+
+    latencies = sorted(asyncio.run(run(requests)))
+    if listener is not None:
+        listener.stop()
+    for handler in handlers:
+        handler.close()
+    dropped = f"  dropped {queue_handler.dropped}" if queue_handler else ""
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{label:<14} p50 {p50:7.3f} ms  p99 {p99:7.3f} ms{dropped}", file=sys.__stdout__)
+
+
+def main(requests: int, lines: int):
+    LoggingTasksService.lines = lines
+    app.dependency_overrides[tasks_service] = LoggingTasksService
+    root = logging.getLogger()
+    saved = root.handlers[:], root.level
+    devnull = open(os.devnull, "w")
+    sys.stderr = devnull  # StreamHandler пишет в sys.stderr на момент создания
+    try:
+        with tempfile.TemporaryDirectory() as log_dir:
+            for label, mode in (("disabled", "disabled"), ("sync handlers", "sync"), ("queue", "queue")):
+                measure(label, root, Path(log_dir), mode, requests)
+    finally:
+        sys.stderr = sys.__stderr__
+        devnull.close()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        for handler in saved[0]:
+            root.addHandler(handler)
+        root.setLevel(saved[1])
+        app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--lines", type=int, default=3, help="строк INFO на запрос")
+    args = parser.parse_args()
+    main(args.requests, args.lines)
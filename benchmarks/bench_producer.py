@@ -0,0 +1,135 @@
+"""Пропускная способность отправки событий о регистрации: flush на каждое сообщение против пачки.
+
+    python -m benchmarks.bench_producer
+    python -m benchmarks.bench_producer --messages 2000 --rtt-ms 2
+    python -m benchmarks.bench_producer --bootstrap localhost:9092   # настоящий брокер
+
+По умолчанию вместо брокера используется StandInProducer: он повторяет интерфейс
+confluent_kafka.Producer (produce/poll/flush/len, BufferError при переполнении) и
+«доставляет» накопленный батч за один round-trip раз в linger.ms. Старый путь —
+produce + flush(1.0) на каждое сообщение, как было в send_task_email; новый — как
+OutboxRelay.run_once: produce всей пачки с producer_config и один flush.
+"""
+import argparse
+import json
+import threading
+import time
+
+from confluent_kafka import Producer
+
+from services.producer import producer_config
+from settings import get_settings
+
+
+class StandInMessage:
+    def __init__(self, topic: str):
+        self._topic = topic
+
+    def topic(self):
+        return self._topic
+
+
+class StandInProducer:
+    """Локальная замена брокера с задержкой round-trip на батч."""
+
+    def __init__(self, conf: dict, rtt: float):
+        self.rtt = rtt
+        self.linger = conf.get("linger.ms", 5) / 1000
+        self.max_messages = conf.get("queue.buffering.max.messages", 100000)
+        self._pending: list[tuple[str, object]] = []
+        self._ready: list[tuple[str, object]] = []
+        self._lock = threading.Lock()
+        self._first_at = None
+
+    def produce(self, topic, value=None, key=None, on_delivery=None):
+        with self._lock:
+            if len(self._pending) + len(self._ready) >= self.max_messages:
+                raise BufferError("Local: Queue full")
+            if not self._pending:
+                self._first_at = time.monotonic()
+            self._pending.append((topic, on_delivery))
+
+    def _send_batch(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            time.sleep(self.rtt)  # один round-trip на батч
+            with self._lock:
+                self._ready.extend(batch)
+
+    def poll(self, timeout: float = 0) -> int:
+        if self._pending and time.monotonic() - self._first_at >= self.linger:
+            self._send_batch()
+        elif timeout:
+            time.sleep(min(timeout, self.linger))
+        with self._lock:
+            ready, self._ready = self._ready, []
+        for topic, callback in ready:
+            if callback:
+                callback(None, StandInMessage(topic))
+        return len(ready)
+
+    def flush(self, timeout: float = -1) -> int:
+        self._send_batch()
+        self.poll(0)
+        return len(self)
+
+    def __len__(self):
+        return len(self._pending) + len(self._ready)
+
+
+def payload(i: int) -> str:
+    return json.dumps({"task_name": f"user {i}", "email": f"user{i}@example.com",
+                       "subject": "Уведомление о регистрации", "body": "bench"})
+
+
+def flush_per_message(producer, topic: str, messages: int) -> float:
+    started = time.perf_counter()
+    for i in range(messages):
+        producer.produce(topic=topic, value=payload(i))
+        producer.flush(1.0)
+    return time.perf_counter() - started
+
+
+def batched(producer, topic: str, messages: int, flush_timeout: float) -> tuple[float, float, int]:
+    delivered = 0
+
+    def on_delivery(err, msg):
+        nonlocal delivered
+        if err is None:
+            delivered += 1
+
+    started = time.perf_counter()
+    for i in range(messages):
+        producer.produce(topic=topic, value=payload(i), on_delivery=on_delivery)
+    enqueued = time.perf_counter() - started
+    producer.flush(flush_timeout)
+    return enqueued, time.perf_counter() - started, delivered
+
+
+def main(messages: int, rtt_ms: float, bootstrap: str | None):
+    settings = get_settings()
+    topic = settings.KAFKA_EMAIL_TOPIC
+    if bootstrap:
+        factory = Producer
+        settings = settings.model_copy(update={"KAFKA_BOOTSTRAP_SERVERS": bootstrap})
+        old = Producer({"bootstrap.servers": bootstrap})
+    else:
+        factory = lambda conf: StandInProducer(conf, rtt_ms / 1000)
+        old = StandInProducer({}, rtt_ms / 1000)
+
+    old_seconds = flush_per_message(old, topic, messages)
+    enqueued, total, delivered = batched(factory(producer_config(settings)), topic, messages, settings.KAFKA_FLUSH_TIMEOUT)
+
+    print(f"flush per message  {messages / old_seconds:10.0f} msg/s  ({old_seconds * 1000 / messages:.3f} ms per send)")
+    print(f"batch + one flush  {messages / total:10.0f} msg/s  ({enqueued * 1e6 / messages:.1f} us per send, "
+          f"delivered {delivered})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--rtt-ms", type=float, default=1.0, help="round-trip StandInProducer")
+    parser.add_argument("--bootstrap", default=None)
+    args = parser.parse_args()
+    main(args.messages, args.rtt_ms, args.bootstrap)
@@ -0,0 +1,75 @@
+"""Сериализация списка задач: путь response_model + JSONResponse против rows_response (orjson).
+
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_serialization --sizes 1000 10000 100000 --repeat 5
+
+Базовый путь повторяет то, что FastAPI делает для response_model=list[TaskOut]:
+валидация строк в модели, dump в json-режиме (с serialize_deadline) и json.dumps
+в JSONResponse. Строки — Row из projection-режима репозитория.
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from api.responses import rows_response
+from db.Base import Base
+from models.models import Task, User
+from repository.task_Repository import SQLTasksRepository
+from schemas.schemas import TaskOut
+
+tasks_adapter = TypeAdapter(list[TaskOut])
+
+
+def load_rows(size: int):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id=1, name="Bench", email="bench@example.com", password_hash="x"))
+        start = datetime(2025, 1, 1)
+        session.execute(insert(Task), [
+            {"title": f"task {i}", "description": "bench", "is_done": i % 2 == 0,
+             "owner_id": 1, "deadline": start + timedelta(minutes=i) if i % 5 else None}
+            for i in range(size)
+        ])
+        return SQLTasksRepository(session).get_user_tasks(1, projection=True)
+
+
+def default_path(rows) -> bytes:
+    tasks = tasks_adapter.validate_python(rows, from_attributes=True)
+    return JSONResponse(tasks_adapter.dump_python(tasks, mode="json")).body
+
+
+def fast_path(rows) -> bytes:
+    return rows_response(rows, TaskOut).body
+
+
+def best_of(func, rows, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(rows)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(sizes: list[int], repeat: int):
+    for size in sizes:
+        rows = load_rows(size)
+        assert json.loads(default_path(rows)) == json.loads(fast_path(rows))
+        default = best_of(default_path, rows, repeat)
+        fast = best_of(fast_path, rows, repeat)
+        print(f"{size:>7} tasks  default {default * 1000:9.2f} ms  fast {fast * 1000:9.2f} ms  x{default / fast:5.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
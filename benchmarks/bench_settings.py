@@ -0,0 +1,68 @@
+"""Латентность аутентифицированного запроса: Settings() на запрос против закэшированных.
+
+    python -m benchmarks.bench_settings
+    python -m benchmarks.bench_settings --requests 5000
+
+Запросы GET /tasks/{id} идут в приложение in-process через ASGI-транспорт httpx;
+сервис задач подменён заглушкой, чтобы в замер не попадала БД. Режим «uncached»
+возвращает зависимости get_settings новый Settings() на каждый вызов — так
+приложение работало до кэширования.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from types import SimpleNamespace
+
+import httpx
+
+from api.dependencies import tasks_service
+from api.jwt_utils import create_access_token
+from main import app
+from settings import Settings, get_settings
+
+
+class StubTasksService:
+    async def get_task(self, task_id: int):
+        return SimpleNamespace(id=task_id, title="bench", description="bench", is_done=False, owner_id=1, deadline=None)
+
+
+async def run(requests: int) -> list[float]:
+    token = create_access_token(user_id=1, settings=get_settings())
+    transport = httpx.ASGITransport(app=app)
+    latencies = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench",
+                                 headers={"Authorization": f"Bearer {token}"}) as client:
+        for i in range(requests):
+            started = time.perf_counter()
+            r = await client.get(f"/tasks/{i + 1}")
+            latencies.append(time.perf_counter() - started)
+            r.raise_for_status()
+    return latencies
+
+
+def report(label: str, latencies: list[float]) -> float:
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"{label:<9} p50 {p50:7.3f} ms  p99 {p99:7.3f} ms")
+    return p50
+
+
+def main(requests: int):
+    app.dependency_overrides[tasks_service] = StubTasksService
+    try:
+        app.dependency_overrides[get_settings] = lambda: Settings()
+        uncached = report("uncached", asyncio.run(run(requests)))
+        del app.dependency_overrides[get_settings]
+        cached = report("cached", asyncio.run(run(requests)))
+    finally:
+        app.dependency_overrides.clear()
+    print(f"p50 speedup x{uncached / cached:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.requests)
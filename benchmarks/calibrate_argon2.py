@@ -0,0 +1,72 @@
+"""Подбор параметров argon2 под целевую латентность verify на текущей машине.
+
+    python -m benchmarks.calibrate_argon2 --target-ms 250
+    python -m benchmarks.calibrate_argon2 --target-ms 100 --memory 19456 65536 --parallelism 2
+
+Для каждого memory_cost увеличивает time_cost, пока медиана verify укладывается
+в цель, и печатает таблицу и строки для .env (ARGON2_*). Рекомендуется вариант
+с наибольшей работой (memory_cost * time_cost) в пределах цели. Запускать на том
+же железе, что и API, при типичной фоновой нагрузке.
+"""
+import argparse
+import statistics
+import time
+
+from argon2 import PasswordHasher
+
+PASSWORD = "CalibrationPass1"
+
+
+def verify_ms(memory_cost: int, time_cost: int, parallelism: int, repeat: int) -> float:
+    hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+    password_hash = hasher.hash(PASSWORD)
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        hasher.verify(password_hash, PASSWORD)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def calibrate(memory_cost: int, parallelism: int, target_ms: float, repeat: int, max_time_cost: int):
+    """Наибольший time_cost, при котором verify не дольше target_ms, и его латентность."""
+    best = None
+    for time_cost in range(1, max_time_cost + 1):
+        latency = verify_ms(memory_cost, time_cost, parallelism, repeat)
+        if latency > target_ms:
+            break
+        best = (time_cost, latency)
+    return best
+
+
+def main(target_ms: float, memory: list[int], parallelism: int, repeat: int, max_time_cost: int):
+    print(f"target verify latency: {target_ms:.0f} ms, parallelism {parallelism}")
+    candidates = []
+    for memory_cost in memory:
+        found = calibrate(memory_cost, parallelism, target_ms, repeat, max_time_cost)
+        if found is None:
+            print(f"memory {memory_cost:>7} KiB  too slow even with time_cost=1")
+            continue
+        time_cost, latency = found
+        print(f"memory {memory_cost:>7} KiB  time_cost {time_cost:>2}  verify {latency:7.1f} ms")
+        candidates.append((memory_cost * time_cost, memory_cost, time_cost))
+
+    if not candidates:
+        print("no parameters fit the target; raise --target-ms or lower --memory")
+        return
+    _, memory_cost, time_cost = max(candidates)
+    print("\nrecommended:")
+    print(f"ARGON2_TIME_COST={time_cost}")
+    print(f"ARGON2_MEMORY_COST={memory_cost}")
+    print(f"ARGON2_PARALLELISM={parallelism}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--memory", type=int, nargs="+", default=[19456, 47104, 65536, 131072], help="memory_cost, KiB")
+    parser.add_argument("--parallelism", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-time-cost", type=int, default=10)
+    args = parser.parse_args()
+    main(args.target_ms, args.memory, args.parallelism, args.repeat, args.max_time_cost)
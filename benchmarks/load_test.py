@@ -0,0 +1,80 @@
+"""Нагрузочный бенчмарк API: requests/sec и p50/p99 латентность.
+
+Сравнение sync и async стека — запустить API дважды и прогнать один и тот же сценарий:
+
+    DB_ASYNC=0 uvicorn main:app --workers 1 --port 8000
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --concurrency 64 --duration 30
+
+    DB_ASYNC=1 uvicorn main:app --workers 1 --port 8000
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --concurrency 64 --duration 30
+
+Скрипт сам регистрирует пользователя, логинится, создаёт несколько задач и затем
+гоняет смесь запросов GET /tasks/{id} и GET /tasks/all/.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+async def prepare(client: httpx.AsyncClient, tasks: int) -> tuple[dict, list[int]]:
+    email = f"bench-{uuid.uuid4().hex[:12]}@example.com"
+    password = "BenchPass1"
+    r = await client.post("/users/create", json={"name": "Bench", "email": email, "password_hash": password})
+    r.raise_for_status()
+    r = await client.post("/auth/login", json={"email": email, "password": password})
+    r.raise_for_status()
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    task_ids = []
+    for i in range(tasks):
+        r = await client.post("/tasks/", json={"title": f"bench {i}", "description": "bench"}, headers=headers)
+        r.raise_for_status()
+        task_ids.append(r.json()["id"])
+    return headers, task_ids
+
+
+async def worker(client, headers, task_ids, deadline, latencies, errors):
+    i = 0
+    while time.perf_counter() < deadline:
+        path = "/tasks/all/" if i % 2 else f"/tasks/{task_ids[i % len(task_ids)]}"
+        start = time.perf_counter()
+        try:
+            r = await client.get(path, headers=headers)
+            if r.status_code != 200:
+                errors.append(r.status_code)
+        except httpx.HTTPError as exc:
+            errors.append(type(exc).__name__)
+        latencies.append(time.perf_counter() - start)
+        i += 1
+
+
+async def main(url: str, concurrency: int, duration: float, tasks: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        headers, task_ids = await prepare(client, tasks)
+        latencies: list[float] = []
+        errors: list = []
+        deadline = time.perf_counter() + duration
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client, headers, task_ids, deadline, latencies, errors) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1000
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1000
+    print(f"requests: {len(latencies)}  errors: {len(errors)}")
+    print(f"rps: {len(latencies) / elapsed:.1f}  p50: {p50:.2f} ms  p99: {p99:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--tasks", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, args.concurrency, args.duration, args.tasks))
@@ -0,0 +1,93 @@
+import threading
+import time
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from metrics import metrics
+
+
+class PoolWaitStats:
+    """Counts pool checkouts and the time spent waiting for a free connection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            if seconds > self.wait_max:
+                self.wait_max = seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            avg = self.wait_total / self.checkouts if self.checkouts else 0.0
+            return {
+                "checkouts": self.checkouts,
+                "wait_total_ms": round(self.wait_total * 1000, 3),
+                "wait_avg_ms": round(avg * 1000, 3),
+                "wait_max_ms": round(self.wait_max * 1000, 3),
+            }
+
+
+class _TimedPoolMixin:
+    wait_stats: PoolWaitStats
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.wait_stats.record(time.perf_counter() - start)
+
+    def recreate(self):
+        # engine.dispose() пересоздаёт пул — статистику переносим
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_status(engine) -> dict:
+    """Current state of the engine pool: size, checked out, overflow and wait time."""
+    pool = engine.pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+        )
+    stats = getattr(pool, "wait_stats", None)
+    if stats is not None:
+        status.update(stats.snapshot())
+    return status
+
+
+def register_pool_metrics(engines: dict) -> None:
+    """Export pool_status() of the given engines (name -> engine or None) as gauges."""
+    def collect(field: str, scale: float = 1.0):
+        def read():
+            values = {}
+            for name, engine in engines.items():
+                if engine is not None:
+                    value = pool_status(engine).get(field)
+                    if value is not None:
+                        values[(name,)] = value * scale
+            return values
+        return read
+
+    metrics.callback("db_pool_checked_out", "Connections checked out of the pool.", collect("checked_out"), ("engine",))
+    metrics.callback("db_pool_overflow", "Overflow connections above pool_size.", collect("overflow"), ("engine",))
+    metrics.callback("db_pool_checkouts", "Pool checkouts.", collect("checkouts"), ("engine",), type="counter")
+    metrics.callback("db_pool_wait_seconds", "Time spent waiting for a free connection.",
+                     collect("wait_total_ms", 0.001), ("engine",), type="counter")
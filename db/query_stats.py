@@ -0,0 +1,65 @@
+import contextvars
+import time
+from collections import Counter
+from contextlib import contextmanager
+from sqlalchemy import event
+from metrics import metrics
+
+DB_QUERY_SECONDS = metrics.histogram("db_query_duration_seconds", "SQL statement execution time.")
+
+
+class QueryUsage:
+    """Statements executed and time spent in the DB while handling one request.
+
+    With ``record=True`` every statement is kept with its duration (profiling mode).
+    """
+
+    __slots__ = ("count", "seconds", "statements")
+
+    def __init__(self, record: bool = False):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements: list[tuple[str, float]] | None = [] if record else None
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        """Statements executed at least ``threshold`` times — the usual sign of an N+1 loop."""
+        counts = Counter(statement for statement, _ in self.statements or ())
+        return {statement: n for statement, n in counts.items() if n >= threshold}
+
+
+# изменяемый объект, а не число: запросы из threadpool и greenlet'ов async-движка
+# видят копию контекста, но пишут в тот же QueryUsage
+current_usage: contextvars.ContextVar[QueryUsage | None] = contextvars.ContextVar("query_usage", default=None)
+
+
+@contextmanager
+def track_usage(record: bool = False):
+    usage = QueryUsage(record)
+    token = current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        current_usage.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._query_started
+    DB_QUERY_SECONDS.observe(elapsed)
+    usage = current_usage.get()
+    if usage is not None:
+        usage.count += 1
+        usage.seconds += elapsed
+        if usage.statements is not None:
+            usage.statements.append((statement, elapsed))
+
+
+def instrument_engine(engine):
+    """Count and time every statement of ``engine`` (sync Engine or the sync side of an AsyncEngine)."""
+    target = getattr(engine, "sync_engine", engine)
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+    return engine
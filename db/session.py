@@ -1,14 +1,76 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from settings import Settings
+from sqlalchemy.pool import NullPool
+from db.pool_stats import PoolWaitStats, TimedAsyncQueuePool, TimedQueuePool, register_pool_metrics
+from db.query_stats import instrument_engine
+from settings import get_settings
+
+# движки строятся один раз: reload_settings() на пул и DB_ASYNC не влияет
+settings = get_settings()
+
+
+def _engine_options(poolclass) -> dict:
+    if settings.DB_PGBOUNCER:
+        # соединения пулит PgBouncer, держать свой пул поверх него незачем
+        return {"echo": settings.DB_ECHO, "poolclass": NullPool}
+    return {
+        "echo": settings.DB_ECHO,
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+
+def _attach_wait_stats(engine):
+    if not settings.DB_PGBOUNCER:
+        engine.pool.wait_stats = PoolWaitStats()
+    return engine
+
+
+# values_plus_batch: executemany UPDATE/DELETE (bulk-эндпоинты) идут пачками execute_batch,
+# а не отдельным round trip на строку; INSERT и так батчится через insertmanyvalues
+engine = instrument_engine(_attach_wait_stats(create_engine(
+    settings.db_url, future=True, executemany_mode="values_plus_batch", **_engine_options(TimedQueuePool)
+)))
+# expire_on_commit=False: объект после commit отдаётся в ответ как есть, без повторного SELECT
+SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, expire_on_commit=False, future=True)
+
+# async-движок создаём только при DB_ASYNC=1, чтобы asyncpg не был обязателен для sync-режима
+async_engine = None
+AsyncSessionLocal = None
+if settings.DB_ASYNC:
+    connect_args = {}
+    if settings.DB_PGBOUNCER:
+        # transaction pooling не переживает именованные prepared statements asyncpg
+        connect_args = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+    async_engine = instrument_engine(_attach_wait_stats(
+        create_async_engine(settings.async_db_url, connect_args=connect_args, **_engine_options(TimedAsyncQueuePool))
+    ))
+    # expire_on_commit=False: после commit ORM-объекты читаются без ленивых SELECT вне greenlet
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+register_pool_metrics({"sync": engine, "async": async_engine})
 
-settings = Settings()
-engine = create_engine(settings.db_url, echo=True, future=True)
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database is disabled: set DB_ASYNC=1")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def dispose_engines():
+    """Close pooled connections on application shutdown."""
+    engine.dispose()
+    if async_engine is not None:
+        await async_engine.dispose()
@@ -1,8 +1,14 @@
+import atexit
+import contextvars
 import logging
 import logging.handlers
 import os
+import queue
+import threading
 from pathlib import Path
+import orjson
 from dotenv import load_dotenv
+from metrics import metrics
 
 load_dotenv()
 
@@ -12,36 +18,156 @@ numeric_level = getattr(logging, LOGLEVEL, logging.INFO)
 # флаги окружения
 TESTING = os.getenv("TESTING") == "1"
 LOG_TO_FILE = os.getenv("LOG_TO_FILE", "1") == "1"  # выключить файловый логгер без кода
+# запись в консоль/файл в отдельном потоке; 0 — писать прямо из потока запроса
+LOG_ASYNC = os.getenv("LOG_ASYNC", "1") == "1"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# text — строки для чтения глазами, json — по записи на строку для сборщиков логов
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
 
+# id текущего запроса; выставляет RequestContextMiddleware
+request_id_var: contextvars.ContextVar[str | None] = contextvars.ContextVar("request_id", default=None)
+
+# атрибуты, которые есть у любой LogRecord; всё остальное пришло через extra=
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the id of the request being handled ("-" outside requests)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; fields passed via ``extra=`` are included as is."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
 
-logger = logging.getLogger()
-if not logger.handlers:
-    logger.setLevel(numeric_level)
 
-    formatter = logging.Formatter(
-        "%(asctime)s | %(levelname)s | %(name)s | %(filename)s:%(lineno)d | %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S",
-    )
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler for a bounded queue: never blocks the caller,
+    records that do not fit are counted and dropped."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+class DrainingQueueListener(logging.handlers.QueueListener):
+    """QueueListener whose stop() waits for room in a full queue instead of failing."""
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+def _build_handlers(log_path: Path | None, log_format: str = LOG_FORMAT) -> list[logging.Handler]:
+    if log_format == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            "%(asctime)s | %(levelname)s | %(request_id)s | %(name)s | %(filename)s:%(lineno)d | %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S",
+        )
 
     # консоль всегда есть
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    handlers = [console_handler]
 
-    # файловый — только если НЕ тесты и разрешено флагом
-    if not TESTING and LOG_TO_FILE:
+    if log_path is not None:
         # кроссплатформенный путь + автосоздание каталога
-        log_path = Path(os.getenv("LOG_FILE", "logs/app.log")).expanduser().resolve()
         log_path.parent.mkdir(parents=True, exist_ok=True)
         try:
             file_handler = logging.handlers.RotatingFileHandler(
                 log_path, maxBytes=5 * 1024 * 1024, backupCount=3, encoding="utf-8"
             )
             file_handler.setFormatter(formatter)
-            logger.addHandler(file_handler)
+            handlers.append(file_handler)
         except OSError:
             # если вдруг нет прав/пути — не падаем, а логируем в консоль
-            logger.warning("File logging disabled: cannot open %s", log_path)
+            logging.getLogger(__name__).warning("File logging disabled: cannot open %s", log_path)
+    return handlers
+
+
+def _install(root: logging.Logger, handlers: list[logging.Handler], use_queue: bool, queue_size: int = LOG_QUEUE_SIZE):
+    """Attach handlers to ``root`` directly or behind a bounded queue; returns (queue handler, listener)."""
+    # request_id читается в потоке, где пишется запись, — до очереди
+    if not use_queue:
+        for handler in handlers:
+            handler.addFilter(RequestIdFilter())
+            root.addHandler(handler)
+        return None, None
+    queue_handler = DroppingQueueHandler(queue.Queue(queue_size))
+    queue_handler.addFilter(RequestIdFilter())
+    listener = DrainingQueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    root.addHandler(queue_handler)
+    return queue_handler, listener
+
+
+queue_handler: DroppingQueueHandler | None = None
+listener: logging.handlers.QueueListener | None = None
+
+logger = logging.getLogger()
+if not logger.handlers:
+    logger.setLevel(numeric_level)
+    # файловый — только если НЕ тесты и разрешено флагом
+    log_path = None
+    if not TESTING and LOG_TO_FILE:
+        log_path = Path(os.getenv("LOG_FILE", "logs/app.log")).expanduser().resolve()
+    queue_handler, listener = _install(logger, _build_handlers(log_path), LOG_ASYNC)
+
+
+def stop_logging() -> None:
+    """Drain the log queue and stop the writer thread (on shutdown)."""
+    global listener
+    if listener is not None:
+        listener.stop()
+        listener = None
+
+
+def logging_stats() -> dict:
+    if queue_handler is None:
+        return {"async": False}
+    return {
+        "async": True,
+        "queue_size": queue_handler.queue.maxsize,
+        "queue_depth": queue_handler.queue.qsize(),
+        "dropped": queue_handler.dropped,
+    }
+
+
+metrics.callback("log_queue_depth", "Log records waiting to be written.",
+                 lambda: queue_handler.queue.qsize() if queue_handler is not None else None)
+metrics.callback("log_records_dropped", "Log records dropped because the queue was full.",
+                 lambda: queue_handler.dropped if queue_handler is not None else None, type="counter")
+
+atexit.register(stop_logging)
 
 def get_logger(name: str):
     return logging.getLogger(name)
@@ -1,17 +1,57 @@
 # main.py
+import asyncio
+import signal
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 from api.exceptions_handlers import register_exception_handlers
+from api.middleware import RequestContextMiddleware
 from api.router import api_router
+from api.responses import FastJSONResponse
 from db.init_db import init_db
+from db.session import dispose_engines
 from logger.logger import get_logger
+from settings import reload_settings
 
 logger = get_logger(__name__)
 
-app = FastAPI(title="ToDo API")
+
+def _reload_settings_on_sighup():
+    reload_settings()
+    logger.info("Settings перечитаны по SIGHUP.")
+
+
+def _install_sighup(loop: asyncio.AbstractEventLoop) -> bool:
+    # обработчик через цикл событий, а не signal.signal: он выполняется как обычный
+    # callback между задачами и не прерывает код, держащий threading.Lock (кеш токенов)
+    if not hasattr(signal, "SIGHUP"):
+        return False
+    try:
+        loop.add_signal_handler(signal.SIGHUP, _reload_settings_on_sighup)
+    except (NotImplementedError, RuntimeError):
+        # цикл не в главном потоке (TestClient) или платформа без поддержки
+        return False
+    return True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop = asyncio.get_running_loop()
+    sighup = _install_sighup(loop)
+    yield
+    if sighup:
+        loop.remove_signal_handler(signal.SIGHUP)
+    # закрыть пулы БД; события Kafka досылает outbox relay, а не API
+    await dispose_engines()
+    logger.info("ToDo API остановлен.")
+
+
+app = FastAPI(title="ToDo API", default_response_class=FastJSONResponse, lifespan=lifespan)
 app.mount("/home", StaticFiles(directory="home", html=True), name="home")
 app.include_router(api_router)
 register_exception_handlers(app)
+app.add_middleware(RequestContextMiddleware)
+
 
 logger.info("ToDo API запущен.")
 for r in app.routes:
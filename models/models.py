@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import UUID, Boolean, Column, DateTime, ForeignKey, Integer, String, UniqueConstraint, func
+from sqlalchemy import JSON, UUID, BigInteger, Boolean, Column, DateTime, ForeignKey, Index, Integer, String, UniqueConstraint, func, text
 from sqlalchemy.orm import relationship
 
 from db.Base import Base
@@ -12,10 +12,23 @@ class User(Base):
     name = Column(String(100), nullable=False)
     email = Column(String(255), nullable=False, index=True)
     password_hash = Column(String(255), nullable=False)
+    # растёт при каждом изменении задач пользователя — из него строится ETag списков и задач
+    tasks_version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    tasks_updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     tasks = relationship("Task", back_populates="user")  # связь «один ко многим»
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_owner_id_id", "owner_id", "id"),  # keyset-пагинация списков пользователя
+        Index("ix_tasks_owner_id_is_done", "owner_id", "is_done", "id"),
+        Index("ix_tasks_owner_id_deadline", "owner_id", "deadline"),
+        Index(
+            "ix_tasks_owner_id_open", "owner_id", "id",
+            postgresql_where=text("is_done = false"),
+            sqlite_where=text("is_done = false"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -35,4 +48,29 @@ class RefreshSession(Base):
     token_hash = Column(String(64), nullable=False, unique=True, index=True)  # sha256 = 64 hex chars
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     expires_at = Column(DateTime(timezone=True), nullable=False)
-    revoked_at = Column(DateTime(timezone=True), nullable=True)
\ No newline at end of file
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class OutboxEvent(Base):
+    """Событие для Kafka, записанное в одной транзакции с изменением данных.
+
+    Строки забирает services.outbox_relay и удаляет после подтверждённой доставки.
+    """
+    __tablename__ = "outbox"
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    topic = Column(String(255), nullable=False)
+    key = Column(String(255), nullable=True)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
+class ProcessedEvent(Base):
+    """event_id уже доставленных писем: повторно пришедшее событие пропускается.
+
+    Строки старше EMAIL_DEDUP_TTL_HOURS удаляет email-consumer.
+    """
+    __tablename__ = "processed_events"
+
+    event_id = Column(String(64), primary_key=True)
+    processed_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
@@ -1,6 +1,6 @@
 from models.models import RefreshSession
 from repository.auth_exceptions import auth_exceptions_trap
-from repository.repository import AbstractRepositoryAuth
+from repository.repository import AbstractRepositoryAuth, AsyncRepositoryAdapter
 
 class SQLAuthRepository(AbstractRepositoryAuth):
     model = RefreshSession
@@ -26,4 +26,8 @@ class SQLAuthRepository(AbstractRepositoryAuth):
 
     @auth_exceptions_trap
     def jti_check(self, jti: str):
-        return self.db.query(self.model).filter(self.model.token_hash == jti, self.model.revoked_at == None).first()
\ No newline at end of file
+        return self.db.query(self.model).filter(self.model.token_hash == jti, self.model.revoked_at == None).first()
+
+
+class AsyncSQLAuthRepository(AsyncRepositoryAdapter):
+    sync_repository = SQLAuthRepository
@@ -0,0 +1,25 @@
+from sqlalchemy import delete, select
+from models.models import OutboxEvent
+from repository.repository import AbstractRepositoryOutbox
+
+class SQLOutboxRepository(AbstractRepositoryOutbox):
+    model = OutboxEvent
+
+    def __init__(self, db):
+        self.db = db
+
+    def claim_batch(self, limit: int) -> list[OutboxEvent]:
+        # SKIP LOCKED: несколько relay-воркеров разбирают outbox, не дожидаясь друг друга;
+        # блокировки держатся до commit/rollback вызывающего
+        query = (
+            select(self.model)
+            .order_by(self.model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return list(self.db.scalars(query))
+
+    def delete(self, ids: list[int]) -> int:
+        if not ids:
+            return 0
+        return self.db.execute(delete(self.model).where(self.model.id.in_(ids))).rowcount
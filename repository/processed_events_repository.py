@@ -0,0 +1,31 @@
+from datetime import datetime
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models.models import ProcessedEvent
+from repository.repository import AbstractRepositoryProcessedEvents
+
+class SQLProcessedEventsRepository(AbstractRepositoryProcessedEvents):
+    model = ProcessedEvent
+
+    def __init__(self, db):
+        self.db = db
+
+    def seen(self, event_ids: list[str]) -> set[str]:
+        if not event_ids:
+            return set()
+        query = select(self.model.event_id).where(self.model.event_id.in_(event_ids))
+        return set(self.db.scalars(query))
+
+    def mark(self, event_ids: list[str]) -> None:
+        if not event_ids:
+            return
+        # повторная отметка (гонка реплик после ребалансировки) — не ошибка
+        insert = pg_insert if self.db.get_bind().dialect.name == "postgresql" else sqlite_insert
+        self.db.execute(
+            insert(self.model).on_conflict_do_nothing(index_elements=[self.model.event_id]),
+            [{"event_id": event_id} for event_id in event_ids],
+        )
+
+    def delete_older_than(self, moment: datetime) -> int:
+        return self.db.execute(delete(self.model).where(self.model.processed_at < moment)).rowcount
@@ -1,3 +1,4 @@
+import inspect
 from abc import ABC, abstractmethod
 
 class AbstractRepositoryTask(ABC):
@@ -28,6 +29,30 @@ class AbstractRepositoryTask(ABC):
     @abstractmethod
     def del_task():
         raise NotImplementedError
+
+    @abstractmethod
+    def get_tasks_version():
+        raise NotImplementedError
+
+    @abstractmethod
+    def stream_user_tasks():
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_many():
+        raise NotImplementedError
+
+    @abstractmethod
+    def import_many():
+        raise NotImplementedError
+
+    @abstractmethod
+    def up_many():
+        raise NotImplementedError
+
+    @abstractmethod
+    def del_many():
+        raise NotImplementedError
     
     
 class AbstractRepositoryUser(ABC):
@@ -43,6 +68,38 @@ class AbstractRepositoryUser(ABC):
     def login_check():
         raise NotImplementedError
 
+    @abstractmethod
+    def update_password_hash():
+        raise NotImplementedError
+
+    @abstractmethod
+    def end_read():
+        raise NotImplementedError
+
+
+class AbstractRepositoryOutbox(ABC):
+    @abstractmethod
+    def claim_batch():
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete():
+        raise NotImplementedError
+
+
+class AbstractRepositoryProcessedEvents(ABC):
+    @abstractmethod
+    def seen():
+        raise NotImplementedError
+
+    @abstractmethod
+    def mark():
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_older_than():
+        raise NotImplementedError
+
 
 class AbstractRepositoryAuth(ABC):
     @abstractmethod
@@ -55,4 +112,26 @@ class AbstractRepositoryAuth(ABC):
 
     @abstractmethod
     def jti_check():
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
+
+
+class AsyncRepositoryAdapter:
+    """Async variant of a sync SQL repository.
+
+    Every repository method is executed through ``AsyncSession.run_sync``:
+    the query code is shared with the sync repository, while IO goes through
+    the async driver instead of blocking a threadpool worker.
+    """
+    sync_repository = None
+
+    def __init__(self, db):
+        self.db = db
+
+    def __getattr__(self, name):
+        attr = getattr(self.sync_repository, name)
+        if not inspect.isfunction(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            return await self.db.run_sync(lambda session: attr(self.sync_repository(session), *args, **kwargs))
+        return call
@@ -1,11 +1,17 @@
+import io
 from datetime import datetime, timedelta
-from models.models import Task
-from repository.repository import AbstractRepositoryTask
+import psycopg2
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.exc import DBAPIError
+from models.models import Task, User
+from repository.repository import AbstractRepositoryTask, AsyncRepositoryAdapter
 from repository.task_exceptions import TaskNotFoundRepo, task_exceptions_trap
 from repository.user_exceptions import UserNotFoundRepo
 
 class SQLTasksRepository(AbstractRepositoryTask):
     model = Task
+    # колонки TaskOut/TasksToOwner: projection-режим списков отдаёт только их
+    list_columns = (Task.id, Task.title, Task.description, Task.is_done, Task.owner_id, Task.deadline)
 
     def __init__(self, db):
             self.db = db
@@ -19,8 +25,8 @@ class SQLTasksRepository(AbstractRepositoryTask):
     def add_one(self, task: dict):
         new_task = self.model(**task) 
         self.db.add(new_task)
+        self._touch_owner(new_task.owner_id)
         self.db.commit()
-        self.db.refresh(new_task)
         return new_task
     
     @task_exceptions_trap
@@ -38,20 +44,32 @@ class SQLTasksRepository(AbstractRepositoryTask):
         self,    
         user_id: int, 
         check: bool | None = None,
-        deadline: datetime | None = None
+        deadline: datetime | None = None,
+        after: int | None = None,
+        limit: int | None = None,
+        projection: bool = False
     ):        
-        query = self.db.query(self.model).filter(self.model.owner_id == user_id)
+        # projection=True — read-only Row вместо ORM-объектов: без identity map, отслеживания состояния и relationship
+        entities = self.list_columns if projection else (self.model,)
+        query = self.db.query(*entities).filter(self.model.owner_id == user_id)
         
         if query == None:
             raise UserNotFoundRepo
         
         if check is not None:
-            query = self.db.query(self.model).filter(self.model.is_done == check)
+            query = query.filter(self.model.is_done == check)
 
         if deadline is not None:
             start = deadline
             end = deadline + timedelta(minutes=1)
-            query = self.db.query(self.model).filter(self.model.deadline >= start, self.model.deadline < end)
+            query = query.filter(self.model.deadline >= start, self.model.deadline < end)
+
+        # keyset-пагинация: страница начинается строго после последнего id предыдущей
+        if after is not None:
+            query = query.filter(self.model.id > after)
+        query = query.order_by(self.model.id)
+        if limit is not None:
+            query = query.limit(limit)
 
         task = query.all()
         return task
@@ -63,8 +81,8 @@ class SQLTasksRepository(AbstractRepositoryTask):
             raise TaskNotFoundRepo
         for field, value in data.items():
             setattr(task, field, value)
+        self._touch_owner(task.owner_id)
         self.db.commit()
-        self.db.refresh(task)
         return task
     
     @task_exceptions_trap
@@ -73,5 +91,137 @@ class SQLTasksRepository(AbstractRepositoryTask):
         if task is None:
             raise TaskNotFoundRepo
         self.db.delete(task)
+        self._touch_owner(task.owner_id)
+        self.db.commit()
+        return task
+
+    @task_exceptions_trap
+    def add_many(self, tasks: list[dict]):
+        """Insert tasks of one owner with a single executemany; returns rows in input order."""
+        # порядок строк RETURNING = порядок входа; на SQLite такой запрос не батчится,
+        # зато rowid выдаются по порядку VALUES — там достаточно отсортировать по id
+        ordered = self.db.get_bind().dialect.name != "sqlite"
+        rows = self.db.execute(
+            insert(self.model).returning(*self.list_columns, sort_by_parameter_order=ordered), tasks
+        ).all()
+        if not ordered:
+            rows.sort(key=lambda row: row.id)
+        self._touch_owner(tasks[0]["owner_id"])
+        self.db.commit()
+        return rows
+
+    @task_exceptions_trap
+    def import_many(self, tasks: list[dict]) -> int:
+        """Insert tasks of one owner without reading them back; COPY on psycopg2."""
+        # is_done=None -> False, как default модели при ORM-вставке; остальные None остаются NULL
+        tasks = [{**task, "is_done": bool(task.get("is_done"))} for task in tasks]
+        if self.db.get_bind().dialect.driver == "psycopg2":
+            self._copy_tasks(tasks)
+        else:
+            # Core-insert без RETURNING: одинаковый набор колонок у всех строк даёт один
+            # executemany (insertmanyvalues), ORM-insert разбил бы пачку по None-полям
+            self.db.execute(insert(self.model.__table__), tasks)
+        self._touch_owner(tasks[0]["owner_id"])
+        self.db.commit()
+        return len(tasks)
+
+    def _copy_tasks(self, tasks: list[dict]) -> None:
+        columns = ("title", "description", "is_done", "owner_id", "deadline")
+        buffer = io.StringIO()
+        for task in tasks:
+            buffer.write("\t".join(_copy_value(task.get(column)) for column in columns) + "\n")
+        buffer.seek(0)
+        statement = f"COPY {self.model.__tablename__} ({', '.join(columns)}) FROM STDIN"
+        # тот же connection и транзакция, что у сессии; COPY не проходит через события движка
+        with self.db.connection().connection.cursor() as cursor:
+            try:
+                cursor.copy_expert(statement, buffer)
+            except psycopg2.Error as e:
+                # ошибки драйвера — в исключения SQLAlchemy, как у execute: их разбирает
+                # task_exceptions_trap (нарушение FK -> NotFoundUserForTaskRepo)
+                raise DBAPIError.instance(statement, None, e, psycopg2.Error) from e
+
+    @task_exceptions_trap
+    def up_many(self, owner_id: int, updates: dict[int, dict]):
+        """Update tasks of ``owner_id`` by id in one transaction; returns the updated rows."""
+        self._check_owned(owner_id, updates.keys())
+        changes = [{"id": task_id, **data} for task_id, data in updates.items() if data]
+        if changes:
+            # ORM bulk UPDATE по первичному ключу: executemany, сгруппированный по набору полей
+            self.db.execute(update(self.model), changes)
+            self._touch_owner(owner_id)
+        rows = self.db.execute(
+            select(*self.list_columns).where(self.model.id.in_(updates.keys())).order_by(self.model.id)
+        ).all()
+        self.db.commit()
+        return rows
+
+    @task_exceptions_trap
+    def del_many(self, owner_id: int, task_ids: list[int]):
+        """Delete tasks of ``owner_id``; nothing is deleted if any id is missing or foreign."""
+        self._check_owned(owner_id, task_ids)
+        result = self.db.execute(
+            delete(self.model).where(self.model.id.in_(task_ids), self.model.owner_id == owner_id)
+        )
+        self._touch_owner(owner_id)
         self.db.commit()
-        return task
\ No newline at end of file
+        return result.rowcount
+
+    def _check_owned(self, owner_id: int, task_ids) -> None:
+        # одним запросом; чужие и несуществующие id неотличимы, как в одиночных эндпоинтах
+        wanted = set(task_ids)
+        owned = set(self.db.scalars(
+            select(self.model.id).where(self.model.id.in_(wanted), self.model.owner_id == owner_id)
+        ))
+        if owned != wanted:
+            raise TaskNotFoundRepo({"ids": sorted(wanted - owned)})
+
+    @classmethod
+    def export_query(cls, user_id: int, check: bool | None = None, batch_size: int = 1000):
+        """SELECT of all tasks of a user in id order, fetched ``batch_size`` rows at a time."""
+        query = select(*cls.list_columns).where(cls.model.owner_id == user_id)
+        if check is not None:
+            query = query.where(cls.model.is_done == check)
+        # yield_per включает stream_results: psycopg2/asyncpg читают server-side курсором,
+        # в памяти одновременно не больше одной пачки
+        return query.order_by(cls.model.id).execution_options(yield_per=batch_size)
+
+    def stream_user_tasks(self, user_id: int, check: bool | None = None, batch_size: int = 1000):
+        """Yield the user's tasks as lists of up to ``batch_size`` rows.
+
+        Not trapped: the response is already being sent when a batch fails.
+        """
+        yield from self.db.execute(self.export_query(user_id, check, batch_size)).partitions()
+
+    @task_exceptions_trap
+    def get_tasks_version(self, user_id: int):
+        return self.db.execute(
+            select(User.tasks_version, User.tasks_updated_at).where(User.id == user_id)
+        ).first()
+
+    def _touch_owner(self, owner_id: int) -> None:
+        # в той же транзакции, что и изменение задачи: версия и данные не расходятся
+        self.db.execute(
+            update(User).where(User.id == owner_id)
+            .values(tasks_version=User.tasks_version + 1, tasks_updated_at=func.now())
+        )
+
+
+def _copy_value(value) -> str:
+    # текстовый формат COPY: NULL — \N, спецсимволы экранируются обратным слэшем
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t")
+            .replace("\n", "\\n").replace("\r", "\\r"))
+
+
+class AsyncSQLTasksRepository(AsyncRepositoryAdapter):
+    sync_repository = SQLTasksRepository
+
+    async def stream_user_tasks(self, user_id: int, check: bool | None = None, batch_size: int = 1000):
+        # генератор нельзя выполнить через run_sync целиком — читаем курсор AsyncSession.stream
+        result = await self.db.stream(SQLTasksRepository.export_query(user_id, check, batch_size))
+        async for batch in result.partitions():
+            yield batch
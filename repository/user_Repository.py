@@ -1,6 +1,7 @@
-from models.models import User
+from sqlalchemy import update
+from models.models import OutboxEvent, User
 from repository.user_exceptions import user_exceptions_trap
-from repository.repository import AbstractRepositoryUser
+from repository.repository import AbstractRepositoryUser, AsyncRepositoryAdapter
 
 class SQLUsersRepository(AbstractRepositoryUser):
     model = User
@@ -14,13 +15,30 @@ class SQLUsersRepository(AbstractRepositoryUser):
         return user
     
     @user_exceptions_trap
-    def create_user(self, user_data: dict):
+    def create_user(self, user_data: dict, event: dict | None = None):
         new_user = self.model(**user_data) 
         self.db.add(new_user)
+        if event is not None:
+            # событие в outbox коммитится вместе с пользователем
+            self.db.add(OutboxEvent(**event))
         self.db.commit()
-        self.db.refresh(new_user)
         return new_user
     
     @user_exceptions_trap 
     def login_check(self, email: str):
-        return self.db.query(self.model).filter(self.model.email == email).first()
\ No newline at end of file
+        return self.db.query(self.model).filter(self.model.email == email).first()
+
+    def end_read(self):
+        """Finish the read transaction so its pooled connection is released."""
+        # объекты не истекают (expire_on_commit=False), прочитанный пользователь остаётся доступен
+        self.db.commit()
+
+    @user_exceptions_trap
+    def update_password_hash(self, user_id: int, password_hash: str):
+        result = self.db.execute(update(self.model).where(self.model.id == user_id).values(password_hash=password_hash))
+        self.db.commit()
+        return result.rowcount
+
+
+class AsyncSQLUsersRepository(AsyncRepositoryAdapter):
+    sync_repository = SQLUsersRepository
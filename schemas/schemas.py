@@ -2,6 +2,10 @@
 from datetime import datetime
 from pydantic import BaseModel, EmailStr, Field, field_serializer, field_validator
 
+DEADLINE_FORMAT = "%Y-%m-%d %H:%M"
+# задач в одном запросе к /tasks/bulk
+BULK_MAX_ITEMS = 1000
+
 class LoginData(BaseModel):
     email: str
     password: str
@@ -26,8 +30,14 @@ class TaskCreate(BaseModel):
     @field_validator("deadline", mode="before")
     def parse_deadline(cls, value): 
         if isinstance(value, str):
+            # "YYYY-MM-DD HH:MM" с ведущими нулями: fromisoformat на порядок быстрее strptime (импорт)
+            if len(value) == 16 and value[4] == value[7] == "-" and value[10] == " " and value[13] == ":":
+                try:
+                    return datetime.fromisoformat(value)
+                except ValueError:
+                    pass
             try:
-                return datetime.strptime(value, "%Y-%m-%d %H:%M")
+                return datetime.strptime(value, DEADLINE_FORMAT)
             except ValueError:
                 raise ValueError("Дата должна быть в формате YYYY-MM-DD HH:MM")
         return value
@@ -35,7 +45,8 @@ class TaskCreate(BaseModel):
 class TaskOut(BaseModel):
     id: int
     title: str
-    description: str
+    # колонка nullable, TaskCreate позволяет не передавать описание
+    description: str | None = None
     is_done: bool
     owner_id: int
     deadline: datetime | None = None
@@ -43,20 +54,20 @@ class TaskOut(BaseModel):
     @field_serializer("deadline")
     def serialize_deadline(self, value: datetime | None) -> str | None:
         if value is not None:
-            return value.strftime("%Y-%m-%d %H:%M")
+            return value.strftime(DEADLINE_FORMAT)
         return None
 
 class TasksToOwner(BaseModel):
     id: int
     title: str
-    description: str
+    description: str | None = None
     is_done: bool
     deadline: datetime | None = None
     model_config = {"from_attributes": True}
     @field_serializer("deadline")
     def serialize_deadline(self, value: datetime | None) -> str | None:
         if value is not None:
-            return value.strftime("%Y-%m-%d %H:%M")
+            return value.strftime(DEADLINE_FORMAT)
         return None
 
 class TaskUpdate(BaseModel):
@@ -65,6 +76,18 @@ class TaskUpdate(BaseModel):
     title: str | None = None
     description: str | None = None
 
+class TaskBulkUpdate(TaskUpdate):
+    id: int
+
+class TaskImportError(BaseModel):
+    line: int
+    errors: list[dict]
+
+class TaskImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: list[TaskImportError]
+
 class LoginRequest(BaseModel):
     email: str
     password: str
@@ -1,3 +1,5 @@
+import inspect
+from contextlib import contextmanager
 from repository.auth_exceptions import RefreshSessionNotFoundRepo, NotFoundUserForAuthRepo
 from api.errors import NotFound
 
@@ -10,12 +12,24 @@ class NotFoundUserForAuth(NotFound):
         super().__init__(resource="user", details=details)
 
 
+@contextmanager
+def _translate_auth_errors():
+    try:
+        yield
+    except NotFoundUserForAuthRepo as e:
+        raise NotFoundUserForAuth() from e
+    except RefreshSessionNotFoundRepo as e:
+        raise RefreshSessionNotFound() from e
+
+
 def auth_exceptions_trap(func):
+    if inspect.iscoroutinefunction(func):
+        async def async_wrapper(*args, **kwargs):
+            with _translate_auth_errors():
+                return await func(*args, **kwargs)
+        return async_wrapper
+
     def wrapper(*args, **kwargs):
-        try:
+        with _translate_auth_errors():
             return func(*args, **kwargs)
-        except NotFoundUserForAuthRepo:
-            raise NotFoundUserForAuth(details={"user_id": e.user_id}) from e
-        except RefreshSessionNotFoundRepo as e :
-            raise RefreshSessionNotFound() from e
     return wrapper
\ No newline at end of file
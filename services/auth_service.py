@@ -12,6 +12,7 @@ from services.auth_exceptions import auth_exceptions_trap, NotFoundUserForAuth,
 from repository.repository import AbstractRepositoryAuth, AbstractRepositoryUser
 from api.dto import LoginData as dtoLogin, Token as dtoTokenRefresh, Token as dtoTokenNew
 from services.user_service import UsersService
+from api.concurrency import call_service
 from settings import Settings, get_settings
 from logger.logger import get_logger
 
@@ -25,23 +26,13 @@ class AuthService:
         self.now = datetime.now(timezone.utc)
 
     @auth_exceptions_trap
-    def authenticate(self, loginData: dtoLogin, settings: Settings):
-        user = self.users_service.verify_credentials(loginData)
-        
-
-        access_token = create_access_token(user_id=user["user_id"], settings=settings)
-        refresh_token, jti, payload = create_refresh_token(user_id=user["user_id"], settings=settings)
-        token_new = dtoTokenNew(
-            id=UUID_cls(hex=jti),
-            user_id=user["user_id"],
-            token_hash=sha256(refresh_token.encode("utf-8")).hexdigest(),
-            created_at=self.now,
-            expires_at=self.now + timedelta(minutes=settings.ACCESS_TTL_MINUTES),
-            revoked_at=None,
-        )
-        self.auth_repo.create_session(asdict(token_new))
+    async def authenticate(self, loginData: dtoLogin, settings: Settings):
+        # argon2 ждётся без блокировки потока threadpool, в БД ходит call_service
+        user = await self.users_service.verify_credentials(loginData)
+        tokens, token_new = self._issue_tokens(user["user_id"], settings)
+        await call_service(self.auth_repo.create_session, asdict(token_new))
         logger.info("User authenticated: %s", user["user_id"])
-        return {"access_token": access_token, "refresh_token": refresh_token}
+        return tokens
 
     @auth_exceptions_trap
     def refresh_jti(self, refresh_token: str, settings: Settings) -> None:
@@ -51,17 +42,38 @@ class AuthService:
             raise InputIncorrectPassword()
         user_id = decode_token(token=refresh_token, settings=settings)["sub"]
 
-        new_access_token = create_access_token(user_id=user_id, settings=settings)
-        new_refresh_token, jti, new_payload = create_refresh_token(user_id=user_id, settings=settings)
+        tokens, user_data = self._issue_tokens(user_id, settings)
+        self.auth_repo.refresh_jti(asdict(user_data))
+        logger.info("Refresh succeeded for user: %s", user_id)
+        return tokens
 
-        user_data = dtoTokenRefresh(
+    def _issue_tokens(self, user_id, settings: Settings) -> tuple[dict, dtoTokenNew]:
+        """Build a new access/refresh pair and the refresh session record for it."""
+        access_token = create_access_token(user_id=user_id, settings=settings)
+        refresh_token, jti, payload = create_refresh_token(user_id=user_id, settings=settings)
+        token_new = dtoTokenNew(
             id=UUID_cls(hex=jti),
             user_id=int(user_id),
-            token_hash=sha256(new_refresh_token.encode("utf-8")).hexdigest(),
+            token_hash=sha256(refresh_token.encode("utf-8")).hexdigest(),
             created_at=self.now,
             expires_at=self.now + timedelta(minutes=settings.ACCESS_TTL_MINUTES),
-            revoked_at=None
+            revoked_at=None,
         )
-        self.auth_repo.refresh_jti(asdict(user_data))
+        return {"access_token": access_token, "refresh_token": refresh_token}, token_new
+
+
+class AsyncAuthService(AuthService):
+    """AuthService for DB_ASYNC mode: users service and auth repository are awaited."""
+
+    @auth_exceptions_trap
+    async def refresh_jti(self, refresh_token: str, settings: Settings) -> None:
+        token_hash = sha256(refresh_token.encode("utf-8")).hexdigest()
+        session = await self.auth_repo.jti_check(token_hash)
+        if not session:
+            raise InputIncorrectPassword()
+        user_id = decode_token(token=refresh_token, settings=settings)["sub"]
+
+        tokens, user_data = self._issue_tokens(user_id, settings)
+        await self.auth_repo.refresh_jti(asdict(user_data))
         logger.info("Refresh succeeded for user: %s", user_id)
-        return {"access_token": new_access_token, "refresh_token": new_refresh_token}
\ No newline at end of file
+        return tokens
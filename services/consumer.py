@@ -1,64 +1,215 @@
+"""Email worker: Kafka -> SMTP.
+
+    python -m services.consumer
+
+Реплик можно запускать несколько: партиции KAFKA_EMAIL_TOPIC делятся между ними
+(cooperative-sticky ребалансировка). SIGTERM дорабатывает текущую пачку,
+фиксирует offset'ы и выходит из группы.
+"""
 import json
-from confluent_kafka import Consumer, KafkaException
-import os
-import smtplib
-from email.mime.text import MIMEText
+import signal
+import threading
+import time
+from confluent_kafka import Consumer, KafkaError, KafkaException, Producer, TopicPartition
 from confluent_kafka.admin import AdminClient, NewTopic
+from logger.logger import get_logger
+from services.email_dedup import ProcessedEventsStore
+from services.email_retry import RetryPolicy, not_before
+from services.email_sender import EmailSender, SMTPConnectionPool
+from services.producer import producer_config
+from settings import Settings, get_settings
+
+logger = get_logger(__name__)
+
+
+def ensure_topics(settings: Settings) -> None:
+    """Create the email, retry and DLQ topics if they do not exist yet."""
+    admin_client = AdminClient({'bootstrap.servers': settings.KAFKA_BOOTSTRAP_SERVERS})
+    topics = [
+        NewTopic(name, num_partitions=settings.KAFKA_EMAIL_PARTITIONS, replication_factor=settings.KAFKA_REPLICATION_FACTOR)
+        for name in (settings.KAFKA_EMAIL_TOPIC, settings.EMAIL_RETRY_TOPIC, settings.EMAIL_DLQ_TOPIC)
+    ]
+    for name, future in admin_client.create_topics(topics).items():
+        try:
+            future.result()
+            logger.info("Создан топик %s", name)
+        except KafkaException as e:
+            if e.args[0].code() != KafkaError.TOPIC_ALREADY_EXISTS:
+                raise
+
+
+class EmailConsumer:
+    """Consumes user-created events in batches and sends the emails.
 
-admin_client = AdminClient({'bootstrap.servers': 'kafka:9092'})
-topic_list = [NewTopic("todo-email-kafka", num_partitions=1, replication_factor=1)]
-admin_client.create_topics(topic_list)
+    Offsets are stored only for handled messages and committed per batch;
+    failures go to the retry or dead-letter topic (services.email_retry).
+    """
 
-yandex_user = os.getenv('YA_USER')
-yandex_password = os.getenv('YA_PASSWORD')
+    def __init__(self, settings: Settings, sender: EmailSender, dedup: ProcessedEventsStore | None = None,
+                 consumer_factory=Consumer, producer_factory=Producer):
+        self.topic = settings.KAFKA_EMAIL_TOPIC
+        self.batch_size = settings.EMAIL_BATCH_SIZE
+        self.batch_timeout = settings.EMAIL_BATCH_TIMEOUT
+        self.retry_policy = RetryPolicy.from_settings(settings)
+        self.sender = sender
+        self.dedup = dedup
+        self.cleanup_interval = settings.EMAIL_DEDUP_CLEANUP_INTERVAL
+        self._next_cleanup = 0.0
+        # повторы и DLQ пишутся с исходным value
+        self.producer = producer_factory(producer_config(settings))
+        self.consumer = consumer_factory({
+            'bootstrap.servers': settings.KAFKA_BOOTSTRAP_SERVERS,
+            'group.id': settings.EMAIL_CONSUMER_GROUP,
+            'auto.offset.reset': 'earliest',
+            'enable.auto.commit': False,  # offset фиксируем после обработки пачки
+            'enable.auto.offset.store': False,  # и только для обработанных сообщений
+            # при добавлении реплики переезжают только нужные партиции, остальные не останавливаются
+            'partition.assignment.strategy': 'cooperative-sticky',
+        })
+        # партиции retry-топика, остановленные до срока очередного повтора
+        self.paused: dict[TopicPartition, float] = {}
+        self._stopped = threading.Event()
 
-# удалил все пароли)0
+    def process_batch(self, messages) -> int:
+        """Send a batch; returns the number of messages whose offsets were stored."""
+        now = time.time()
+        ready, deferred = [], set()
+        for msg in messages:
+            if msg.error():
+                raise KafkaException(msg.error())
+            key = (msg.topic(), msg.partition())
+            if key in deferred:
+                continue
+            due = not_before(msg)
+            if due > now:
+                # рано: откатываемся на это сообщение и ждём, не блокируя остальные партиции
+                deferred.add(key)
+                tp = TopicPartition(msg.topic(), msg.partition())
+                self.consumer.seek(TopicPartition(msg.topic(), msg.partition(), msg.offset()))
+                self.consumer.pause([tp])
+                self.paused[tp] = due
+                continue
+            ready.append(msg)
 
-def send_email_yandex(to_email, subject, body):
-    print("SMTP отправка на:", to_email)
-    msg = MIMEText(body, 'html', 'utf-8')
-    msg['Subject'] = subject
-    msg['From'] = yandex_user
-    msg['To'] = to_email
+        emails, sendable = [], []
+        for msg in ready:
+            try:
+                emails.append(json.loads(msg.value().decode('utf-8')))
+                sendable.append(msg)
+            except ValueError as e:
+                self.route_failure(msg, e)
+        sendable, emails = self._drop_duplicates(sendable, emails)
 
-    if not yandex_user or not yandex_password:
-            raise RuntimeError("SMTP creds are missing")
-    with smtplib.SMTP_SSL('smtp.yandex.ru', 465) as smtp:
-        smtp.login(yandex_user, yandex_password)
-        smtp.sendmail(yandex_user, [to_email], msg.as_string())
+        sent = []
+        for msg, data, error in zip(sendable, emails, self.sender.send_many(emails)):
+            if error is not None:
+                self.route_failure(msg, error)
+                logger.warning("Ошибка отправки письма на %s: %s", data.get('email'), error)
+            elif data.get('event_id'):
+                sent.append(data['event_id'])
+        if self.dedup is not None:
+            self.dedup.mark(sent)
 
+        # повторы и DLQ должны быть записаны до commit исходных offset'ов
+        self.producer.flush()
+        for msg in ready:
+            self.consumer.store_offsets(message=msg)
+        logger.info("Обработано писем: %s", len(ready))
+        return len(ready)
 
-# пример использования
-#send_email_yandex('recipient@example.com', 'Тестовая тема', 'Пример отправки через Яндекс SMTP')
+    def _drop_duplicates(self, messages: list, emails: list[dict]) -> tuple[list, list[dict]]:
+        """Skip events already sent (dedup store) or repeated within the batch."""
+        if self.dedup is None:
+            return messages, emails
+        seen = self.dedup.seen([data['event_id'] for data in emails if data.get('event_id')])
+        kept_messages, kept_emails = [], []
+        for msg, data in zip(messages, emails):
+            event_id = data.get('event_id')
+            if event_id in seen:
+                logger.info("Событие %s уже обработано, письмо не отправляется", event_id)
+                continue
+            if event_id:
+                seen.add(event_id)
+            kept_messages.append(msg)
+            kept_emails.append(data)
+        return kept_messages, kept_emails
 
-conf = {
-    'bootstrap.servers': 'kafka:9092',
-    'group.id': 'todo-email-group',
-    'auto.offset.reset': 'earliest'  # считаем только новые сообщения
-}
+    def cleanup_dedup(self) -> None:
+        if self.dedup is None or time.monotonic() < self._next_cleanup:
+            return
+        self._next_cleanup = time.monotonic() + self.cleanup_interval
+        removed = self.dedup.cleanup()
+        if removed:
+            logger.info("Удалено устаревших отметок dedup: %s", removed)
 
-consumer = Consumer(conf)
-topic = "todo-email-kafka"
-consumer.subscribe([topic])
+    def route_failure(self, msg, error: Exception) -> None:
+        target, headers = self.retry_policy.route(msg, error)
+        if target == self.retry_policy.dlq_topic:
+            logger.error("Сообщение %s/%s/%s отправлено в DLQ: %s", msg.topic(), msg.partition(), msg.offset(), error)
+        self.producer.produce(topic=target, key=msg.key(), value=msg.value(), headers=headers)
 
-try:
-    while True:
-        msg = consumer.poll(1.0)
-        if msg is None:
-            continue
-        if msg.error():
-            raise KafkaException(msg.error())
+    def resume_due(self) -> None:
+        now = time.time()
+        due = [tp for tp, at in self.paused.items() if at <= now]
+        if due:
+            self.consumer.resume(due)
+            for tp in due:
+                del self.paused[tp]
 
-        data = json.loads(msg.value().decode('utf-8'))
-        print("Parsed data:", data)
+    def commit(self) -> None:
         try:
-            send_email_yandex(data['email'], data['subject'], data['body'])
-        except Exception as e:
-            print('Ошибка отправки письма:', e)
-        consumer.commit(msg)
+            self.consumer.commit(asynchronous=False)
+        except KafkaException as e:
+            if e.args[0].code() != KafkaError._NO_OFFSET:
+                raise
+
+    def _on_revoke(self, consumer, partitions) -> None:
+        # обработанное до ребалансировки фиксируем, пока партиции ещё наши
+        self.commit()
+        for tp in partitions:
+            self.paused.pop(TopicPartition(tp.topic, tp.partition), None)
+        logger.info("Партиции отозваны: %s", [f"{tp.topic}/{tp.partition}" for tp in partitions])
+
+    def _on_assign(self, consumer, partitions) -> None:
+        logger.info("Партиции назначены: %s", [f"{tp.topic}/{tp.partition}" for tp in partitions])
+
+    def run(self) -> None:
+        self.consumer.subscribe(
+            [self.topic, self.retry_policy.retry_topic], on_assign=self._on_assign, on_revoke=self._on_revoke
+        )
+        logger.info("Email consumer запущен: %s", self.topic)
+        try:
+            while not self._stopped.is_set():
+                self.cleanup_dedup()
+                self.resume_due()
+                messages = self.consumer.consume(num_messages=self.batch_size, timeout=self.batch_timeout)
+                if messages and self.process_batch(messages):
+                    self.commit()
+        finally:
+            # закрытие consumer сразу освобождает партиции для других реплик
+            self.consumer.close()
+            self.producer.flush()
+            self.sender.close()
+            logger.info("Email consumer остановлен")
+
+    def stop(self, *args) -> None:
+        """Finish the current batch, commit and leave the group."""
+        self._stopped.set()
+
+
+def run(settings: Settings | None = None) -> None:
+    settings = settings or get_settings()
+    if not settings.YA_USER or not settings.YA_PASSWORD:
+        raise RuntimeError("SMTP creds are missing")
+    ensure_topics(settings)
+    from db.session import SessionLocal
+
+    sender = EmailSender(SMTPConnectionPool.from_settings(settings), settings.YA_USER, settings.EMAIL_WORKERS)
+    worker = EmailConsumer(settings, sender, ProcessedEventsStore.from_settings(SessionLocal, settings))
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
 
-except KeyboardInterrupt:
-    print("Stopped by user")
 
-finally:
-    consumer.close()
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,65 @@
+"""Повторная отправка писем из dead-letter топика.
+
+    python -m services.dlq_replay --dry-run          # показать, что лежит в DLQ
+    python -m services.dlq_replay --limit 100        # вернуть 100 сообщений в основной топик
+    python -m services.dlq_replay --error SMTPDataError
+
+Сообщения возвращаются с исходным value и без заголовков повторов, т.е. получают
+полный набор попыток заново. Прочитанное фиксируется отдельной consumer group,
+поэтому повторный запуск не переотправляет уже возвращённое.
+"""
+import argparse
+from confluent_kafka import Consumer, Producer
+from services.email_retry import ERROR_HEADER, ORIGIN_HEADER, headers_dict
+from services.producer import producer_config
+from settings import get_settings
+
+
+def replay(target: str, limit: int, error_filter: str | None, dry_run: bool, idle_timeout: float) -> int:
+    settings = get_settings()
+    consumer = Consumer({
+        'bootstrap.servers': settings.KAFKA_BOOTSTRAP_SERVERS,
+        'group.id': 'todo-email-dlq-replay',
+        'auto.offset.reset': 'earliest',
+        'enable.auto.commit': False,
+    })
+    producer = None if dry_run else Producer(producer_config(settings))
+    consumer.subscribe([settings.EMAIL_DLQ_TOPIC])
+    replayed = 0
+    try:
+        while replayed < limit:
+            msg = consumer.poll(idle_timeout)
+            if msg is None:
+                break  # DLQ вычитан
+            if msg.error():
+                raise RuntimeError(msg.error())
+            headers = headers_dict(msg)
+            error = headers.get(ERROR_HEADER, "")
+            if error_filter and error_filter not in error:
+                continue
+            print(f"{headers.get(ORIGIN_HEADER, '?')}  {error}")
+            if not dry_run:
+                producer.produce(topic=target, key=msg.key(), value=msg.value())
+            replayed += 1
+        if not dry_run:
+            producer.flush()
+            consumer.commit(asynchronous=False)
+    finally:
+        consumer.close()
+    return replayed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--topic", default=get_settings().KAFKA_EMAIL_TOPIC, help="куда вернуть сообщения")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--error", default=None, help="только сообщения, в ошибке которых есть подстрока")
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--idle-timeout", type=float, default=5.0)
+    args = parser.parse_args()
+    count = replay(args.topic, args.limit, args.error, args.dry_run, args.idle_timeout)
+    print(f"{'found' if args.dry_run else 'replayed'}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta, timezone
+from repository.processed_events_repository import SQLProcessedEventsRepository
+from settings import Settings
+
+
+class ProcessedEventsStore:
+    """Dedup store of the email consumer backed by the processed_events table.
+
+    An event id is recorded only after its email was sent, so a redelivered
+    event (rebalance, restart before commit) is skipped without touching SMTP.
+    """
+
+    def __init__(self, session_factory, ttl: timedelta):
+        self.session_factory = session_factory
+        self.ttl = ttl
+
+    @classmethod
+    def from_settings(cls, session_factory, settings: Settings) -> "ProcessedEventsStore":
+        return cls(session_factory, timedelta(hours=settings.EMAIL_DEDUP_TTL_HOURS))
+
+    def seen(self, event_ids: list[str]) -> set[str]:
+        with self.session_factory() as db:
+            return SQLProcessedEventsRepository(db).seen(event_ids)
+
+    def mark(self, event_ids: list[str]) -> None:
+        with self.session_factory() as db:
+            SQLProcessedEventsRepository(db).mark(event_ids)
+            db.commit()
+
+    def cleanup(self) -> int:
+        with self.session_factory() as db:
+            removed = SQLProcessedEventsRepository(db).delete_older_than(datetime.now(timezone.utc) - self.ttl)
+            db.commit()
+            return removed
@@ -0,0 +1,63 @@
+import random
+import smtplib
+import time
+from settings import Settings
+
+# заголовки сообщений в retry/DLQ топиках
+ATTEMPT_HEADER = "x-attempt"
+NOT_BEFORE_HEADER = "x-not-before"
+ERROR_HEADER = "x-error"
+ORIGIN_HEADER = "x-origin"
+
+
+def headers_dict(msg) -> dict[str, str]:
+    return {key: value.decode("utf-8") for key, value in (msg.headers() or [])}
+
+
+def not_before(msg) -> float:
+    """Timestamp before which a retry message must not be processed (0 for fresh messages)."""
+    return float(headers_dict(msg).get(NOT_BEFORE_HEADER, 0))
+
+
+def is_transient(error: Exception) -> bool:
+    """Temporary SMTP failure worth retrying: throttling (4xx), dropped connection, timeout."""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+
+class RetryPolicy:
+    """Bounded exponential backoff: transient failures go to the retry topic
+    with a not-before time, everything else (or the last attempt) to the DLQ."""
+
+    def __init__(self, retry_topic: str, dlq_topic: str, max_retries: int, backoff: float, backoff_max: float):
+        self.retry_topic = retry_topic
+        self.dlq_topic = dlq_topic
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "RetryPolicy":
+        return cls(
+            settings.EMAIL_RETRY_TOPIC, settings.EMAIL_DLQ_TOPIC,
+            settings.EMAIL_MAX_RETRIES, settings.EMAIL_RETRY_BACKOFF, settings.EMAIL_RETRY_BACKOFF_MAX,
+        )
+
+    def delay(self, attempt: int) -> float:
+        # equal jitter: половина задержки фиксирована, половина случайна — ретраи не идут волной
+        delay = min(self.backoff * 2 ** (attempt - 1), self.backoff_max)
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def route(self, msg, error: Exception, now: float | None = None) -> tuple[str, list[tuple[str, str]]]:
+        """Topic and headers for re-producing a failed message with its original value."""
+        now = time.time() if now is None else now
+        headers = headers_dict(msg)
+        attempt = int(headers.get(ATTEMPT_HEADER, 0)) + 1
+        origin = headers.get(ORIGIN_HEADER, f"{msg.topic()}/{msg.partition()}/{msg.offset()}")
+        out = [(ATTEMPT_HEADER, str(attempt)), (ERROR_HEADER, f"{type(error).__name__}: {error}"[:1000]), (ORIGIN_HEADER, origin)]
+        if is_transient(error) and attempt <= self.max_retries:
+            return self.retry_topic, out + [(NOT_BEFORE_HEADER, str(now + self.delay(attempt)))]
+        return self.dlq_topic, out
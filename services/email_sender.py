@@ -0,0 +1,133 @@
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.mime.text import MIMEText
+from logger.logger import get_logger
+from settings import Settings
+
+logger = get_logger(__name__)
+
+
+class SMTPConnectionPool:
+    """Pool of persistent, already authenticated SMTP connections.
+
+    At most ``size`` connections exist; they are opened lazily, reused across
+    messages and threads, and replaced when the server drops them.
+    """
+
+    def __init__(self, host: str, port: int, user: str | None = None, password: str | None = None,
+                 use_ssl: bool = True, size: int = 4, timeout: float = 30, idle_check: float = 30):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.idle_check = idle_check
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.opened = 0
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "SMTPConnectionPool":
+        return cls(
+            settings.SMTP_HOST, settings.SMTP_PORT, settings.YA_USER, settings.YA_PASSWORD,
+            use_ssl=settings.SMTP_SSL, size=settings.SMTP_POOL_SIZE, timeout=settings.SMTP_TIMEOUT,
+        )
+
+    def _connect(self) -> smtplib.SMTP:
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        smtp = smtp_class(self.host, self.port, timeout=self.timeout)
+        if self.user and self.password:
+            smtp.login(self.user, self.password)
+        self.opened += 1
+        return smtp
+
+    @staticmethod
+    def _close(smtp: smtplib.SMTP) -> None:
+        try:
+            smtp.quit()
+        except smtplib.SMTPException:
+            smtp.close()
+        except OSError:
+            pass
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        smtp = None
+        try:
+            try:
+                smtp, last_used = self._idle.get_nowait()
+                # долго простаивавшее соединение сервер мог закрыть
+                if time.monotonic() - last_used > self.idle_check and smtp.noop()[0] != 250:
+                    self._close(smtp)
+                    smtp = None
+            except queue.Empty:
+                pass
+            except (smtplib.SMTPException, OSError):
+                smtp = None
+            if smtp is None:
+                smtp = self._connect()
+            yield smtp
+            self._idle.put((smtp, time.monotonic()))
+        except (smtplib.SMTPServerDisconnected, OSError):
+            # соединение испорчено — не возвращаем его в пул
+            if smtp is not None:
+                self._close(smtp)
+            raise
+        except smtplib.SMTPException:
+            # ошибка на уровне письма (отказ получателя и т.п.), соединение живо
+            if smtp is not None:
+                self._idle.put((smtp, time.monotonic()))
+            raise
+        finally:
+            self._slots.release()
+
+    def close(self) -> None:
+        while True:
+            try:
+                smtp, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(smtp)
+
+
+def build_message(sender: str, to_email: str, subject: str, body: str) -> MIMEText:
+    msg = MIMEText(body, 'html', 'utf-8')
+    msg['Subject'] = subject
+    msg['From'] = sender
+    msg['To'] = to_email
+    return msg
+
+
+class EmailSender:
+    """Sends emails concurrently from ``workers`` threads over a shared SMTP pool."""
+
+    def __init__(self, pool: SMTPConnectionPool, sender: str, workers: int):
+        self.pool = pool
+        self.sender = sender
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="smtp")
+
+    def send(self, to_email: str, subject: str, body: str) -> None:
+        msg = build_message(self.sender, to_email, subject, body)
+        with self.pool.connection() as smtp:
+            smtp.sendmail(self.sender, [to_email], msg.as_string())
+
+    def send_many(self, emails: list[dict]) -> list[Exception | None]:
+        """Send a batch; returns the error (or None) for each email, in order."""
+        def send_one(data: dict) -> Exception | None:
+            try:
+                self.send(data['email'], data['subject'], data['body'])
+            except (smtplib.SMTPException, OSError, KeyError) as e:
+                return e
+            return None
+
+        return list(self._executor.map(send_one, emails))
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self.pool.close()
@@ -0,0 +1,144 @@
+"""Relay transactional outbox -> Kafka.
+
+    python -m services.outbox_relay
+
+Забирает пачку строк outbox под FOR UPDATE SKIP LOCKED, отправляет их в Kafka,
+дожидается подтверждения доставки и удаляет доставленные строки в той же
+транзакции. Недоставленные строки остаются и уходят в следующем цикле, поэтому
+доставка at-least-once; воркеров можно запускать несколько.
+
+Очередь producer ограничена (KAFKA_QUEUE_MAX_MESSAGES). Когда она полна, relay
+сразу (KAFKA_QUEUE_FULL_POLICY=drop) или после ожидания до KAFKA_BLOCK_TIMEOUT
+(block) перестаёт отправлять остаток пачки: эти строки остаются в outbox и уходят
+в следующем цикле, событие не теряется. При остановке очередь досылается.
+
+Метрики relay (глубина очереди librdkafka, доставленные, недоставленные и
+отложенные события) отдаются в формате Prometheus на OUTBOX_METRICS_PORT.
+"""
+import json
+import signal
+import threading
+import time
+from confluent_kafka import Producer
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from logger.logger import get_logger
+from metrics import metrics
+from repository.outbox_repository import SQLOutboxRepository
+from services.producer import producer_config
+from settings import Settings, get_settings
+
+logger = get_logger(__name__)
+
+OUTBOX_DELIVERED = metrics.counter("outbox_relay_delivered", "Outbox events delivered to Kafka.")
+OUTBOX_FAILED = metrics.counter("outbox_relay_failed", "Outbox events not confirmed by Kafka, left for the next cycle.")
+OUTBOX_DEFERRED = metrics.counter("outbox_relay_deferred", "Outbox events not enqueued because the producer queue was full.")
+
+
+class OutboxRelay:
+    def __init__(self, session_factory, settings: Settings, producer_factory=Producer):
+        self.session_factory = session_factory
+        self.batch_size = settings.OUTBOX_BATCH_SIZE
+        self.poll_interval = settings.OUTBOX_POLL_INTERVAL
+        self.flush_timeout = settings.KAFKA_FLUSH_TIMEOUT
+        self.policy = settings.KAFKA_QUEUE_FULL_POLICY
+        self.block_timeout = settings.KAFKA_BLOCK_TIMEOUT
+        self._producer = producer_factory(producer_config(settings))
+        self._stopped = threading.Event()
+
+    def run_once(self) -> int:
+        """Relay one batch; returns the number of delivered events."""
+        db: Session = self.session_factory()
+        try:
+            repo = SQLOutboxRepository(db)
+            events = repo.claim_batch(self.batch_size)
+            if not events:
+                db.rollback()
+                return 0
+
+            delivered: list[int] = []
+            produced = 0
+            for event in events:
+                def on_delivery(err, msg, event_id=event.id):
+                    if err is None:
+                        delivered.append(event_id)
+                    else:
+                        logger.warning("Outbox event %s не доставлено: %s", event_id, err)
+                if not self._produce(event, on_delivery):
+                    logger.warning("Очередь Kafka producer переполнена, %s событий отложено до следующего цикла",
+                                   len(events) - produced)
+                    break
+                produced += 1
+            remaining = self._producer.flush(self.flush_timeout)
+            if remaining:
+                logger.warning("Outbox: %s событий без подтверждения, останутся в очереди", remaining)
+
+            repo.delete(delivered)
+            db.commit()
+            OUTBOX_DELIVERED.inc(amount=len(delivered))
+            if len(delivered) < produced:
+                OUTBOX_FAILED.inc(amount=produced - len(delivered))
+            if produced < len(events):
+                OUTBOX_DEFERRED.inc(amount=len(events) - produced)
+            return len(delivered)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def run(self) -> None:
+        logger.info("Outbox relay запущен, batch=%s", self.batch_size)
+        while not self._stopped.is_set():
+            try:
+                delivered = self.run_once()
+            except (SQLAlchemyError, BufferError) as e:
+                logger.error("Outbox relay: ошибка цикла: %s", e)
+                delivered = 0
+            # полная пачка — в outbox ещё есть строки, забираем сразу
+            if delivered < self.batch_size:
+                self._stopped.wait(self.poll_interval)
+        self._producer.flush(self.flush_timeout)
+        logger.info("Outbox relay остановлен")
+
+    def _produce(self, event, on_delivery) -> bool:
+        """Enqueue one event; False when the producer queue stayed full, per KAFKA_QUEUE_FULL_POLICY."""
+        deadline = time.monotonic() + self.block_timeout
+        while True:
+            try:
+                self._producer.produce(
+                    topic=event.topic,
+                    key=event.key,
+                    value=json.dumps(event.payload),
+                    on_delivery=on_delivery,
+                )
+                return True
+            except BufferError:
+                # буфер librdkafka полон: ждём доставки уже отправленного или откладываем
+                if self.policy == "block" and time.monotonic() < deadline:
+                    self._producer.poll(0.05)
+                    continue
+                return False
+
+    def queue_depth(self) -> int:
+        return len(self._producer)
+
+    def stop(self, *args) -> None:
+        self._stopped.set()
+
+
+def main():
+    from db.session import SessionLocal
+
+    settings = get_settings()
+    relay = OutboxRelay(SessionLocal, settings)
+    metrics.callback("outbox_relay_queue_depth", "Messages waiting in the relay's librdkafka queue.", relay.queue_depth)
+    if settings.OUTBOX_METRICS_PORT:
+        metrics.serve(settings.OUTBOX_METRICS_PORT)
+    signal.signal(signal.SIGTERM, relay.stop)
+    signal.signal(signal.SIGINT, relay.stop)
+    relay.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from argon2 import PasswordHasher
+from metrics import metrics
+from services.user_exceptions import HashingQueueFull
+from settings import get_settings
+
+# hasher воркера в process-режиме, настраивается initializer'ом пула
+_hasher: PasswordHasher | None = None
+
+
+def _init_worker(time_cost: int, memory_cost: int, parallelism: int) -> None:
+    global _hasher
+    _hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+
+
+def _hash(password: str) -> str:
+    return _hasher.hash(password)
+
+
+def _verify(password_hash: str, password: str) -> bool:
+    return _hasher.verify(password_hash, password)
+
+
+class HashingStats:
+    """Queue depth and submit-to-result latency of the hashing executor."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def started(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, seconds: float) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+            self.latency_total += seconds
+            if seconds > self.latency_max:
+                self.latency_max = seconds
+
+    def reject(self) -> None:
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self, workers: int) -> dict:
+        with self._lock:
+            avg = self.latency_total / self.completed if self.completed else 0.0
+            return {
+                "workers": workers,
+                "in_flight": self.in_flight,
+                "queue_depth": max(self.in_flight - workers, 0),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "latency_avg_ms": round(avg * 1000, 3),
+                "latency_max_ms": round(self.latency_max * 1000, 3),
+            }
+
+
+class HashingExecutor:
+    """Bounded executor for argon2 hash/verify.
+
+    At most ``workers`` operations run at once and ``queue_size`` more may wait;
+    anything beyond that is rejected with HashingQueueFull (429) instead of
+    piling up and starving request threads. New hashes use the given argon2
+    parameters; ``needs_rehash`` reports hashes created with other ones.
+    There are only awaitable ``ahash``/``averify``: a blocking wrapper would
+    hold the caller's thread (or the event loop) for the whole queue wait.
+    """
+
+    def __init__(self, workers: int, queue_size: int, use_processes: bool = False,
+                 time_cost: int = 3, memory_cost: int = 65536, parallelism: int = 4):
+        self.workers = workers
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self.hasher = PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+        if use_processes:
+            # spawn: fork из многопоточного процесса uvicorn небезопасен
+            self._executor = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker, initargs=(time_cost, memory_cost, parallelism),
+            )
+            self._hash, self._verify = _hash, _verify
+        else:
+            self._executor = ThreadPoolExecutor(workers, thread_name_prefix="argon2")
+            self._hash, self._verify = self.hasher.hash, self.hasher.verify
+        self.stats = HashingStats()
+
+    def submit(self, fn, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            self.stats.reject()
+            raise HashingQueueFull()
+        self.stats.started()
+        submitted = time.perf_counter()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            self.stats.finished(time.perf_counter() - submitted)
+            raise
+
+        def done(_):
+            self._slots.release()
+            self.stats.finished(time.perf_counter() - submitted)
+        future.add_done_callback(done)
+        return future
+
+    async def ahash(self, password: str) -> str:
+        return await asyncio.wrap_future(self.submit(self._hash, password))
+
+    async def averify(self, password_hash: str, password: str) -> bool:
+        return await asyncio.wrap_future(self.submit(self._verify, password_hash, password))
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        # только разбор параметров из строки хеша, без вычислений argon2
+        return self.hasher.check_needs_rehash(password_hash)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+_executor: HashingExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def password_hasher() -> HashingExecutor:
+    """Process-wide hashing executor, created on first use from Settings."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                settings = get_settings()
+                _executor = HashingExecutor(
+                    settings.HASH_WORKERS, settings.HASH_QUEUE_SIZE, settings.HASH_USE_PROCESSES,
+                    time_cost=settings.ARGON2_TIME_COST,
+                    memory_cost=settings.ARGON2_MEMORY_COST,
+                    parallelism=settings.ARGON2_PARALLELISM,
+                )
+    return _executor
+
+
+def _stats_field(field: str):
+    return lambda: getattr(_executor.stats, field) if _executor is not None else None
+
+
+metrics.callback("hashing_in_flight", "Argon2 operations running or queued.", _stats_field("in_flight"))
+metrics.callback("hashing_completed", "Argon2 operations completed.", _stats_field("completed"), type="counter")
+metrics.callback("hashing_rejected", "Argon2 operations rejected with 429.", _stats_field("rejected"), type="counter")
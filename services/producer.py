@@ -1,36 +1,28 @@
-from confluent_kafka import Producer
-import json
+from uuid import uuid4
+from settings import Settings
 
-# Конфигурация Kafka Producer
 
-conf = {
-    'bootstrap.servers': 'kafka:9092',  # адрес Kafka broker
-    'client.id': 'todo-producer'
-}
+def producer_config(settings: Settings) -> dict:
+    """librdkafka config shared by the outbox relay, the email consumer and DLQ replay."""
+    return {
+        "bootstrap.servers": settings.KAFKA_BOOTSTRAP_SERVERS,
+        "client.id": "todo-producer",
+        "linger.ms": settings.KAFKA_LINGER_MS,
+        "batch.size": settings.KAFKA_BATCH_SIZE,
+        "compression.type": settings.KAFKA_COMPRESSION,
+        "queue.buffering.max.messages": settings.KAFKA_QUEUE_MAX_MESSAGES,
+    }
 
-producer = Producer(conf)
 
-def delivery_report(err, msg):
-    """Callback для подтверждения доставки сообщения"""
-    if err is not None:
-        print(f'Ошибка доставки сообщения: {err}')
-    else:
-        print(f'Сообщение доставлено в {msg.topic()} [{msg.partition()}] по offset {msg.offset()}')
+def user_created_message(name: str, user_email: str) -> dict:
+    """Payload события о регистрации для email-consumer.
 
-def send_task_email(topic, name: str, user_email: str):
-    """Функция отправки события с задачей для email в Kafka"""
-    #topic = 'todo-email-kafka'
-    message = {
+    event_id остаётся тем же при повторной доставке — по нему consumer отсекает дубли.
+    """
+    return {
+        'event_id': uuid4().hex,
         'task_name': name,
         'email': user_email,
         'subject': 'Уведомление о регистрации',
         'body': f'Пользователь с почтовым адресом {user_email} успешно создан!'
     }
-    for i in range(1):
-        producer.produce(
-        topic=topic,
-        value=json.dumps(message),
-        on_delivery=delivery_report
-    )
-        producer.flush(1.0)  # Гарантируем отправку перед завершением функции
-
@@ -0,0 +1,204 @@
+"""Read cache for per-user task lists.
+
+Entries are keyed by user, a per-user generation and the list filters.
+A write to a user's tasks bumps the generation, so every cached page of
+that user becomes unreachable at once and ages out of the LRU/TTL.
+Callers that have already read ``users.tasks_version`` pass it instead:
+it changes on writes made by any process, the generation only on this one's.
+"""
+import pickle
+from abc import ABC, abstractmethod
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Protocol
+from metrics import metrics
+from settings import Settings, get_settings, on_reload
+
+CACHE_HITS = metrics.counter("task_cache_hits", "Task list reads served from the cache.")
+CACHE_MISSES = metrics.counter("task_cache_misses", "Task list reads that went to the DB.")
+
+
+class TaskListCache(ABC):
+    """Interface of the task list cache used by TasksService."""
+
+    @abstractmethod
+    def key(self, user_id: int, filters: tuple, version: int | None = None) -> Hashable:
+        """Key for the current generation, or for ``version`` (users.tasks_version) when given.
+
+        Take it before reading from the DB.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Any | None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def invalidate_user(self, user_id: int) -> None:
+        raise NotImplementedError
+
+
+class LocalTaskListCache(TaskListCache):
+    """In-process LRU bounded by ``maxsize`` entries and ``ttl`` seconds.
+
+    Invalidation is only visible to this process: with several workers use
+    SharedTaskListCache, or keep ``ttl`` short.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._generations: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def key(self, user_id: int, filters: tuple, version: int | None = None) -> Hashable:
+        if version is not None:
+            return user_id, f"v{version}", filters
+        return user_id, self._generations.get(user_id, 0), filters
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CacheBackend(Protocol):
+    """Key-value store shared by the API workers (the subset of the redis-py client we use)."""
+
+    def get(self, name: str) -> bytes | None: ...
+
+    def set(self, name: str, value: bytes, px: int | None = None) -> Any: ...
+
+    def incr(self, name: str) -> int: ...
+
+
+class InMemoryBackend:
+    """Local stand-in for a shared CacheBackend (tests, benchmarks, single process)."""
+
+    def __init__(self):
+        self._data: dict[str, tuple[float | None, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> bytes | None:
+        with self._lock:
+            entry = self._data.get(name)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._data[name]
+                return None
+            return value
+
+    def set(self, name: str, value: bytes, px: int | None = None) -> bool:
+        with self._lock:
+            self._data[name] = (time.monotonic() + px / 1000 if px else None, value)
+        return True
+
+    def incr(self, name: str) -> int:
+        with self._lock:
+            _, value = self._data.get(name, (None, b"0"))
+            value = int(value) + 1
+            self._data[name] = (None, str(value).encode())
+            return value
+
+
+class SharedTaskListCache(TaskListCache):
+    """Cache in a store shared by all workers: a write in one worker invalidates everywhere.
+
+    The generation is read from the backend on every lookup (one extra round trip),
+    values are pickled — the backend must be trusted and private to the app.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float, prefix: str = "tasks"):
+        self.backend = backend
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def _generation_key(self, user_id: int) -> str:
+        return f"{self.prefix}:gen:{user_id}"
+
+    def key(self, user_id: int, filters: tuple, version: int | None = None) -> str:
+        if version is not None:
+            # версия из БД уже учитывает записи всех воркеров — поколение не читаем
+            return f"{self.prefix}:{user_id}:v{version}:{filters!r}"
+        generation = self.backend.get(self._generation_key(user_id)) or b"0"
+        return f"{self.prefix}:{user_id}:{generation.decode()}:{filters!r}"
+
+    def get(self, key: str) -> Any | None:
+        raw = self.backend.get(key)
+        return None if raw is None else pickle.loads(raw)
+
+    def set(self, key: str, value: Any) -> None:
+        self.backend.set(key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), px=int(self.ttl * 1000))
+
+    def invalidate_user(self, user_id: int) -> None:
+        self.backend.incr(self._generation_key(user_id))
+
+
+def build_cache(settings: Settings) -> TaskListCache | None:
+    if settings.TASK_CACHE_BACKEND == "local":
+        return LocalTaskListCache(settings.TASK_CACHE_SIZE, settings.TASK_CACHE_TTL)
+    if settings.TASK_CACHE_BACKEND == "redis":
+        # redis нужен только для общего кеша, в остальных режимах не импортируется
+        import redis
+
+        return SharedTaskListCache(redis.Redis.from_url(settings.TASK_CACHE_REDIS_URL), settings.TASK_CACHE_TTL)
+    return None
+
+
+_cache: TaskListCache | None = None
+_cache_built = False
+_cache_lock = threading.Lock()
+
+
+def task_list_cache() -> TaskListCache | None:
+    """Process-wide task list cache from Settings; None when TASK_CACHE_BACKEND=none."""
+    global _cache, _cache_built
+    if not _cache_built:
+        with _cache_lock:
+            if not _cache_built:
+                _cache = build_cache(get_settings())
+                _cache_built = True
+    return _cache
+
+
+@on_reload
+def _reset_cache(settings: Settings) -> None:
+    # бэкенд, размер или TTL могли смениться — следующий запрос соберёт кеш заново
+    global _cache, _cache_built
+    with _cache_lock:
+        _cache, _cache_built = None, False
+
+
+metrics.callback("task_cache_size", "Entries in the local task list cache.",
+                 lambda: len(_cache) if isinstance(_cache, LocalTaskListCache) else None)
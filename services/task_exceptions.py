@@ -1,3 +1,5 @@
+import inspect
+from contextlib import contextmanager
 from repository.task_exceptions import NotFoundUserForTaskRepo, TaskNotFoundRepo
 from api.errors import NotFound
 
@@ -10,14 +12,27 @@ class NotFoundUserForTask(NotFound):
         super().__init__(resource="user", details=details)
 
 
+@contextmanager
+def _translate_task_errors():
+    try:
+        yield
+    except TaskNotFoundRepo as e:
+        # bulk-операции передают id отсутствующих/чужих задач
+        raise TaskNotFound(details=e.args[0] if e.args else None)
+    except NotFoundUserForTaskRepo:
+        raise NotFoundUserForTask()
+
+
 def task_exceptions_trap(func):
+    if inspect.iscoroutinefunction(func):
+        async def async_wrapper(*args, **kwargs):
+            with _translate_task_errors():
+                return await func(*args, **kwargs)
+        return async_wrapper
+
     def wrapper(*args, **kwargs):
-        try:
+        with _translate_task_errors():
             return func(*args, **kwargs)
-        except TaskNotFoundRepo:
-            raise TaskNotFound()
-        except NotFoundUserForTaskRepo:
-            raise NotFoundUserForTask()
     return wrapper
 
 
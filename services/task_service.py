@@ -3,14 +3,19 @@ from datetime import datetime
 from repository.repository import AbstractRepositoryTask
 from api.dto import TaskCreate as dtoTCreate, TaskUpdate as dtoTUpdate
 from sqlalchemy.orm import Session
+from services.task_cache import CACHE_HITS, CACHE_MISSES, TaskListCache, task_list_cache
 from services.task_exceptions import task_exceptions_trap
 from logger.logger import get_logger
 
 logger = get_logger(__name__)
 
 class TasksService:
+    # кеш списков задач; None — читать всегда из БД
+    cache: TaskListCache | None = None
+
     def __init__(self, tasks_repo_class: AbstractRepositoryTask, db: Session):
         self.tasks_repo = tasks_repo_class(db)
+        self.cache = task_list_cache()
     
     @task_exceptions_trap
     def create_task(self, task: dtoTCreate):
@@ -19,6 +24,7 @@ class TasksService:
         # 3. в противном случае ошибка "юзер не активный"
         # 4. открываешь транзацкцию и проверяешь юзера
         new_task = self.tasks_repo.add_one(asdict(task))
+        self._invalidate(task)
         logger.info("Task created: %s", getattr(new_task, 'id', new_task))
         return new_task
 
@@ -38,17 +44,180 @@ class TasksService:
         self,
         user_id: int,
         check: bool | None = None,
-        deadline: datetime | None = None
+        deadline: datetime | None = None,
+        after: int | None = None,
+        limit: int | None = None,
+        version: int | None = None
     ):    
-        task = self.tasks_repo.get_user_tasks(user_id, check, deadline)
+        key = self._cache_key(user_id, check, deadline, after, limit, version)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        # списки только сериализуются в ответ — ORM-объекты не нужны
+        task = self.tasks_repo.get_user_tasks(user_id, check, deadline, after=after, limit=limit, projection=True)
+        self._store(key, task)
         return task
+
+    def stream_user_tasks(self, user_id: int, check: bool | None = None):
+        """Batches of all the user's tasks for export, read past the list cache.
+
+        The iterator is sync or async, like the repository; rows are read while it is consumed.
+        """
+        logger.info("Tasks export started: user_id=%s", user_id)
+        return self.tasks_repo.stream_user_tasks(user_id, check)
     
+    @task_exceptions_trap
+    def create_tasks(self, owner_id: int, tasks: list[dtoTCreate]):
+        rows = self.tasks_repo.add_many([asdict(task) for task in tasks])
+        self._invalidate_owner(owner_id)
+        logger.info("Tasks created in bulk: owner_id=%s count=%s", owner_id, len(rows))
+        return rows
+
+    @task_exceptions_trap
+    def import_tasks(self, owner_id: int, tasks: list[dtoTCreate]) -> int:
+        imported = self.tasks_repo.import_many([asdict(task) for task in tasks])
+        self._invalidate_owner(owner_id)
+        logger.info("Tasks imported: owner_id=%s count=%s", owner_id, imported)
+        return imported
+
+    @task_exceptions_trap
+    def up_tasks(self, owner_id: int, updates: dict[int, dict]):
+        rows = self.tasks_repo.up_many(owner_id, updates)
+        self._invalidate_owner(owner_id)
+        return rows
+
+    @task_exceptions_trap
+    def del_tasks(self, owner_id: int, task_ids: list[int]):
+        deleted = self.tasks_repo.del_many(owner_id, task_ids)
+        self._invalidate_owner(owner_id)
+        logger.info("Tasks deleted in bulk: owner_id=%s count=%s", owner_id, deleted)
+        return deleted
+
+    @task_exceptions_trap
+    def get_tasks_version(self, user_id: int):
+        """(tasks_version, tasks_updated_at) of the user — validators for conditional GET."""
+        return self.tasks_repo.get_tasks_version(user_id)
+
     @task_exceptions_trap
     def up_task(self, task_id: int, task: dtoTUpdate):
-        return self.tasks_repo.up_task(task_id, task)
+        updated = self.tasks_repo.up_task(task_id, task)
+        self._invalidate(updated)
+        return updated
     
     @task_exceptions_trap
     def del_task(self, task_id: int):
         task = self.tasks_repo.del_task(task_id)
+        self._invalidate(task)
         logger.info("Task deleted: %s", task_id)
-        return task
\ No newline at end of file
+        return task
+
+    def _cache_key(self, user_id: int, check, deadline, after, limit, version=None):
+        # ключ берётся до чтения из БД: запись, случившаяся во время чтения,
+        # сменит поколение, и устаревший результат сохранится под мёртвым ключом.
+        # version — users.tasks_version, прочитанная эндпоинтом для ETag: с ней запись
+        # в другом воркере тоже меняет ключ, и под свежим ETag не отдаётся старый список
+        if self.cache is None:
+            return None
+        return self.cache.key(user_id, (check, deadline, after, limit), version)
+
+    def _cached(self, key):
+        if key is None:
+            return None
+        value = self.cache.get(key)
+        (CACHE_MISSES if value is None else CACHE_HITS).inc()
+        return value
+
+    def _store(self, key, rows) -> None:
+        if key is not None:
+            self.cache.set(key, rows)
+
+    def _invalidate(self, task) -> None:
+        # после commit: списки владельца задачи перечитаются из БД
+        if self.cache is not None:
+            self.cache.invalidate_user(task.owner_id)
+
+    def _invalidate_owner(self, owner_id: int) -> None:
+        if self.cache is not None:
+            self.cache.invalidate_user(owner_id)
+
+class AsyncTasksService(TasksService):
+    """TasksService for DB_ASYNC mode: the repository methods are awaited."""
+
+    @task_exceptions_trap
+    async def create_task(self, task: dtoTCreate):
+        new_task = await self.tasks_repo.add_one(asdict(task))
+        self._invalidate(task)
+        logger.info("Task created: %s", getattr(new_task, 'id', new_task))
+        return new_task
+
+    @task_exceptions_trap
+    async def get_task(self, task_id: int):
+        return await self.tasks_repo.get_one(task_id)
+
+    @task_exceptions_trap
+    async def get_all(self, isdone: bool | None = None):
+        if isdone is not None:
+            return await self.tasks_repo.get_isdone(isdone)
+        return await self.tasks_repo.get_all()
+
+    @task_exceptions_trap
+    async def get_user_tasks(
+        self,
+        user_id: int,
+        check: bool | None = None,
+        deadline: datetime | None = None,
+        after: int | None = None,
+        limit: int | None = None,
+        version: int | None = None
+    ):
+        key = self._cache_key(user_id, check, deadline, after, limit, version)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        task = await self.tasks_repo.get_user_tasks(user_id, check, deadline, after=after, limit=limit, projection=True)
+        self._store(key, task)
+        return task
+
+    @task_exceptions_trap
+    async def create_tasks(self, owner_id: int, tasks: list[dtoTCreate]):
+        rows = await self.tasks_repo.add_many([asdict(task) for task in tasks])
+        self._invalidate_owner(owner_id)
+        logger.info("Tasks created in bulk: owner_id=%s count=%s", owner_id, len(rows))
+        return rows
+
+    @task_exceptions_trap
+    async def import_tasks(self, owner_id: int, tasks: list[dtoTCreate]) -> int:
+        imported = await self.tasks_repo.import_many([asdict(task) for task in tasks])
+        self._invalidate_owner(owner_id)
+        logger.info("Tasks imported: owner_id=%s count=%s", owner_id, imported)
+        return imported
+
+    @task_exceptions_trap
+    async def up_tasks(self, owner_id: int, updates: dict[int, dict]):
+        rows = await self.tasks_repo.up_many(owner_id, updates)
+        self._invalidate_owner(owner_id)
+        return rows
+
+    @task_exceptions_trap
+    async def del_tasks(self, owner_id: int, task_ids: list[int]):
+        deleted = await self.tasks_repo.del_many(owner_id, task_ids)
+        self._invalidate_owner(owner_id)
+        logger.info("Tasks deleted in bulk: owner_id=%s count=%s", owner_id, deleted)
+        return deleted
+
+    @task_exceptions_trap
+    async def get_tasks_version(self, user_id: int):
+        return await self.tasks_repo.get_tasks_version(user_id)
+
+    @task_exceptions_trap
+    async def up_task(self, task_id: int, task: dtoTUpdate):
+        updated = await self.tasks_repo.up_task(task_id, task)
+        self._invalidate(updated)
+        return updated
+
+    @task_exceptions_trap
+    async def del_task(self, task_id: int):
+        task = await self.tasks_repo.del_task(task_id)
+        self._invalidate(task)
+        logger.info("Task deleted: %s", task_id)
+        return task
@@ -1,5 +1,7 @@
+import inspect
+from contextlib import contextmanager
 from repository.user_exceptions import UserNotFoundRepo, NotUniqEmailRepo
-from api.errors import NotFound, Conflict, ValidationError
+from api.errors import NotFound, Conflict, TooManyRequests, ValidationError
 
 class UserNotFound(NotFound):
     def __init__(self, details=None):
@@ -21,13 +23,29 @@ class IncorrectName(ValidationError):
     def __init__(self, message: str = "Имя не может быть одним из списка: admin, test, user", details=None):
         super().__init__(message=message, details=details)
 
+class HashingQueueFull(TooManyRequests):
+    def __init__(self, message: str = "Сервер перегружен запросами авторизации, повторите позже", details=None):
+        super().__init__(message=message, details=details)
+
+
+@contextmanager
+def _translate_user_errors():
+    try:
+        yield
+    except NotUniqEmailRepo:
+        raise EmailExists()
+    except UserNotFoundRepo:
+        raise UserNotFound()
+
 
 def user_exceptions_trap(func):
+    if inspect.iscoroutinefunction(func):
+        async def async_wrapper(*args, **kwargs):
+            with _translate_user_errors():
+                return await func(*args, **kwargs)
+        return async_wrapper
+
     def wrapper(*args, **kwargs):
-        try:
+        with _translate_user_errors():
             return func(*args, **kwargs)
-        except NotUniqEmailRepo:
-            raise EmailExists()
-        except UserNotFoundRepo:
-            raise UserNotFound()
     return wrapper
\ No newline at end of file
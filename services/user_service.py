@@ -2,7 +2,6 @@ from hashlib import sha256
 import json
 import re
 from typing import Annotated
-from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
 from dataclasses import asdict
 from fastapi.params import Depends
@@ -11,13 +10,19 @@ from repository.user_exceptions import UserNotFoundRepo
 from repository.repository import AbstractRepositoryUser
 from sqlalchemy.orm import Session
 from api.dto import UserCreate as dtoUCreate, LoginData as dtoLogin, Token as dtoTokenRefresh, Token as dtoTokenNew
-from services.user_exceptions import EmailExists, IncorrectName, IncorrectPassword, InputIncorrectPassword, user_exceptions_trap
+from services.user_exceptions import EmailExists, HashingQueueFull, IncorrectName, IncorrectPassword, InputIncorrectPassword, user_exceptions_trap
 from services import producer
+from api.concurrency import call_service
+from services.password_hasher import password_hasher
 from logger.logger import get_logger
+from metrics import metrics
 from settings import Settings, get_settings
 
 logger = get_logger(__name__)
 
+# включая ожидание в очереди пула хеширования
+PASSWORD_VERIFY_SECONDS = metrics.histogram("password_verify_seconds", "Argon2 verify time at login.")
+
 class UsersService:
     def __init__(self, users_repo_class: AbstractRepositoryUser, db: Session):
         self.users_repo = users_repo_class(db)
@@ -29,37 +34,68 @@ class UsersService:
         return user
     
     @user_exceptions_trap
-    def create_user(self, user: dtoUCreate):
+    async def create_user(self, user: dtoUCreate):
         try:
-            email_exists = self.users_repo.login_check(user.email)
+            email_exists = await call_service(self.users_repo.login_check, user.email)
         except UserNotFoundRepo:
             email_exists = False
-        if email_exists:
-            logger.warning("Попытка создать пользователя с существующим email: %s", user.email)
-            raise EmailExists()
-        if user.name.strip().lower() in ["admin", "test", "user"]:
-            logger.warning("Введено недопустимое имя: %s", user.email)
-            raise IncorrectName()
-        if not re.match(r"^(?=.*[A-Z])(?=.*\d).+$", user.password_hash):
-            logger.warning("Введён недопустимый пароль: %s", user.email)
-            raise IncorrectPassword() #кажется тут больше про validation_error и ошибка 422
+        self._validate_new_user(user, email_exists)
+        # соединение с БД не держим, пока хеш ждёт в очереди пула
+        await call_service(self.users_repo.end_read)
         user_data = {
             "name"  : user.name,
             "email" : user.email,
-            "password_hash" : PasswordHasher().hash(user.password_hash)
+            "password_hash" : await password_hasher().ahash(user.password_hash)
         }
 
-        new_user = self.users_repo.create_user(user_data)   
-        producer.send_task_email("user-created-topic", user_data["name"], user_data["email"])
+        new_user = await call_service(self.users_repo.create_user, user_data, event=self._user_created_event(user_data))
         logger.info("User created: %s", user_data['email'])
         return new_user
 
     @user_exceptions_trap
-    def verify_credentials(self, loginData: dtoLogin):
+    async def verify_credentials(self, loginData: dtoLogin):
         # Simple repo-level login that just verifies password and returns user info message
-        user = self.users_repo.login_check(loginData.email)
+        user = await call_service(self.users_repo.login_check, loginData.email)
+        await call_service(self.users_repo.end_read)
+        hasher = password_hasher()
         try:
-            PasswordHasher().verify(user.password_hash, loginData.password)
+            with PASSWORD_VERIFY_SECONDS.time():
+                await hasher.averify(user.password_hash, loginData.password)
         except VerifyMismatchError:
             raise InputIncorrectPassword()
-        return {"message": "Успешный вход", "user_id": user.id}
\ No newline at end of file
+        if hasher.needs_rehash(user.password_hash):
+            # пароль известен только сейчас — пересчитываем хеш с текущими параметрами
+            try:
+                new_hash = await hasher.ahash(loginData.password)
+                await call_service(self.users_repo.update_password_hash, user.id, new_hash)
+                logger.info("Password hash upgraded: user_id=%s", user.id)
+            except HashingQueueFull:
+                logger.warning("Rehash skipped, hashing queue full: user_id=%s", user.id)
+        return {"message": "Успешный вход", "user_id": user.id}
+
+    def _user_created_event(self, user_data: dict) -> dict:
+        # пишется в outbox в транзакции пользователя, в Kafka его отправляет services.outbox_relay
+        return {
+            "topic": get_settings().KAFKA_EMAIL_TOPIC,
+            "key": user_data["email"],
+            "payload": producer.user_created_message(user_data["name"], user_data["email"]),
+        }
+
+    def _validate_new_user(self, user: dtoUCreate, email_exists) -> None:
+        if email_exists:
+            logger.warning("Попытка создать пользователя с существующим email: %s", user.email)
+            raise EmailExists()
+        if user.name.strip().lower() in ["admin", "test", "user"]:
+            logger.warning("Введено недопустимое имя: %s", user.email)
+            raise IncorrectName()
+        if not re.match(r"^(?=.*[A-Z])(?=.*\d).+$", user.password_hash):
+            logger.warning("Введён недопустимый пароль: %s", user.email)
+            raise IncorrectPassword() #кажется тут больше про validation_error и ошибка 422
+
+
+class AsyncUsersService(UsersService):
+    """UsersService for DB_ASYNC mode: the repository methods are awaited."""
+
+    @user_exceptions_trap
+    async def get_user(self, user_id: int):
+        return await self.users_repo.get_user(user_id)
@@ -1,4 +1,6 @@
-from typing import Optional
+from contextlib import contextmanager
+import threading
+from typing import Callable, Literal, Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -14,18 +16,97 @@ class Settings(BaseSettings):
     #DATABASE_URL_LOCAL: str | None = None
     YA_USER: Optional[str] = None
     YA_PASSWORD: Optional[str] = None
+    # email consumer: пул SMTP-соединений (логин — YA_USER/YA_PASSWORD)
+    SMTP_HOST: str = "smtp.yandex.ru"
+    SMTP_PORT: int = 465
+    SMTP_SSL: bool = True
+    SMTP_TIMEOUT: float = 30
+    SMTP_POOL_SIZE: int = 4
+    EMAIL_CONSUMER_GROUP: str = "todo-email-group"
+    EMAIL_WORKERS: int = 4  # потоков отправки в одной реплике
+    EMAIL_BATCH_SIZE: int = 100
+    EMAIL_BATCH_TIMEOUT: float = 1.0
+    # повторы при временных ошибках SMTP: экспоненциальная задержка, затем DLQ
+    EMAIL_RETRY_TOPIC: str = "todo-email-retry"
+    EMAIL_DLQ_TOPIC: str = "todo-email-dlq"
+    EMAIL_MAX_RETRIES: int = 5
+    EMAIL_RETRY_BACKOFF: float = 5.0
+    EMAIL_RETRY_BACKOFF_MAX: float = 600.0
+    # dedup по event_id: сколько хранить отметки и как часто чистить
+    EMAIL_DEDUP_TTL_HOURS: int = 168
+    EMAIL_DEDUP_CLEANUP_INTERVAL: float = 3600.0
     LOGLEVEL: str = "INFO"
 
+    # async-режим: AsyncEngine (asyncpg) + async репозитории и сервисы
+    DB_ASYNC: bool = False
+
+    # пул соединений
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # за PgBouncer (transaction pooling): NullPool и без кэша prepared statements
+    DB_PGBOUNCER: bool = False
+    # профилирование SQL по запросам: заголовок Server-Timing, список запросов в логе,
+    # предупреждение, если один и тот же запрос повторился SQL_PROFILE_REPEAT_THRESHOLD раз (N+1)
+    SQL_PROFILE: bool = False
+    SQL_PROFILE_REPEAT_THRESHOLD: int = 5
+
+    # argon2: отдельный ограниченный пул, при переполнении очереди — 429
+    HASH_WORKERS: int = 4
+    HASH_QUEUE_SIZE: int = 64
+    HASH_USE_PROCESSES: bool = False
+    # параметры новых хешей; старые пересчитываются при успешном логине
+    # подобрать под железо: python -m benchmarks.calibrate_argon2 --target-ms 250
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+
+    # Kafka producer: события о регистрации для email-consumer
+    KAFKA_BOOTSTRAP_SERVERS: str = "kafka:9092"
+    KAFKA_EMAIL_TOPIC: str = "user-created-topic"
+    # число партиций ограничивает число реплик email-consumer, работающих параллельно
+    KAFKA_EMAIL_PARTITIONS: int = 6
+    KAFKA_REPLICATION_FACTOR: int = 1
+    KAFKA_LINGER_MS: int = 20
+    KAFKA_BATCH_SIZE: int = 65536  # байт на партицию
+    KAFKA_COMPRESSION: str = "lz4"
+    # очередь librdkafka в памяти процесса; при переполнении relay откладывает остаток пачки
+    # сразу (drop) или после ожидания до KAFKA_BLOCK_TIMEOUT (block)
+    KAFKA_QUEUE_MAX_MESSAGES: int = 10000
+    KAFKA_QUEUE_FULL_POLICY: Literal["drop", "block"] = "drop"
+    KAFKA_BLOCK_TIMEOUT: float = 1.0
+    KAFKA_FLUSH_TIMEOUT: float = 10.0
+    # outbox relay (python -m services.outbox_relay)
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL: float = 1.0
+    # /metrics relay-процесса (очередь librdkafka, доставлено/не доставлено); 0 — не поднимать
+    OUTBOX_METRICS_PORT: int = 9101
+    # кеш списков задач: none | local (LRU в процессе) | redis (общий для всех воркеров)
+    # local виден только своему процессу — при нескольких воркерах держать TTL коротким
+    TASK_CACHE_BACKEND: Literal["none", "local", "redis"] = "local"
+    TASK_CACHE_SIZE: int = 10000
+    TASK_CACHE_TTL: float = 5.0
+    TASK_CACHE_REDIS_URL: str = "redis://redis:6379/0"
+
     #Settings JWT
     JWT_SECRET: str
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TTL_MINUTES: int = 15
     REFRESH_TTL_DAYS: int = 14
+    # проверенные access-токены в памяти процесса до их exp; 0 — без кэша
+    JWT_CACHE_SIZE: int = 10000
 
     @property
     def db_url(self) -> str:
         return f"postgresql+psycopg2://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
 
+    @property
+    def async_db_url(self) -> str:
+        return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+
     model_config = SettingsConfigDict(env_file=".env")
 
     @property
@@ -34,7 +115,66 @@ class Settings(BaseSettings):
         return self.REFRESH_TTL_DAYS
 
 
+_settings: Settings | None = None
+_override: Settings | None = None
+_override_values: dict = {}
+_lock = threading.Lock()
+_listeners: list[Callable[[Settings], None]] = []
+
+
 def get_settings() -> "Settings":
-    """Dependency used by FastAPI endpoints and other helpers."""
-    return Settings()
+    """Dependency used by FastAPI endpoints and other helpers.
+
+    Settings are read from the environment and .env once per process;
+    use reload_settings() to pick up changes.
+    """
+    global _settings
+    if _override is not None:
+        return _override
+    if _settings is None:
+        with _lock:
+            if _settings is None:
+                _settings = Settings()
+    return _settings
+
+
+def on_reload(callback: Callable[[Settings], None]) -> Callable[[Settings], None]:
+    """Register a callback run with the new Settings after reload or override."""
+    _listeners.append(callback)
+    return callback
+
+
+def _notify(settings: Settings) -> None:
+    for callback in _listeners:
+        callback(settings)
+
+
+def reload_settings() -> "Settings":
+    """Re-read environment and .env (SIGHUP handler in main.py).
+
+    Only values read per request are affected; the DB engines and executors
+    built at startup keep their configuration until restart.
+    """
+    global _settings, _override
+    settings = Settings()
+    with _lock:
+        _settings = settings
+        if _override is not None:
+            _override = settings.model_copy(update=_override_values)
+    _notify(get_settings())
+    return settings
+
 
+@contextmanager
+def override_settings(**values):
+    """Temporarily replace the values returned by get_settings() (tests)."""
+    global _override, _override_values
+    previous = _override, _override_values
+    _override_values = {**_override_values, **values}
+    _override = get_settings().model_copy(update=values)
+    _notify(_override)
+    try:
+        yield _override
+    finally:
+        _override, _override_values = previous
+        _notify(get_settings())
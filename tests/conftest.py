@@ -1,4 +1,5 @@
 
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
 from unittest.mock import MagicMock, Mock
@@ -8,35 +9,40 @@ import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm.session import Session
-from api.dependencies import tasks_service, users_service
+from sqlalchemy.pool import StaticPool
+from api.dependencies import db_session, tasks_service, users_service
+from api.middleware import RequestContextMiddleware
 from db.Base import Base
+from logger.logger import get_logger
+from models.models import User
 from repository.repository import AbstractRepositoryUser, AbstractRepositoryTask
 from repository.task_Repository import SQLTasksRepository
 from repository.user_Repository import SQLUsersRepository
 from sqlalchemy import event
+from services.task_cache import LocalTaskListCache
 from services.task_service import TasksService
 from services.user_service import UsersService
 from api.router import api_router
 from api.exceptions_handlers import register_exception_handlers
 from api.jwt_utils import create_access_token
-from settings import get_settings
+from settings import get_settings, override_settings
 
 
 @pytest.fixture(autouse=True)
-def mock_settings(monkeypatch):
-    """Provide a minimal Settings-like object for JWT creation/validation in tests."""
-    class DummySettings:
-        ACCESS_TTL_MINUTES = 15
-        REFRESH_TTL_DAYS = 14
-        JWT_SECRET = "test-secret"
-        JWT_ALGORITHM = "HS256"
-
-    monkeypatch.setattr("settings.get_settings", lambda: DummySettings())
-    return DummySettings()
+def mock_settings():
+    """Pin JWT settings for token creation/validation in tests."""
+    with override_settings(
+        ACCESS_TTL_MINUTES=15,
+        REFRESH_TTL_DAYS=14,
+        JWT_SECRET="test-secret",
+        JWT_ALGORITHM="HS256",
+    ) as settings:
+        yield settings
 
 @pytest.fixture
 def session():
-    engine = create_engine("sqlite:///:memory:")  # in-memory база
+    # in-memory база; одно соединение на все потоки — сервисы ходят в репозиторий из threadpool
+    engine = create_engine("sqlite:///:memory:", poolclass=StaticPool, connect_args={"check_same_thread": False})
 
     @event.listens_for(engine, "connect")
     def enable_foreign_keys(dbapi_connection, connection_record):
@@ -44,7 +50,7 @@ def session():
         cursor.execute("PRAGMA foreign_keys=ON;")
         cursor.close()
     Base.metadata.create_all(engine)
-    Session = sessionmaker(bind=engine)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)  # как SessionLocal
     session = Session()
     yield session
     session.close()
@@ -163,12 +169,19 @@ def dto_cls_uptask():
 import pytest
 
 @pytest.fixture(autouse=True)
-def disable_email_sending(monkeypatch):
-    """Отключает вызов отправки писем через Kafka в тестах."""
-    monkeypatch.setattr("services.user_service.producer.send_task_email", lambda *args, **kwargs: None)
+def fresh_task_cache(monkeypatch):
+    """Свой кеш списков задач на каждый тест: id пользователей в тестовых БД повторяются."""
+    cache = LocalTaskListCache(maxsize=100, ttl=60)
+    monkeypatch.setattr("services.task_service.task_list_cache", lambda: cache)
+    return cache
 
 
 # ---------------------------------------------------ENDPOINTS---------------------------------------------- #
+@dataclass
+class TasksVersion:
+    tasks_version: int
+    tasks_updated_at: datetime
+
 @pytest.fixture
 def app():
     """Тестовое FastAPI приложение"""
@@ -189,7 +202,8 @@ def mock_users_service():
 def mock_tasks_service():
     """Мок UsersService с предопределёнными ответами"""
     mock = MagicMock()
-    # Настройка ответа метода get_user
+    # версия задач для ETag/Last-Modified
+    mock.get_tasks_version.return_value = TasksVersion(3, datetime(2025, 12, 10, 13, 45))
     return mock
 
 
@@ -221,4 +235,65 @@ def task_client(app, mock_tasks_service):
     client = TestClient(app, headers={"Authorization": f"Bearer {token}"})    
     yield client    
     # Очищаем переопределения после теста
-    app.dependency_overrides.clear()
\ No newline at end of file
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def traced_client():
+    """Приложение с одним sync-эндпоинтом за RequestContextMiddleware."""
+    traced_app = FastAPI()
+
+    @traced_app.get("/ping")
+    def ping():
+        # sync-эндпоинт выполняется в threadpool — id запроса должен дойти и туда
+        get_logger("tests.traced").info("ping")
+        return {"ok": True}
+
+    traced_app.add_middleware(RequestContextMiddleware)
+    return TestClient(traced_app)
+
+# ---------------------------------------------------ENDPOINTS + DB---------------------------------------------- #
+
+@contextmanager
+def _max_queries(engine, limit: int):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "after_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "after_cursor_execute", record)
+    assert len(statements) <= limit, f"{len(statements)} queries, expected <= {limit}:\n" + "\n".join(statements)
+
+@pytest.fixture
+def max_queries():
+    """``with max_queries(engine, n):`` fails if the block runs more than n SQL statements on engine."""
+    return _max_queries
+
+@pytest.fixture
+def db_engine():
+    # одно соединение на все потоки: эндпоинты выполняются в threadpool
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def db_task_client(app, db_engine):
+    """Настоящие сервисы и репозитории на SQLite, пользователь 1 авторизован."""
+    Session = sessionmaker(bind=db_engine, autoflush=False, expire_on_commit=False)
+    with Session() as db:
+        db.add(User(id=1, name="Ivan", email="ivan@example.com", password_hash="x"))
+        db.commit()
+
+    def override_db():
+        with Session() as db:
+            yield db
+
+    app.dependency_overrides[db_session] = override_db
+    token = create_access_token(user_id=1, settings=get_settings())
+    yield TestClient(app, headers={"Authorization": f"Bearer {token}"})
+    app.dependency_overrides.clear()
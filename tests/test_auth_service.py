@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime, timedelta
 from argon2 import PasswordHasher
 from hashlib import sha256
@@ -22,7 +23,7 @@ def test_authenticate_stores_session(session, repo_user, repo_auth):
     auth_repo = SQLAuthRepository(session)
     auth_service = AuthService(users_service, auth_repo)
 
-    res = auth_service.authenticate(dtoLogin(email="tom@example.com", password=pwd), settings=__import__('settings').get_settings())
+    res = asyncio.run(auth_service.authenticate(dtoLogin(email="tom@example.com", password=pwd), settings=__import__('settings').get_settings()))
 
     assert "access_token" in res and "refresh_token" in res
 
@@ -42,7 +43,7 @@ def test_authenticate_incorrect_password(session, repo_user):
     auth_service = AuthService(users_service, auth_repo)
 
     with pytest.raises(InputIncorrectPassword):
-        auth_service.authenticate(dtoLogin(email="tom2@example.com", password="BadPass"), settings=__import__('settings').get_settings())
+        asyncio.run(auth_service.authenticate(dtoLogin(email="tom2@example.com", password="BadPass"), settings=__import__('settings').get_settings()))
 
 
 def test_refresh_rotates_tokens(session, repo_user, repo_auth):
@@ -54,7 +55,7 @@ def test_refresh_rotates_tokens(session, repo_user, repo_auth):
     auth_repo = SQLAuthRepository(session)
     auth_service = AuthService(users_service, auth_repo)
 
-    res = auth_service.authenticate(dtoLogin(email="sam@example.com", password=pwd), settings=__import__('settings').get_settings())
+    res = asyncio.run(auth_service.authenticate(dtoLogin(email="sam@example.com", password=pwd), settings=__import__('settings').get_settings()))
     old_refresh = res["refresh_token"]
     old_hash = sha256(old_refresh.encode("utf-8")).hexdigest()
 
@@ -1,9 +1,34 @@
+import asyncio
+import csv
+import json
+import logging
+import os
+import signal
+import threading
+import time
 from datetime import datetime
-from fastapi import Response
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
 import pytest
-from schemas.schemas import LoginData, TaskOut, TasksToOwner, UserOut
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+import main
+import settings
+from api import auth, importer
+from api.endpoints import task_endpoints
+from api.exceptions_handlers import register_exception_handlers
+from api.importer import read_record_chunks, validate_records
+from api.jwt_utils import create_access_token, create_refresh_token
+from api.middleware import RequestContextMiddleware
+from api.pagination import encode_cursor
+from db.pool_stats import PoolWaitStats, TimedQueuePool, pool_status
+from db.query_stats import instrument_engine
+from logger.logger import JsonFormatter, RequestIdFilter, _install, request_id_var
+from models.models import Task, User
+from schemas.schemas import BULK_MAX_ITEMS, LoginData, TaskOut, TasksToOwner, UserOut
 from services.task_exceptions import NotFoundUserForTask, TaskNotFound
-from services.user_exceptions import EmailExists, IncorrectName, IncorrectPassword, InputIncorrectPassword, UserNotFound
+from services.user_exceptions import EmailExists, IncorrectName, IncorrectPassword, InputIncorrectPassword, UserNotFound, HashingQueueFull
+from settings import get_settings, override_settings
 
 def test_get_user_success(client, mock_users_service):
     """Тест успешного получения пользователя"""    
@@ -95,6 +120,14 @@ def test_invalidEmail_create_user(client, mock_users_service):
     assert "detail" in response_data
     assert response_data["detail"] == "Пользователь с таким e-mail уже существует"
 
+def test_create_user_hashing_overloaded(client, mock_users_service):
+    mock_users_service.create_user.side_effect = HashingQueueFull
+    data = {"name": "Иван", "email": "ivan@example.com", "password_hash": "Secure_password1"}
+    response = client.post("/users/create", json=data)
+    assert response.status_code == 429
+    assert response.json()["code"] == "too_many_requests"
+
+
 def test_invalidName_create_user(client, mock_users_service):
     mock_users_service.create_user.side_effect = IncorrectName
     url = "/users/create"
@@ -269,6 +302,9 @@ def test_get_task_not_owner(task_client, mock_tasks_service):
     assert response.status_code == 404
     assert response_data["detail"] == "Задача не найдена"
     mock_tasks_service.get_task.assert_called_once()
+    # совпавший ETag пользователя и «*» не выдают 304 для чужой задачи
+    for headers in ({"If-None-Match": '"1.3"'}, {"If-None-Match": "*"}):
+        assert task_client.get("/tasks/1", headers=headers).status_code == 404
 
 def test_getAll_tasks(task_client, mock_tasks_service):
     mock_tasks_service.get_user_tasks.return_value = [
@@ -286,13 +322,13 @@ def test_getAll_tasks(task_client, mock_tasks_service):
     assert len(data) == 2
     assert data[0]["id"] == 1
     assert data[0]["is_done"] == True
-    mock_tasks_service.get_user_tasks.assert_called_once_with(1, True, None)
+    mock_tasks_service.get_user_tasks.assert_called_once_with(1, True, None, after=None, limit=100, version=3)
     
     mock_tasks_service.get_user_tasks.reset_mock()
     
     response_no_param = task_client.get("/tasks/all/")
     assert response_no_param.status_code == 200
-    mock_tasks_service.get_user_tasks.assert_called_once_with(1, None, None)
+    mock_tasks_service.get_user_tasks.assert_called_once_with(1, None, None, after=None, limit=100, version=3)
 
 
 def test_getAll_TaskNotFound(task_client, mock_tasks_service):
@@ -305,14 +341,14 @@ def test_getAll_TaskNotFound(task_client, mock_tasks_service):
     assert response_no_param.status_code == 200
     assert isinstance(data, list)
     assert data == []
-    mock_tasks_service.get_user_tasks.assert_called_once_with(1, None, None)
+    mock_tasks_service.get_user_tasks.assert_called_once_with(1, None, None, after=None, limit=100, version=3)
     
     mock_tasks_service.get_user_tasks.reset_mock()
     response = task_client.get("/tasks/all/", params={"isdone": "true"})
     data = response.json()
     assert response.status_code == 200
     assert data == []
-    mock_tasks_service.get_user_tasks.assert_called_once_with(1, True, None)
+    mock_tasks_service.get_user_tasks.assert_called_once_with(1, True, None, after=None, limit=100, version=3)
 
 
 def test_get_user_task(task_client, mock_tasks_service):
@@ -326,7 +362,7 @@ def test_get_user_task(task_client, mock_tasks_service):
     assert response_no_param.status_code == 200
     assert isinstance(response_data, list)
     assert len(response_data) == 2
-    mock_tasks_service.get_user_tasks.assert_called_once_with(1, None, None)
+    mock_tasks_service.get_user_tasks.assert_called_once_with(1, None, None, after=None, limit=100, version=3)
 
     mock_tasks_service.get_user_tasks.reset_mock()
 
@@ -335,7 +371,7 @@ def test_get_user_task(task_client, mock_tasks_service):
     assert response_isdone.status_code == 200
     assert isinstance(response_data, list)
     assert len(response_data) == 2
-    mock_tasks_service.get_user_tasks.assert_called_once_with(1, True, None)
+    mock_tasks_service.get_user_tasks.assert_called_once_with(1, True, None, after=None, limit=100, version=3)
 
     mock_tasks_service.get_user_tasks.reset_mock()
 
@@ -344,7 +380,7 @@ def test_get_user_task(task_client, mock_tasks_service):
     assert response_isdone_deadline.status_code == 200
     assert isinstance(response_data, list)
     assert len(response_data) == 2
-    mock_tasks_service.get_user_tasks.assert_called_once_with(1, True, datetime(2025, 12, 10, 13, 45))
+    mock_tasks_service.get_user_tasks.assert_called_once_with(1, True, datetime(2025, 12, 10, 13, 45), after=None, limit=100, version=3)
 
 
 def test_get_user_tasks_forbidden(task_client, mock_tasks_service):
@@ -361,7 +397,7 @@ def test_get_user_task_TaskNotFound(task_client, mock_tasks_service):
     data = response_no_param.json()
     assert response_no_param.status_code == 200
     assert data == []
-    mock_tasks_service.get_user_tasks.assert_called_once_with(1, None, None)
+    mock_tasks_service.get_user_tasks.assert_called_once_with(1, None, None, after=None, limit=100, version=3)
 
     mock_tasks_service.get_user_tasks.reset_mock()
 
@@ -369,7 +405,7 @@ def test_get_user_task_TaskNotFound(task_client, mock_tasks_service):
     data = response_isdone.json()
     assert response_isdone.status_code == 200
     assert data == []
-    mock_tasks_service.get_user_tasks.assert_called_once_with(1, True, None)
+    mock_tasks_service.get_user_tasks.assert_called_once_with(1, True, None, after=None, limit=100, version=3)
 
     mock_tasks_service.get_user_tasks.reset_mock()
 
@@ -377,7 +413,50 @@ def test_get_user_task_TaskNotFound(task_client, mock_tasks_service):
     data = response_isdone_deadline.json()
     assert response_isdone_deadline.status_code == 200
     assert data == []
-    mock_tasks_service.get_user_tasks.assert_called_once_with(1, True, datetime(2025, 12, 10, 13, 45))
+    mock_tasks_service.get_user_tasks.assert_called_once_with(1, True, datetime(2025, 12, 10, 13, 45), after=None, limit=100, version=3)
+
+
+def test_task_lists_fast_serialization(task_client, mock_tasks_service):
+    mock_tasks_service.get_user_tasks.return_value = [
+        TaskOut(id=1, title="Задача", description="desc", is_done=False, owner_id=1, deadline=datetime(2025, 12, 10, 13, 45)),
+        TaskOut(id=2, title="Task 2", description="desc", is_done=True, owner_id=1, deadline=None),
+    ]
+    data = task_client.get("/tasks/all/").json()
+    assert data[0] == {"id": 1, "title": "Задача", "description": "desc", "is_done": False, "owner_id": 1, "deadline": "2025-12-10 13:45"}
+    assert data[1]["deadline"] is None
+
+    data = task_client.get("/tasks/users/1").json()
+    assert "owner_id" not in data[0]
+    assert data[0]["deadline"] == "2025-12-10 13:45"
+
+
+def test_getAll_tasks_pagination(task_client, mock_tasks_service):
+    mock_tasks_service.get_user_tasks.return_value = [
+        TaskOut(id=1, title="Task 1", description="desc", is_done=False, owner_id=1, deadline=None),
+        TaskOut(id=2, title="Task 2", description="desc", is_done=False, owner_id=1, deadline=None),
+    ]
+
+    response = task_client.get("/tasks/all/", params={"limit": 2})
+    assert response.status_code == 200
+    cursor = response.headers["X-Next-Cursor"]
+    assert cursor == encode_cursor(2)
+
+    mock_tasks_service.get_user_tasks.reset_mock()
+    response = task_client.get("/tasks/all/", params={"limit": 2, "after": cursor})
+    assert response.status_code == 200
+    mock_tasks_service.get_user_tasks.assert_called_once_with(1, None, None, after=2, limit=2, version=3)
+
+    # неполная страница — курсора нет
+    response = task_client.get("/tasks/users/1", params={"limit": 5})
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_getAll_tasks_bad_pagination(task_client, mock_tasks_service):
+    response = task_client.get("/tasks/all/", params={"after": "not-a-cursor"})
+    assert response.status_code == 422
+    response = task_client.get("/tasks/all/", params={"limit": 100000})
+    assert response.status_code == 422
+    mock_tasks_service.get_user_tasks.assert_not_called()
 
 
 def test_del_task_success(task_client, mock_tasks_service):
@@ -411,4 +490,447 @@ def test_del_task_forbidden(task_client, mock_tasks_service):
     response_data = response.json()
     assert response.status_code == 404
     assert response_data["detail"] == "Задача не найдена"
-    mock_tasks_service.del_task.assert_not_called()
\ No newline at end of file
+    mock_tasks_service.del_task.assert_not_called()
+
+def test_db_pool_stats(client):
+    response = client.get("/health/db-pool")
+    data = response.json()
+    assert response.status_code == 200
+    assert data["sync"]["pool"] == "TimedQueuePool"
+    assert {"size", "checked_out", "overflow", "checkouts", "wait_avg_ms"} <= data["sync"].keys()
+
+
+def test_pool_wait_stats_recorded():
+    engine = create_engine("sqlite://", poolclass=TimedQueuePool, pool_size=1, max_overflow=0)
+    engine.pool.wait_stats = PoolWaitStats()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert pool_status(engine)["checked_out"] == 1
+    engine.dispose()
+
+    status = pool_status(engine)
+    assert status["checked_out"] == 0
+    assert status["checkouts"] == 1
+
+
+def test_hashing_stats(client):
+    response = client.get("/health/hashing")
+    assert response.status_code == 200
+    assert {"workers", "in_flight", "queue_depth", "rejected", "latency_avg_ms"} <= response.json().keys()
+
+
+def test_jwt_cache_serves_until_exp(monkeypatch):
+    settings = get_settings()
+    cache = auth.TokenCache(maxsize=2)
+    monkeypatch.setattr(auth, "token_cache", cache)
+    token = create_access_token(user_id=5, settings=settings)
+
+    decoded = []
+    real_decode = auth.decode_token
+    monkeypatch.setattr(auth, "decode_token", lambda **kw: decoded.append(1) or real_decode(**kw))
+    credentials = auth.HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    assert asyncio.run(auth.get_current_user(credentials, settings)) == 5
+    assert asyncio.run(auth.get_current_user(credentials, settings)) == 5
+    assert len(decoded) == 1 and cache.hits == 1
+
+    # refresh-токен не попадает в кэш и отклоняется каждый раз
+    refresh, _, _ = create_refresh_token(user_id=5, settings=settings)
+    for _ in range(2):
+        with pytest.raises(auth.HTTPException) as exc:
+            asyncio.run(auth.get_current_user(auth.HTTPAuthorizationCredentials(scheme="Bearer", credentials=refresh), settings))
+        assert exc.value.status_code == 403
+    assert len(cache) == 1
+
+    # по истечении exp запись не отдаётся
+    cache.put(token, 5, time.time() - 1)
+    assert cache.get(token) is None and len(cache) == 0
+
+    for user_id in (1, 2, 3):
+        cache.put(f"token-{user_id}", user_id, time.time() + 60)
+    assert len(cache) == 2 and cache.get("token-1") is None
+
+
+def test_reload_settings_clears_token_cache(monkeypatch):
+    auth.token_cache.put("cached-token", 1, time.time() + 60)
+    monkeypatch.setenv("JWT_CACHE_SIZE", "7")
+    try:
+        reloaded = settings.reload_settings()
+        assert reloaded.JWT_CACHE_SIZE == 7
+        assert auth.token_cache.maxsize == 7 and len(auth.token_cache) == 0
+        # override из conftest по-прежнему важнее перечитанных значений
+        assert settings.get_settings().JWT_SECRET == "test-secret"
+    finally:
+        monkeypatch.undo()
+        settings.reload_settings()
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="SIGHUP только на POSIX")
+def test_sighup_reloads_settings_from_event_loop(monkeypatch):
+    """SIGHUP обрабатывается callback'ом цикла событий, пока приложение запущено."""
+    calls = []
+
+    async def serve():
+        async with main.lifespan(main.app):
+            os.kill(os.getpid(), signal.SIGHUP)
+            await asyncio.sleep(0.05)
+            # обработчик отработал между задачами, а не посреди текущего кадра
+            assert calls == ["reloaded"]
+
+    monkeypatch.setattr(main, "reload_settings", lambda: calls.append("reloaded"))
+    monkeypatch.setattr(main, "dispose_engines", lambda: asyncio.sleep(0))
+    previous = signal.getsignal(signal.SIGHUP)
+    try:
+        asyncio.run(serve())
+    finally:
+        signal.signal(signal.SIGHUP, previous)
+    assert calls == ["reloaded"]
+
+
+def test_log_queue_drops_when_full():
+    class Blocked(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.gate = threading.Event()
+            self.records = []
+
+        def emit(self, record):
+            self.gate.wait(5)
+            self.records.append(record.getMessage())
+
+    root = logging.getLogger("test-log-queue")
+    root.propagate = False
+    sink = Blocked()
+    queue_handler, listener = _install(root, [sink], use_queue=True, queue_size=2)
+    try:
+        for i in range(10):
+            root.warning("message %s", i)
+        # первое сообщение забрал поток записи, ещё два в очереди, остальные отброшены
+        assert queue_handler.dropped >= 6
+    finally:
+        sink.gate.set()
+        listener.stop()
+        root.removeHandler(queue_handler)
+    assert len(sink.records) == 10 - queue_handler.dropped
+    assert sink.records[0] == "message 0"
+
+
+def test_logging_stats(client):
+    response = client.get("/health/logging")
+    assert response.status_code == 200
+    assert response.json()["async"] is True
+
+
+def test_request_id_generated_and_logged(traced_client, caplog):
+    caplog.handler.addFilter(RequestIdFilter())
+    with caplog.at_level(logging.INFO):
+        response = traced_client.get("/ping")
+
+    request_id = response.headers["X-Request-ID"]
+    assert len(request_id) == 32
+    ping = next(r for r in caplog.records if r.name == "tests.traced")
+    access = next(r for r in caplog.records if r.name == "api.access")
+    assert ping.request_id == access.request_id == request_id
+    assert (access.method, access.path, access.status) == ("GET", "/ping", 200)
+    assert access.duration_ms >= 0
+
+
+def test_request_id_propagated_from_header(traced_client):
+    response = traced_client.get("/ping", headers={"X-Request-ID": "upstream-42"})
+    assert response.headers["X-Request-ID"] == "upstream-42"
+
+    # мусор в заголовке не попадает в логи — генерируется свой id
+    response = traced_client.get("/ping", headers={"X-Request-ID": "bad id\nline"})
+    assert response.headers["X-Request-ID"] != "bad id\nline"
+
+
+def test_request_id_on_unhandled_error(caplog):
+    failing = FastAPI()
+
+    @failing.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    register_exception_handlers(failing)
+    failing.add_middleware(RequestContextMiddleware)
+    client = TestClient(failing, raise_server_exceptions=False)
+
+    caplog.handler.addFilter(RequestIdFilter())
+    response = client.get("/boom", headers={"X-Request-ID": "upstream-500"})
+    assert response.status_code == 500
+    assert response.json()["code"] == "internal_error"
+    # 500 формирует ServerErrorMiddleware снаружи RequestContextMiddleware — id всё равно в ответе и логе
+    assert response.headers["X-Request-ID"] == "upstream-500"
+    error = next(r for r in caplog.records if r.getMessage().startswith("Unhandled exception"))
+    assert error.request_id == "upstream-500"
+
+
+def test_json_formatter():
+    record = logging.LogRecord("api.access", logging.INFO, __file__, 1, "GET %s", ("/ping",), None)
+    record.status = 200
+    record.duration_ms = 1.5
+    token = request_id_var.set("abc")
+    try:
+        RequestIdFilter().filter(record)
+    finally:
+        request_id_var.reset(token)
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "GET /ping"
+    assert entry["request_id"] == "abc"
+    assert entry["level"] == "INFO"
+    assert (entry["status"], entry["duration_ms"]) == (200, 1.5)
+
+
+def test_metrics_endpoint(traced_client, client):
+    traced_client.get("/ping")
+    traced_client.get("/ping")
+    client.get("/health/logging")  # /metrics подключён в api_router
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/ping"}' in body
+    assert 'http_requests_total{method="GET",route="/ping",status="200"}' in body
+    assert "# TYPE jwt_seconds histogram" in body
+
+
+def test_task_endpoints_query_count(db_task_client, db_engine, max_queries):
+    payload = {"title": "t", "description": "d", "is_done": False, "deadline": "2025-12-10 13:45"}
+    # INSERT и версия задач владельца, без повторного SELECT (expire_on_commit=False вместо refresh)
+    with max_queries(db_engine, 2):
+        task_id = db_task_client.post("/tasks/", json=payload).json()["id"]
+    # версия для ETag + сама задача
+    with max_queries(db_engine, 2):
+        assert db_task_client.get(f"/tasks/{task_id}").status_code == 200
+    # проверка владельца загружает задачу, репозиторий берёт её из identity map
+    with max_queries(db_engine, 3):
+        response = db_task_client.patch(f"/tasks/{task_id}/up", json={"is_done": True})
+    assert response.json()["is_done"] is True
+    with max_queries(db_engine, 2):
+        assert len(db_task_client.get("/tasks/users/1").json()) == 1
+    with max_queries(db_engine, 3):
+        assert db_task_client.delete(f"/tasks/{task_id}").status_code == 204
+
+
+def test_sql_profile_server_timing_and_repeats(db_engine, caplog):
+    instrument_engine(db_engine)
+    profiled = FastAPI()
+
+    @profiled.get("/n-plus-one")
+    def n_plus_one():
+        with db_engine.connect() as conn:
+            for i in range(6):
+                conn.execute(text("select :i"), {"i": i})
+        return {}
+
+    profiled.add_middleware(RequestContextMiddleware)
+    client = TestClient(profiled)
+
+    assert "server-timing" not in client.get("/n-plus-one").headers
+
+    with override_settings(SQL_PROFILE=True, SQL_PROFILE_REPEAT_THRESHOLD=5), caplog.at_level(logging.INFO):
+        response = client.get("/n-plus-one")
+    assert 'desc="6 queries"' in response.headers["server-timing"]
+    assert "app;dur=" in response.headers["server-timing"]
+    warning = next(r for r in caplog.records if r.name == "api.sql_profile" and r.levelno == logging.WARNING)
+    assert "select ?" in warning.getMessage()
+    summary = next(r for r in caplog.records if r.name == "api.sql_profile" and r.levelno == logging.INFO)
+    assert len(summary.sql) == 6
+
+
+def test_task_without_description(db_task_client, app):
+    task_id = db_task_client.post("/tasks/", json={"title": "no description"}).json()["id"]
+
+    # списки идут мимо response_model, одиночная задача — через него: в обоих null по схеме
+    assert db_task_client.get("/tasks/all/").json()[0]["description"] is None
+    assert db_task_client.get("/tasks/users/1").json()[0]["description"] is None
+    response = db_task_client.get(f"/tasks/{task_id}")
+    assert response.status_code == 200
+    assert response.json()["description"] is None
+
+    schemas = app.openapi()["components"]["schemas"]
+    for name in ("TaskOut", "TasksToOwner"):
+        assert {"type": "null"} in schemas[name]["properties"]["description"]["anyOf"]
+        assert "description" not in schemas[name].get("required", [])
+
+
+def test_conditional_get_task_lists(db_task_client, db_engine, max_queries):
+    payload = {"title": "t", "description": "d", "is_done": False, "deadline": "2025-12-10 13:45"}
+    task_id = db_task_client.post("/tasks/", json=payload).json()["id"]
+
+    first = db_task_client.get("/tasks/all/")
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+    # 304 отдаётся по одному чтению версии, без загрузки и сериализации задач
+    with max_queries(db_engine, 1):
+        cached = db_task_client.get("/tasks/all/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["ETag"] == etag
+    assert db_task_client.get(f"/tasks/{task_id}", headers={"If-None-Match": f"W/{etag}"}).status_code == 304
+    assert db_task_client.get("/tasks/users/1", headers={"If-None-Match": etag}).status_code == 304
+    # ETag пользователя и «*» не выдают 304 для несуществующей задачи
+    assert db_task_client.get(f"/tasks/{task_id}", headers={"If-None-Match": "*"}).status_code == 304
+    for headers in ({"If-None-Match": etag}, {"If-None-Match": "*"}):
+        assert db_task_client.get(f"/tasks/{task_id + 100}", headers=headers).status_code == 404
+
+    # любое изменение задач пользователя меняет версию
+    db_task_client.patch(f"/tasks/{task_id}/up", json={"is_done": True})
+    fresh = db_task_client.get("/tasks/all/", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["ETag"] != etag
+    assert fresh.json()[0]["is_done"] is True
+
+
+def test_conditional_get_if_modified_since(task_client, mock_tasks_service):
+    # mock: версия изменена 2025-12-10 13:45 UTC
+    mock_tasks_service.get_user_tasks.return_value = []
+    response = task_client.get("/tasks/all/")
+    assert response.headers["Last-Modified"] == "Wed, 10 Dec 2025 13:45:00 GMT"
+
+    cached = task_client.get("/tasks/all/", headers={"If-Modified-Since": "Wed, 10 Dec 2025 13:45:00 GMT"})
+    assert cached.status_code == 304
+    stale = task_client.get("/tasks/all/", headers={"If-Modified-Since": "Wed, 10 Dec 2025 13:44:59 GMT"})
+    assert stale.status_code == 200
+    # If-None-Match важнее If-Modified-Since
+    other = task_client.get("/tasks/all/", headers={"If-None-Match": '"1.999"', "If-Modified-Since": "Wed, 10 Dec 2025 13:45:00 GMT"})
+    assert other.status_code == 200
+    assert mock_tasks_service.get_user_tasks.call_count == 3
+
+
+def test_bulk_task_endpoints(db_task_client, db_engine, max_queries):
+    with Session(db_engine) as db:
+        db.add(User(id=2, name="Petr", email="petr@example.com", password_hash="x"))
+        db.add(Task(id=100, title="foreign", description="d", is_done=False, owner_id=2))
+        db.commit()
+
+    payload = [{"title": f"t{i}", "description": "d", "is_done": False, "deadline": "2025-12-10 13:45"} for i in range(3)]
+    # один INSERT ... RETURNING на всю пачку и версия владельца
+    with max_queries(db_engine, 2):
+        response = db_task_client.post("/tasks/bulk", json=payload)
+    assert response.status_code == 201
+    created = response.json()
+    assert [task["title"] for task in created] == ["t0", "t1", "t2"]
+    assert all(task["owner_id"] == 1 for task in created)
+    ids = [task["id"] for task in created]
+
+    # проверка владельца одним SELECT, executemany UPDATE на каждый набор полей, версия, итоговые строки
+    with max_queries(db_engine, 5):
+        response = db_task_client.patch("/tasks/bulk", json=[{"id": ids[0], "is_done": True}, {"id": ids[1], "title": "renamed"}])
+    assert response.status_code == 200
+    assert [(t["id"], t["is_done"], t["title"]) for t in response.json()] == [(ids[0], True, "t0"), (ids[1], False, "renamed")]
+
+    # чужая задача в пачке — 404, не меняется ничего
+    response = db_task_client.patch("/tasks/bulk", json=[{"id": ids[2], "is_done": True}, {"id": 100, "is_done": True}])
+    assert response.status_code == 404
+    assert db_task_client.get(f"/tasks/{ids[2]}").json()["is_done"] is False
+    response = db_task_client.request("DELETE", "/tasks/bulk", json=[ids[0], 100, 999])
+    assert response.status_code == 404
+    assert len(db_task_client.get("/tasks/all/").json()) == 3
+
+    response = db_task_client.patch("/tasks/bulk", json=[{"id": ids[0], "is_done": True}, {"id": ids[0], "is_done": False}])
+    assert response.status_code == 422
+
+    with max_queries(db_engine, 3):
+        response = db_task_client.request("DELETE", "/tasks/bulk", json=ids)
+    assert response.status_code == 204
+    assert db_task_client.get("/tasks/all/").json() == []
+    with Session(db_engine) as db:
+        assert db.get(Task, 100) is not None
+
+
+def test_export_tasks_stream(db_task_client, db_engine, max_queries):
+    with Session(db_engine) as db:
+        db.add(User(id=2, name="Petr", email="petr@example.com", password_hash="x"))
+        db.add(Task(title="foreign", description="d", is_done=False, owner_id=2))
+        db.commit()
+    payload = [{"title": f"t{i}", "description": "d, \"q\"", "is_done": i == 1, "deadline": "2025-12-10 13:45"} for i in range(3)]
+    db_task_client.post("/tasks/bulk", json=payload)
+
+    # один SELECT на весь экспорт, независимо от числа строк
+    with max_queries(db_engine, 1):
+        response = db_task_client.get("/tasks/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"] == 'attachment; filename="tasks.ndjson"'
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["title"] for line in lines] == ["t0", "t1", "t2"]
+    assert lines[0] == {**lines[0], "owner_id": 1, "deadline": "2025-12-10 13:45", "description": 'd, "q"'}
+
+    response = db_task_client.get("/tasks/export", params={"format": "csv", "isdone": "true"})
+    assert response.headers["content-type"] == "text/csv; charset=utf-8"
+    rows = list(csv.reader(response.text.splitlines()))
+    assert rows[0] == ["id", "title", "description", "is_done", "owner_id", "deadline"]
+    assert rows[1][1:] == ["t1", 'd, "q"', "true", "1", "2025-12-10 13:45"]
+    assert len(rows) == 2
+
+    assert db_task_client.get("/tasks/export", params={"format": "xml"}).status_code == 422
+
+
+def test_import_tasks_ndjson_and_csv(db_task_client, db_engine, max_queries, monkeypatch):
+    monkeypatch.setattr(importer, "IMPORT_CHUNK_SIZE", 2)
+
+    def off_loop(records, owner_id):
+        # валидация идёт в потоке threadpool, где нет цикла событий
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        return validate_records(records, owner_id)
+
+    monkeypatch.setattr(task_endpoints, "validate_records", off_loop)
+    body = b"\n".join([
+        b'{"title": "a", "deadline": "2025-12-10 13:45"}',
+        b'{"title": "b", "is_done": true}',
+        b"",
+        b"{not json",
+        b'{"description": "no title"}',
+        b"[1, 2]",
+        b'{"title": "c"}',
+    ])
+    # по пачке из двух строк: запись и версия владельца на пачку с валидными строками
+    with max_queries(db_engine, 4):
+        response = db_task_client.post("/tasks/import", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["imported"], result["failed"]) == (3, 3)
+    assert [error["line"] for error in result["errors"]] == [4, 5, 6]
+    assert result["errors"][1]["errors"][0]["loc"] == ["title"]
+    assert [task["title"] for task in db_task_client.get("/tasks/all/").json()] == ["a", "b", "c"]
+
+    # экспорт читается импортом обратно: лишние колонки id/owner_id игнорируются
+    exported = db_task_client.get("/tasks/export", params={"format": "csv"}).content
+    body = exported + b',"d","multi\nline, ""quoted""",false,,\n,"e",,,,2025-13-01 00:00\n,"f",x\n'
+    response = db_task_client.post("/tasks/import", params={"format": "csv"}, content=body)
+    result = response.json()
+    assert (result["imported"], result["failed"]) == (4, 2)
+    assert [error["line"] for error in result["errors"]] == [7, 8]
+    tasks = db_task_client.get("/tasks/all/").json()
+    assert [task["title"] for task in tasks] == ["a", "b", "c", "a", "b", "c", "d"]
+    assert tasks[3]["deadline"] == "2025-12-10 13:45" and tasks[4]["is_done"] is True
+    assert tasks[6]["description"] == 'multi\nline, "quoted"'
+
+    response = db_task_client.post("/tasks/import", params={"format": "csv"}, content=b"")
+    assert response.json() == {"imported": 0, "failed": 0, "errors": []}
+
+
+def test_import_parser_split_chunks():
+    body = 'title,description\n"x","a\nb"\r\n"y",\xe2\x82\xac\n'.encode("latin-1")
+
+    async def one_byte_chunks():
+        for i in range(len(body)):
+            yield body[i:i + 1]
+
+    async def collect():
+        return [chunk async for chunk in read_record_chunks(one_byte_chunks(), "csv")]
+
+    [records] = asyncio.run(collect())
+    tasks, errors = validate_records(records, owner_id=7)
+    assert errors == []
+    assert [(task.title, task.description, task.owner_id) for task in tasks] == [("x", "a\nb", 7), ("y", "€", 7)]
+
+
+def test_bulk_create_limits(task_client, mock_tasks_service):
+    assert task_client.post("/tasks/bulk", json=[]).status_code == 422
+    too_many = [{"title": "t"}] * (BULK_MAX_ITEMS + 1)
+    assert task_client.post("/tasks/bulk", json=too_many).status_code == 422
+    mock_tasks_service.create_tasks.assert_not_called()
@@ -101,8 +101,64 @@ def test_partial_update_task(repo_task, add_user, add_task):
 
 def test_get_user_tasks_with_deadline(repo_task, add_user, add_task):
     deadline = datetime(2025, 12, 10, 13, 45)
-    tasks = repo_task.get_user_tasks(user_id=9, deadline=deadline)
+    tasks = repo_task.get_user_tasks(user_id=add_user.id, deadline=deadline)
     assert len(tasks) == 1
+    # фильтры не снимают ограничение по владельцу
+    assert repo_task.get_user_tasks(user_id=9, deadline=deadline) == []
+
+def test_get_user_tasks_keyset_pages(repo_task, add_user, add_task):
+    for i in range(4):
+        repo_task.add_one({"title": f"Task {i}", "description": "d", "is_done": False, "owner_id": add_user.id})
+
+    first = repo_task.get_user_tasks(add_user.id, limit=2)
+    second = repo_task.get_user_tasks(add_user.id, after=first[-1].id, limit=2)
+    last = repo_task.get_user_tasks(add_user.id, after=second[-1].id, limit=2)
+
+    ids = [t.id for t in first + second + last]
+    assert ids == sorted(ids)
+    assert len(ids) == 5
+
+def test_get_user_tasks_projection(repo_task, add_user, add_task):
+    from schemas.schemas import TaskOut
+    rows = repo_task.get_user_tasks(add_user.id, projection=True)
+    assert len(rows) == 1
+    assert not isinstance(rows[0], repo_task.model)
+    assert rows[0].title == "Test task"
+    assert TaskOut.model_validate(rows[0]).deadline == datetime(2025, 12, 10, 13, 45)
+
+def test_projection_rows_fast_response(repo_task, add_user, add_task):
+    import json
+    from api.responses import rows_response
+    from schemas.schemas import TaskOut, TasksToOwner
+    rows = repo_task.get_user_tasks(add_user.id, projection=True)
+
+    full = json.loads(rows_response(rows, TaskOut).body)
+    short = json.loads(rows_response(rows, TasksToOwner).body)
+    assert full[0]["owner_id"] == add_user.id
+    assert full[0]["deadline"] == "2025-12-10 13:45"
+    assert short == [{k: v for k, v in full[0].items() if k != "owner_id"}]
+
+def test_task_writes_bump_owner_version(repo_task, add_user):
+    assert repo_task.get_tasks_version(1).tasks_version == 0
+    task = repo_task.add_one({"title": "t", "description": "d", "is_done": False, "owner_id": 1})
+    repo_task.up_task(task.id, {"is_done": True})
+    repo_task.del_task(task.id)
+    version = repo_task.get_tasks_version(1)
+    assert version.tasks_version == 3
+    assert version.tasks_updated_at is not None
+
+def test_tasks_version_unknown_user(repo_task):
+    with pytest.raises(TaskNotFoundRepo):
+        repo_task.get_tasks_version(42)
+
+def test_stream_user_tasks_batches(repo_task, add_user, add_task):
+    repo_task.add_many([{"title": f"Task {i}", "description": "d", "is_done": i % 2 == 0, "owner_id": add_user.id} for i in range(4)])
+    batches = list(repo_task.stream_user_tasks(add_user.id, batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    ids = [row.id for batch in batches for row in batch]
+    assert ids == sorted(ids)
+    assert sum(len(batch) for batch in repo_task.stream_user_tasks(add_user.id, check=True)) == 2
+    assert list(repo_task.stream_user_tasks(9)) == []
 
 # ---------------------------------------------------------USER TEST---------------------------------------------
 
@@ -141,3 +197,70 @@ def test_notSuccess_add_user(repo_user, add_user):
         repo_user.create_user(user)
     # Убедиться, что сессия чистая 
     assert repo_user.db.query(repo_user.model).count() == 1
+
+def test_update_password_hash(repo_user, add_user):
+    repo_user.update_password_hash(add_user.id, "new-hash")
+    assert repo_user.get_user(add_user.id).password_hash == "new-hash"
+    with pytest.raises(UserNotFoundRepo):
+        repo_user.update_password_hash(999, "new-hash")
+
+def test_add_user_writes_outbox_event(repo_user, add_user):
+    from models.models import OutboxEvent
+
+    event = {"topic": "user-created-topic", "key": "new@exam.com", "payload": {"email": "new@exam.com"}}
+    repo_user.create_user({"name": "New", "email": "new@exam.com", "password_hash": "x"}, event=event)
+    outbox = repo_user.db.query(OutboxEvent).all()
+    assert [(e.topic, e.key, e.payload) for e in outbox] == [("user-created-topic", "new@exam.com", {"email": "new@exam.com"})]
+
+    # пользователь не создан — события тоже нет
+    with pytest.raises(NotUniqEmailRepo):
+        repo_user.create_user({"name": "Dup", "email": "new@exam.com", "password_hash": "x"}, event=event)
+    assert repo_user.db.query(OutboxEvent).count() == 1
+
+def test_processed_events_dedup_and_ttl(session):
+    from datetime import datetime, timedelta, timezone
+    from models.models import ProcessedEvent
+    from repository.processed_events_repository import SQLProcessedEventsRepository
+
+    repo = SQLProcessedEventsRepository(session)
+    repo.mark(["a", "b"])
+    repo.mark(["b", "c"])  # повторная отметка не падает
+    session.commit()
+    assert repo.seen(["a", "c", "x"]) == {"a", "c"}
+
+    session.get(ProcessedEvent, "a").processed_at = datetime.now(timezone.utc) - timedelta(days=30)
+    session.commit()
+    assert repo.delete_older_than(datetime.now(timezone.utc) - timedelta(days=7)) == 1
+    assert repo.seen(["a", "b", "c"]) == {"b", "c"}
+
+# ---------------------------------------------------------ASYNC TEST--------------------------------------------
+
+def test_async_repositories_share_sync_queries():
+    pytest.importorskip("aiosqlite")
+    import asyncio
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from db.Base import Base
+    from repository.task_Repository import AsyncSQLTasksRepository
+    from repository.user_Repository import AsyncSQLUsersRepository
+
+    async def scenario():
+        engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+            repo_user = AsyncSQLUsersRepository(db)
+            repo_task = AsyncSQLTasksRepository(db)
+            user = await repo_user.create_user({"name": "Don Test", "email": "async@exam.com", "password_hash": "password"})
+            task = await repo_task.add_one({"title": "Async task", "description": "d", "is_done": False, "owner_id": user.id})
+            tasks = await repo_task.get_user_tasks(user.id)
+            assert await repo_task.import_many([{"title": "Imported", "description": None, "is_done": None, "owner_id": user.id}]) == 1
+            streamed = [(row.title, row.is_done) async for batch in repo_task.stream_user_tasks(user.id) for row in batch]
+            assert streamed == [("Async task", False), ("Imported", False)]
+            with pytest.raises(TaskNotFoundRepo):
+                await repo_task.get_one(task.id + 100)
+        await engine.dispose()
+        return task, tasks
+
+    task, tasks = asyncio.run(scenario())
+    assert task.id is not None
+    assert [t.title for t in tasks] == ["Async task"]
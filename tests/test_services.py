@@ -1,3 +1,4 @@
+import asyncio
 from dataclasses import dataclass
 from datetime import datetime
 from argon2 import PasswordHasher
@@ -6,6 +7,9 @@ from repository.task_exceptions import TaskNotFoundRepo
 from repository.user_exceptions import UserNotFoundRepo
 from services.user_exceptions import EmailExists, IncorrectName, IncorrectPassword, InputIncorrectPassword 
 from services.task_exceptions import NotFoundUserForTask, TaskNotFound
+from services.password_hasher import password_hasher
+from services.outbox_relay import OUTBOX_DEFERRED, OUTBOX_DELIVERED, OUTBOX_FAILED
+from metrics import metrics
 
 # ---------------------------------------------------------USER TEST---------------------------------------------
 
@@ -22,7 +26,7 @@ def test_create_user_success(user_service, fake_repo):
     created_user = {"id": 1, "name": "Don"}
     fake_repo.create_user.return_value = created_user
 
-    result = user_service.create_user(user)
+    result = asyncio.run(user_service.create_user(user))
 
     fake_repo.create_user.assert_called_once()
     data = fake_repo.create_user.call_args[0][0]
@@ -31,6 +35,11 @@ def test_create_user_success(user_service, fake_repo):
     assert PasswordHasher().verify(data["password_hash"], "Pass123")
     assert result == created_user
 
+    # событие для email уходит в outbox вместе с пользователем
+    event = fake_repo.create_user.call_args.kwargs["event"]
+    assert event["key"] == "don@example.com"
+    assert event["payload"]["email"] == "don@example.com"
+
 def test_create_user_email_exists(user_service, fake_repo):
     """Если email уже существует — поднимается EmailExists."""
     fake_repo.login_check.return_value = True  # репозиторий нашёл email
@@ -42,7 +51,7 @@ def test_create_user_email_exists(user_service, fake_repo):
     })()
 
     with pytest.raises(EmailExists):
-        user_service.create_user(user)
+        asyncio.run(user_service.create_user(user))
 
 def test_create_user_incorrect_name(user_service, fake_repo):
     """Проверяем запрет имён admin/test/user."""
@@ -55,7 +64,7 @@ def test_create_user_incorrect_name(user_service, fake_repo):
             "password_hash": "Password1"
         })()
         with pytest.raises(IncorrectName):
-            user_service.create_user(user)
+            asyncio.run(user_service.create_user(user))
 
 def test_create_user_weak_password(user_service, fake_repo):
     """Пароль без заглавной буквы или цифры — ошибка."""
@@ -70,9 +79,50 @@ def test_create_user_weak_password(user_service, fake_repo):
             "password_hash": pwd
         })()
         with pytest.raises(IncorrectPassword):
-            user_service.create_user(user)
+            asyncio.run(user_service.create_user(user))
+
+
+
+def test_verify_credentials_rehashes_outdated_hash(user_service, fake_repo):
+    """Хеш со старыми параметрами пересчитывается при успешном логине."""
+    old_hash = PasswordHasher(time_cost=1, memory_cost=8192, parallelism=1).hash("Pass123")
+    fake_repo.login_check.return_value = type("user", (), {"id": 7, "password_hash": old_hash})()
+    login = type("dto", (), {"email": "don@example.com", "password": "Pass123"})()
+
+    assert asyncio.run(user_service.verify_credentials(login))["user_id"] == 7
+
+    user_id, new_hash = fake_repo.update_password_hash.call_args[0]
+    assert user_id == 7
+    assert PasswordHasher().verify(new_hash, "Pass123")
+    assert not password_hasher().needs_rehash(new_hash)
 
+    fake_repo.update_password_hash.reset_mock()
+    fake_repo.login_check.return_value.password_hash = new_hash
+    asyncio.run(user_service.verify_credentials(login))
+    fake_repo.update_password_hash.assert_not_called()
 
+def test_verify_credentials_records_verify_time(user_service, fake_repo):
+    from services.user_service import PASSWORD_VERIFY_SECONDS
+
+    fake_repo.login_check.return_value = type("user", (), {"id": 7, "password_hash": asyncio.run(password_hasher().ahash("Pass123"))})()
+    login = type("dto", (), {"email": "don@example.com", "password": "Pass123"})()
+    before = PASSWORD_VERIFY_SECONDS.count()
+    asyncio.run(user_service.verify_credentials(login))
+    assert PASSWORD_VERIFY_SECONDS.count() == before + 1
+
+def test_verify_credentials_releases_db_before_hashing(user_service, fake_repo, monkeypatch):
+    """Транзакция чтения завершается до того, как логин встаёт в очередь argon2."""
+    fake_repo.login_check.return_value = type("user", (), {"id": 7, "password_hash": asyncio.run(password_hasher().ahash("Pass123"))})()
+    hasher = password_hasher()
+    averify = hasher.averify
+
+    async def check_released(*args):
+        fake_repo.end_read.assert_called_once()
+        return await averify(*args)
+
+    monkeypatch.setattr(hasher, "averify", check_released)
+    login = type("dto", (), {"email": "don@example.com", "password": "Pass123"})()
+    assert asyncio.run(user_service.verify_credentials(login))["user_id"] == 7
 
 # ---------------------------------------------------------TASK TEST---------------------------------------------
 
@@ -268,3 +318,507 @@ def test_deltask_notExists(task_service, fake_repo, response_task):
 
 
 
+
+# ---------------------------------------------------------ASYNC TEST--------------------------------------------
+
+def test_async_task_service_awaits_repo(response_task):
+    from unittest.mock import AsyncMock
+    from services.task_service import AsyncTasksService
+
+    repo = AsyncMock()
+    repo.get_one.return_value = response_task
+    service = AsyncTasksService.__new__(AsyncTasksService)
+    service.tasks_repo = repo
+
+    assert asyncio.run(service.get_task(1)) == response_task
+
+    repo.get_one.side_effect = TaskNotFoundRepo
+    with pytest.raises(TaskNotFound):
+        asyncio.run(service.get_task(12))
+
+
+def test_hashing_executor_rejects_when_queue_full():
+    import threading
+    from services.password_hasher import HashingExecutor
+    from services.user_exceptions import HashingQueueFull
+
+    hasher = HashingExecutor(workers=1, queue_size=1)
+    release = threading.Event()
+    running = [hasher.submit(release.wait), hasher.submit(release.wait)]
+    with pytest.raises(HashingQueueFull):
+        hasher.submit(release.wait)
+    release.set()
+    for future in running:
+        future.result(timeout=5)
+
+    password_hash = asyncio.run(hasher.ahash("Pass123"))
+    assert PasswordHasher().verify(password_hash, "Pass123")
+    assert asyncio.run(hasher.averify(password_hash, "Pass123"))
+    stats = hasher.stats.snapshot(hasher.workers)
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 4
+    assert stats["in_flight"] == 0
+    hasher.shutdown()
+
+
+# ---------------------------------------------------------PRODUCER TEST--------------------------------------------
+
+class FakeKafkaProducer:
+    """Буфер на `capacity` сообщений, доставка — на flush."""
+
+    def __init__(self, conf, capacity=2):
+        self.conf = conf
+        self.capacity = capacity
+        self.queue = []
+        self.produced = []
+
+    def produce(self, topic, value=None, key=None, on_delivery=None, headers=None):
+        if len(self.queue) >= self.capacity:
+            raise BufferError("Local: Queue full")
+        self.queue.append((topic, on_delivery))
+        self.produced.append(topic)
+
+    def poll(self, timeout=0):
+        return 0
+
+    def flush(self, timeout=-1):
+        for topic, callback in self.queue:
+            if callback:
+                callback(None, None)
+        self.queue.clear()
+        return 0
+
+    def __len__(self):
+        return len(self.queue)
+
+
+def test_outbox_relay_deletes_only_delivered(session):
+    from sqlalchemy.orm import Session
+    from models.models import OutboxEvent
+    from services.outbox_relay import OutboxRelay
+    from settings import get_settings
+
+    for i in range(3):
+        session.add(OutboxEvent(topic="topic", key=f"k{i}", payload={"n": i}))
+    session.commit()
+
+    class RelayProducer(FakeKafkaProducer):
+        def flush(self, timeout=-1):
+            # второе сообщение брокер не подтвердил
+            for i, (topic, callback) in enumerate(self.queue):
+                callback("broker down" if i == 1 else None, None)
+            self.queue.clear()
+            return 0
+
+    settings = get_settings().model_copy(update={"OUTBOX_BATCH_SIZE": 10})
+    relay = OutboxRelay(lambda: Session(bind=session.get_bind()), settings,
+                        producer_factory=lambda conf: RelayProducer(conf, capacity=10))
+    delivered, failed = OUTBOX_DELIVERED.value(), OUTBOX_FAILED.value()
+    assert relay.run_once() == 2
+    session.expire_all()
+    assert [e.key for e in session.query(OutboxEvent)] == ["k1"]
+    assert (OUTBOX_DELIVERED.value() - delivered, OUTBOX_FAILED.value() - failed) == (2, 1)
+    assert relay.queue_depth() == 0
+
+
+@pytest.mark.parametrize("policy, capacity, delivered", [("drop", 2, 2), ("block", 0, 0)])
+def test_outbox_relay_defers_when_queue_full(session, policy, capacity, delivered):
+    """Полная очередь producer: остаток пачки не теряется, а остаётся в outbox."""
+    import time
+    from sqlalchemy.orm import Session
+    from models.models import OutboxEvent
+    from services.outbox_relay import OutboxRelay
+    from settings import get_settings
+
+    for i in range(3):
+        session.add(OutboxEvent(topic="topic", key=f"k{i}", payload={"n": i}))
+    session.commit()
+
+    settings = get_settings().model_copy(update={"KAFKA_QUEUE_FULL_POLICY": policy, "KAFKA_BLOCK_TIMEOUT": 0.2})
+    relay = OutboxRelay(lambda: Session(bind=session.get_bind()), settings,
+                        producer_factory=lambda conf: FakeKafkaProducer(conf, capacity=capacity))
+    deferred = OUTBOX_DEFERRED.value()
+    started = time.monotonic()
+    assert relay.run_once() == delivered
+    # block ждёт освобождения очереди до KAFKA_BLOCK_TIMEOUT, drop откладывает сразу
+    assert (time.monotonic() - started >= 0.2) == (policy == "block")
+    assert OUTBOX_DEFERRED.value() - deferred == 3 - delivered
+    session.expire_all()
+    assert [e.key for e in session.query(OutboxEvent)] == [f"k{i}" for i in range(delivered, 3)]
+
+
+def test_metrics_served_without_app():
+    """Relay отдаёт тот же реестр метрик своим HTTP-сервером."""
+    from urllib.request import urlopen
+
+    server = metrics.serve(0, host="127.0.0.1")
+    try:
+        with urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+            body = response.read().decode()
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert "# TYPE outbox_relay_delivered_total counter" in body
+
+
+# ---------------------------------------------------------EMAIL TEST--------------------------------------------
+
+@pytest.fixture
+def smtp_server():
+    """Локальный SMTP (aiosmtpd) вместо smtp.yandex.ru."""
+    controller_mod = pytest.importorskip("aiosmtpd.controller")
+
+    class Collect:
+        def __init__(self):
+            self.received = []
+
+        async def handle_DATA(self, server, session, envelope):
+            self.received.append(envelope.rcpt_tos[0])
+            return "250 OK"
+
+    import socket
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    handler = Collect()
+    controller = controller_mod.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+
+def test_email_sender_reuses_pooled_connections(smtp_server):
+    from services.email_sender import EmailSender, SMTPConnectionPool
+
+    controller, handler = smtp_server
+    pool = SMTPConnectionPool(controller.hostname, controller.port, use_ssl=False, size=3)
+    sender = EmailSender(pool, "noreply@example.com", workers=3)
+    emails = [{"email": f"user{i}@example.com", "subject": "Hi", "body": "body"} for i in range(30)]
+    emails.append({"subject": "no recipient"})
+
+    errors = sender.send_many(emails)
+    sender.close()
+
+    assert errors[:30] == [None] * 30
+    assert isinstance(errors[30], KeyError)
+    assert sorted(handler.received) == sorted(e["email"] for e in emails[:30])
+    assert pool.opened <= 3
+
+
+class FakeKafkaMessage:
+    def __init__(self, headers=None, topic="todo-email-kafka", value=b"{}", offset=42):
+        self._headers = [(k, v.encode()) for k, v in (headers or {}).items()]
+        self._topic = topic
+        self._value = value
+        self._offset = offset
+
+    def error(self):
+        return None
+
+    def key(self):
+        return None
+
+    def value(self):
+        return self._value
+
+    def headers(self):
+        return self._headers
+
+    def topic(self):
+        return self._topic
+
+    def partition(self):
+        return 0
+
+    def offset(self):
+        return self._offset
+
+
+def test_email_retry_policy_routes_failures():
+    import smtplib
+    from services.email_retry import RetryPolicy, headers_dict, not_before
+
+    policy = RetryPolicy("retry", "dlq", max_retries=2, backoff=10, backoff_max=15)
+    throttled = smtplib.SMTPDataError(451, b"try again later")
+
+    topic, headers = policy.route(FakeKafkaMessage(), throttled, now=1000)
+    routed = FakeKafkaMessage(dict(headers), topic=topic)
+    assert topic == "retry"
+    assert headers_dict(routed)["x-attempt"] == "1"
+    assert headers_dict(routed)["x-origin"] == "todo-email-kafka/0/42"
+    assert 1005 <= not_before(routed) <= 1010
+
+    topic, headers = policy.route(routed, throttled, now=1000)
+    assert topic == "retry" and 1007.5 <= not_before(FakeKafkaMessage(dict(headers))) <= 1015  # задержка ограничена backoff_max
+    # попытки исчерпаны
+    topic, headers = policy.route(FakeKafkaMessage(dict(headers)), throttled)
+    assert topic == "dlq" and dict(headers)["x-attempt"] == "3"
+    assert dict(headers)["x-origin"] == "todo-email-kafka/0/42"
+
+    # постоянные ошибки — сразу в DLQ
+    assert policy.route(FakeKafkaMessage(), smtplib.SMTPDataError(550, b"no such user"))[0] == "dlq"
+    assert policy.route(FakeKafkaMessage(), ValueError("bad json"))[0] == "dlq"
+    assert policy.route(FakeKafkaMessage(), smtplib.SMTPServerDisconnected())[0] == "retry"
+
+
+def test_email_consumer_batch_commit_and_drain():
+    import json
+    import smtplib
+    from services.consumer import EmailConsumer
+    from settings import get_settings
+
+    settings = get_settings().model_copy(update={"KAFKA_EMAIL_TOPIC": "emails", "EMAIL_RETRY_TOPIC": "emails-retry"})
+    batch = [
+        FakeKafkaMessage(topic="emails", value=json.dumps({"email": f"u{i}@example.com"}).encode(), offset=i)
+        for i in range(2)
+    ]
+
+    class FakeConsumer:
+        def __init__(self, conf):
+            self.conf = conf
+            self.stored, self.commits, self.closed = [], 0, False
+
+        def subscribe(self, topics, on_assign=None, on_revoke=None):
+            self.topics = topics
+
+        def consume(self, num_messages, timeout):
+            # SIGTERM посреди работы: текущая пачка дорабатывается и коммитится
+            worker.stop()
+            return batch
+
+        def store_offsets(self, message):
+            self.stored.append(message.offset())
+
+        def commit(self, asynchronous=True):
+            self.commits += 1
+
+        def close(self):
+            self.closed = True
+
+    class FakeSender:
+        def send_many(self, emails):
+            return [None, smtplib.SMTPServerDisconnected()]
+
+        def close(self):
+            pass
+
+    producer = FakeKafkaProducer({}, capacity=10)
+    worker = EmailConsumer(settings, FakeSender(), consumer_factory=FakeConsumer, producer_factory=lambda conf: producer)
+    assert worker.consumer.conf["partition.assignment.strategy"] == "cooperative-sticky"
+
+    worker.run()
+
+    assert worker.consumer.topics == ["emails", "emails-retry"]
+    assert worker.consumer.stored == [0, 1] and worker.consumer.commits == 1
+    assert worker.consumer.closed
+    assert producer.produced == ["emails-retry"]
+
+
+def test_email_consumer_skips_processed_events():
+    import json
+    from services.consumer import EmailConsumer
+    from settings import get_settings
+
+    class MemoryStore:
+        def __init__(self):
+            self.ids = {"old"}
+
+        def seen(self, event_ids):
+            return self.ids & set(event_ids)
+
+        def mark(self, event_ids):
+            self.ids.update(event_ids)
+
+    class RecordingSender:
+        def __init__(self):
+            self.sent = []
+
+        def send_many(self, emails):
+            self.sent.extend(e["event_id"] for e in emails)
+            return [None] * len(emails)
+
+    class OffsetsConsumer:
+        def __init__(self, conf):
+            self.stored = []
+
+        def store_offsets(self, message):
+            self.stored.append(message.offset())
+
+    store, sender = MemoryStore(), RecordingSender()
+    worker = EmailConsumer(get_settings(), sender, store, consumer_factory=OffsetsConsumer,
+                           producer_factory=lambda conf: FakeKafkaProducer(conf))
+    batch = [
+        FakeKafkaMessage(value=json.dumps({"event_id": event_id, "email": "u@example.com"}).encode(), offset=i)
+        for i, event_id in enumerate(["old", "new", "new"])
+    ]
+
+    assert worker.process_batch(batch) == 3
+    assert sender.sent == ["new"]
+    assert store.ids == {"old", "new"}
+    assert worker.consumer.stored == [0, 1, 2]
+
+    # повторная доставка той же пачки — без отправки
+    worker.process_batch(batch)
+    assert sender.sent == ["new"]
+
+
+# ---------------------------------------------------------TASK CACHE---------------------------------------------
+
+def test_task_list_cache_hits_and_invalidation(task_service, fake_repo, dto_cls_crtask):
+    from types import SimpleNamespace
+    from services.task_cache import CACHE_HITS, CACHE_MISSES, LocalTaskListCache
+
+    task_service.cache = LocalTaskListCache(maxsize=10, ttl=60)
+    fake_repo.get_user_tasks.return_value = ["row"]
+    hits, misses = CACHE_HITS.value(), CACHE_MISSES.value()
+
+    assert task_service.get_user_tasks(1, None, None, after=None, limit=100) == ["row"]
+    assert task_service.get_user_tasks(1, None, None, after=None, limit=100) == ["row"]
+    assert fake_repo.get_user_tasks.call_count == 1
+    # другие фильтры и другой пользователь — свои записи
+    task_service.get_user_tasks(1, True, None, after=None, limit=100)
+    task_service.get_user_tasks(2, None, None, after=None, limit=100)
+    assert fake_repo.get_user_tasks.call_count == 3
+    assert (CACHE_HITS.value() - hits, CACHE_MISSES.value() - misses) == (1, 3)
+
+    # любая запись сбрасывает все списки владельца
+    fake_repo.add_one.return_value = SimpleNamespace(id=5, owner_id=1)
+    task_service.create_task(dto_cls_crtask(title="t", description="d", is_done=False, owner_id=1, deadline=None))
+    task_service.get_user_tasks(1, None, None, after=None, limit=100)
+    assert fake_repo.get_user_tasks.call_count == 4
+
+    fake_repo.up_task.return_value = SimpleNamespace(id=5, owner_id=1)
+    task_service.up_task(5, {"is_done": True})
+    task_service.get_user_tasks(1, None, None, after=None, limit=100)
+    fake_repo.del_task.return_value = SimpleNamespace(id=5, owner_id=1)
+    task_service.del_task(5)
+    task_service.get_user_tasks(1, None, None, after=None, limit=100)
+    assert fake_repo.get_user_tasks.call_count == 6
+    # списки других пользователей не тронуты
+    task_service.get_user_tasks(2, None, None, after=None, limit=100)
+    assert fake_repo.get_user_tasks.call_count == 6
+
+
+def test_task_list_cache_write_during_read_not_cached(task_service, fake_repo):
+    from types import SimpleNamespace
+    from services.task_cache import LocalTaskListCache
+
+    task_service.cache = LocalTaskListCache(maxsize=10, ttl=60)
+
+    def read_racing_with_write(*args, **kwargs):
+        # задачу создали, пока шёл SELECT: прочитанный список уже устарел
+        task_service.cache.invalidate_user(1)
+        return ["stale"]
+
+    fake_repo.get_user_tasks.side_effect = read_racing_with_write
+    task_service.get_user_tasks(1)
+    fake_repo.get_user_tasks.side_effect = None
+    fake_repo.get_user_tasks.return_value = ["fresh"]
+    assert task_service.get_user_tasks(1) == ["fresh"]
+
+
+def test_task_list_cache_keyed_by_db_version_across_workers(fake_repo, dto_cls_crtask):
+    from types import SimpleNamespace
+    from services.task_cache import LocalTaskListCache
+    from services.task_service import TasksService
+
+    # два воркера: у каждого свой локальный кеш, общая только БД
+    workers = []
+    for _ in range(2):
+        service = TasksService.__new__(TasksService)
+        service.tasks_repo = fake_repo
+        service.cache = LocalTaskListCache(maxsize=10, ttl=60)
+        workers.append(service)
+    reader, writer = workers
+
+    fake_repo.get_user_tasks.return_value = ["old"]
+    assert reader.get_user_tasks(1, None, None, after=None, limit=100, version=1) == ["old"]
+    assert reader.get_user_tasks(1, None, None, after=None, limit=100, version=1) == ["old"]
+    assert fake_repo.get_user_tasks.call_count == 1
+
+    # запись во втором воркере сбрасывает только его кеш, но поднимает tasks_version в БД
+    fake_repo.add_one.return_value = SimpleNamespace(id=5, owner_id=1)
+    writer.create_task(dto_cls_crtask(title="t", description="d", is_done=False, owner_id=1, deadline=None))
+    fake_repo.get_user_tasks.return_value = ["new"]
+    assert reader.get_user_tasks(1, None, None, after=None, limit=100, version=2) == ["new"]
+    assert fake_repo.get_user_tasks.call_count == 2
+
+
+def test_local_task_list_cache_bounds(monkeypatch):
+    from services import task_cache
+
+    now = [1000.0]
+    monkeypatch.setattr(task_cache.time, "monotonic", lambda: now[0])
+    cache = task_cache.LocalTaskListCache(maxsize=2, ttl=10)
+    for user_id in (1, 2):
+        cache.set(cache.key(user_id, ()), user_id)
+    cache.get(cache.key(1, ()))  # 1 становится самым свежим
+    cache.set(cache.key(3, ()), 3)
+    assert len(cache) == 2
+    assert cache.get(cache.key(2, ())) is None
+    assert cache.get(cache.key(1, ())) == 1
+
+    now[0] += 11
+    assert cache.get(cache.key(1, ())) is None
+
+
+def test_shared_task_list_cache_roundtrip(session, add_user, add_task):
+    from repository.task_Repository import SQLTasksRepository
+    from services.task_cache import InMemoryBackend, SharedTaskListCache
+
+    backend = InMemoryBackend()
+    # два воркера с общим бэкендом
+    worker_a, worker_b = SharedTaskListCache(backend, ttl=60), SharedTaskListCache(backend, ttl=60)
+    rows = SQLTasksRepository(session).get_user_tasks(1, projection=True)
+    worker_a.set(worker_a.key(1, (None, 100)), rows)
+
+    cached = worker_b.get(worker_b.key(1, (None, 100)))
+    assert [tuple(row) for row in cached] == [tuple(row) for row in rows]
+    assert cached[0]._fields == rows[0]._fields
+
+    worker_b.invalidate_user(1)
+    assert worker_a.get(worker_a.key(1, (None, 100))) is None
+
+
+# ---------------------------------------------------------METRICS---------------------------------------------
+
+def test_metrics_render_prometheus_text():
+    from metrics.metrics import Counter, Histogram, Registry
+
+    registry = Registry()
+    requests = registry.register(Counter("requests", "Requests.", ("route",)))
+    latency = registry.register(Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0)))
+    requests.inc("/tasks")
+    requests.inc("/tasks")
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, "/tasks")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="/tasks"} 2' in lines
+    # корзины кумулятивные, граница включается в корзину
+    assert 'latency_seconds_bucket{route="/tasks",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{route="/tasks",le="1"} 3' in lines
+    assert 'latency_seconds_bucket{route="/tasks",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{route="/tasks"} 4' in lines
+    assert 'latency_seconds_sum{route="/tasks"} 3.65' in lines
+
+    with pytest.raises(ValueError):
+        registry.register(Counter("requests", "Duplicate."))
+
+
+def test_query_usage_counts_statements_per_context():
+    from sqlalchemy import create_engine, text
+    from db.query_stats import DB_QUERY_SECONDS, instrument_engine, track_usage
+
+    engine = instrument_engine(create_engine("sqlite:///:memory:"))
+    before = DB_QUERY_SECONDS.count()
+    with engine.connect() as conn:
+        conn.execute(text("select 1"))
+        with track_usage() as usage:
+            conn.execute(text("select 1"))
+            conn.execute(text("select 2"))
+    assert usage.count == 2
+    assert usage.seconds > 0
+    assert DB_QUERY_SECONDS.count() == before + 3